@@ -1,42 +1,190 @@
+import time
+_INICIO_PROCESO = time.perf_counter() # Referencia para medir el tiempo de arranque
 import tkinter as tk
 from tkinter import font, messagebox, Toplevel, Radiobutton, StringVar
-import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date, time as hora_dia
 import os
+import sys
+import csv
+import json
+import bisect
+import calendar
+import heapq
+import functools
+import argparse
+import sqlite3
+import threading
+import signal
+import queue
+import atexit
+import logging
+import logging.handlers
+from concurrent.futures import Future
+from collections import deque
+from contextlib import contextmanager
+try:
+    import resource # Solo en sistemas tipo Unix; se usa para informar el pico de memoria al exportar
+except ImportError:
+    resource = None
+
+from registro_comun import (
+    pd, np, TIEMPOS_ARRANQUE, ARCHIVO_REGISTRO, COLUMNAS_REGISTRO, COLUMNAS_POR_EVENTO, EVENTOS_REGISTRO,
+    capturar_avisos, mostrar_avisos, _avisar, bitacora,
+    LIMITES_HISTOGRAMA_S, ARCHIVO_METRICAS, instrumentar, reiniciar_metricas, resumen_metricas, exportar_metricas,
+    _fase, _registrar_io, _percentil_histograma, _leer_excel, _escribir_excel, _crear_excel_vacio, _firma_archivo,
+    _valor_sql, _guardar_json_atomico, _nuevo_registro, _calcular_almuerzo, _calcular_salida, _aplicar_evento,
+    COLUMNAS_CATEGORICAS, COLUMNAS_HORA, tipar_registro, registro_como_texto, _segundos_del_dia, _segundos_hora,
+    _hhmmss_vectorizado,
+)
+from almacenes import AlmacenDiferido, _ALMACENES, compactar_diario, migrar_a_particiones
+from replicacion import (
+    _anotar_replicacion, _estado_replicacion, _cargar_estado_replicacion, _marcar_nodo, _fusionar_en_almacen,
+    _eventos_de_fila, _recibir_de,
+)
+from servidor_datos import PUERTO_SERVIDOR, _crear_servidor, ClienteDatos
 
 # --- ARCHIVOS DE CONFIGURACIÓN ---
 # Se han cambiado los nombres de los archivos para forzar la creación de nuevos archivos limpios
-ARCHIVO_REGISTRO = 'registro_personal_nuevo.xlsx'
 ARCHIVO_EMPLEADOS = 'empleados_nuevo.xlsx'
 DURACION_ALMUERZO_MINUTOS = 60 # Duración fija del almuerzo en minutos
+JORNADA_POR_DEFECTO_HORAS = 7 # Jornada usada cuando el empleado no tiene 'jornada horas' definida
+
+# Modo turno (escaneo rápido): las entradas reconocidas se guardan en lotes
+TAMANO_LOTE_RAPIDO = 25
+INTERVALO_LOTE_RAPIDO_MS = 2000
+
+# Almacenamiento de los registros:
+#   'excel'  -> todo el historial en ARCHIVO_REGISTRO, reescrito en cada evento (original)
+#   'diario' -> cada evento se anexa como una línea JSON a un archivo por día; los días
+#               cerrados se compactan al Excel al iniciar
+#   'sqlite' -> base SQLite indexada por (id empleado, fecha); el Excel se exporta al cerrar
+#   'particionado' -> un Excel por mes en DIRECTORIO_PARTICIONES; el día en curso solo abre su mes
+ALMACENAMIENTO = 'excel'
+
+# Escritura diferida: los eventos se acumulan en memoria y se guardan juntos en una sola escritura
+# cada INTERVALO_ESCRITURA_DIFERIDA_S segundos o al llegar a LOTE_ESCRITURA_DIFERIDA eventos.
+# ARCHIVO_PENDIENTES conserva los eventos aún no guardados para recuperarlos tras una caída.
+ESCRITURA_DIFERIDA = False
+INTERVALO_ESCRITURA_DIFERIDA_S = 2.0
+LOTE_ESCRITURA_DIFERIDA = 20
+
+# Resumen por períodos (día, semana, quincena) mantenido al registrar cada salida o fin de almuerzo.
+# Desactivado, el subcomando 'resumen' lo reconstruye desde el registro antes de consultarlo.
+RESUMEN_PERIODOS = False
+ARCHIVO_RESUMEN = 'resumen_registro.db'
+
+# Registro de cambios (ARCHIVO_CAMBIOS): cada fila que cambia se anota con fsync antes de guardarse. Lo usan
+# la exportación incremental y el refresco incremental del tablero; desactivado, cada evento se ahorra esa
+# escritura, exportar-incremental no está disponible y el tablero relee el día completo en cada sondeo.
+REGISTRO_CAMBIOS = False
+
+# Servidor de datos compartido por varios kioscos ('host:puerto'); None = la interfaz usa los archivos directamente
+SERVIDOR_DATOS = None
+
+# Columnas esperadas para empleados.xlsx
+COLUMNAS_EMPLEADOS = ['id empleado', 'nombre completo', 'edad', 'cargo', 'jornada horas']
+
+# --- BITÁCORA ---
+# Los mensajes de la capa de datos y de la interfaz van al logger 'registros'. El hilo que registra
+# solo encola el mensaje; un hilo de fondo lo formatea y lo escribe en la consola (stderr) y en
+# ARCHIVO_BITACORA, que rota al llegar a TAMANO_MAX_BITACORA_BYTES. Los argumentos se pasan aparte
+# ('%s', valor), así las filas completas solo se convierten a texto si el nivel DEBUG está activo.
+# Sin configurar_bitacora() (uso como módulo, benchmark, prueba de carga) no se escribe nada.
+ARCHIVO_BITACORA = 'registros.log'
+NIVEL_BITACORA = 'INFO'
+TAMANO_MAX_BITACORA_BYTES = 5 * 1024 * 1024
+COPIAS_BITACORA = 3
+FORMATO_BITACORA = '%(asctime)s %(levelname)-7s [%(threadName)s] %(message)s'
+
+_oyente_bitacora = None
+
+def configurar_bitacora(nivel=None, archivo=ARCHIVO_BITACORA, consola=True):
+    """Conecta el logger a una cola atendida por un hilo de fondo que escribe en la consola y en un
+    archivo rotativo (archivo=None para no usarlo). Llamarla de nuevo solo cambia el nivel."""
+    global _oyente_bitacora
+    bitacora.setLevel((nivel or NIVEL_BITACORA).upper())
+    if _oyente_bitacora is not None:
+        return bitacora
+    destinos = []
+    if archivo:
+        rotativo = logging.handlers.RotatingFileHandler(archivo, maxBytes=TAMANO_MAX_BITACORA_BYTES,
+                                                        backupCount=COPIAS_BITACORA, encoding='utf-8')
+        rotativo.setFormatter(logging.Formatter(FORMATO_BITACORA))
+        destinos.append(rotativo)
+    if consola:
+        pantalla = logging.StreamHandler(sys.stderr)
+        pantalla.setFormatter(logging.Formatter('%(message)s'))
+        destinos.append(pantalla)
+    cola = queue.SimpleQueue()
+    bitacora.addHandler(logging.handlers.QueueHandler(cola))
+    bitacora.propagate = False
+    _oyente_bitacora = logging.handlers.QueueListener(cola, *destinos, respect_handler_level=True)
+    _oyente_bitacora.start()
+    atexit.register(detener_bitacora)
+    return bitacora
+
+def detener_bitacora():
+    """Escribe los mensajes que queden en la cola y detiene el hilo de la bitácora."""
+    global _oyente_bitacora
+    if _oyente_bitacora is None:
+        return
+    _oyente_bitacora.stop()
+    for manejador in _oyente_bitacora.handlers:
+        manejador.close()
+    for manejador in [m for m in bitacora.handlers if isinstance(m, logging.handlers.QueueHandler)]:
+        bitacora.removeHandler(manejador)
+    _oyente_bitacora = None
 
 # --- LÓGICA DE DATOS (EXCEL) ---
 
+def _leer_encabezados(ruta):
+    """Lee solo la fila de encabezados de un Excel (openpyxl en modo solo lectura), normalizada."""
+    from openpyxl import load_workbook
+    libro = load_workbook(ruta, read_only=True)
+    _registrar_io(archivos=1)
+    try:
+        fila = next(libro.active.iter_rows(min_row=1, max_row=1, values_only=True), ())
+    finally:
+        libro.close()
+    encabezados = [str(valor).lower().strip() if valor is not None else '' for valor in fila]
+    while encabezados and encabezados[-1] == '':
+        encabezados.pop()
+    return encabezados
+
+def _esquema_correcto(ruta, columnas):
+    """True si los encabezados del archivo ya son exactamente las columnas esperadas."""
+    try:
+        return _leer_encabezados(ruta) == columnas
+    except Exception as e:
+        bitacora.warning("No se pudieron leer los encabezados de '%s': %s", ruta, e)
+        return False
+
+@instrumentar
 def inicializar_archivos():
     """Asegura que ambos archivos Excel existan con las columnas correctas.
-    Crea los archivos si no existen y añade columnas faltantes si es necesario."""
-    print("Inicializando archivos...")
-    
-    # Columnas esperadas para empleados.xlsx
-    columnas_empleados_esperadas = ['id empleado', 'nombre completo', 'edad', 'cargo', 'jornada horas']
+    Crea los archivos si no existen y añade columnas faltantes si es necesario.
+    Si los encabezados ya son los esperados, los archivos no se leen completos ni se reescriben."""
+    bitacora.debug("Inicializando archivos...")
+    inicio = time.perf_counter()
     
     # Inicializar ARCHIVO_EMPLEADOS
     if not os.path.exists(ARCHIVO_EMPLEADOS):
-        print(f"'{ARCHIVO_EMPLEADOS}' no encontrado, creando...")
-        df_empleados = pd.DataFrame(columns=columnas_empleados_esperadas)
+        bitacora.info("'%s' no encontrado, creando...", ARCHIVO_EMPLEADOS)
         try:
-            df_empleados.to_excel(ARCHIVO_EMPLEADOS, index=False)
-            messagebox.showinfo("Información", f"El archivo '{ARCHIVO_EMPLEADOS}' ha sido creado con las columnas requeridas.")
-            print(f"'{ARCHIVO_EMPLEADOS}' creado exitosamente.")
+            _crear_excel_vacio(ARCHIVO_EMPLEADOS, COLUMNAS_EMPLEADOS)
+            _avisar("info", "Información", f"El archivo '{ARCHIVO_EMPLEADOS}' ha sido creado con las columnas requeridas.")
+            bitacora.info("'%s' creado exitosamente.", ARCHIVO_EMPLEADOS)
         except Exception as e:
-            messagebox.showerror("Error de Creación", f"No se pudo crear '{ARCHIVO_EMPLEADOS}'. Error: {e}")
-            print(f"Error al crear '{ARCHIVO_EMPLEADOS}': {e}")
+            _avisar("error", "Error de Creación", f"No se pudo crear '{ARCHIVO_EMPLEADOS}'. Error: {e}")
+            bitacora.error("Error al crear '%s': %s", ARCHIVO_EMPLEADOS, e)
             return False
+    elif _esquema_correcto(ARCHIVO_EMPLEADOS, COLUMNAS_EMPLEADOS):
+        bitacora.debug("'%s' encontrado con las columnas correctas.", ARCHIVO_EMPLEADOS)
     else:
         # Si el archivo existe, verificar y normalizar columnas, y añadir si faltan
-        print(f"'{ARCHIVO_EMPLEADOS}' encontrado, verificando y normalizando...")
+        bitacora.info("'%s' encontrado, verificando y normalizando...", ARCHIVO_EMPLEADOS)
         try:
-            df_empleados = pd.read_excel(ARCHIVO_EMPLEADOS)
+            df_empleados = _leer_excel(ARCHIVO_EMPLEADOS)
             
             # Normalizar nombres de columnas existentes y eliminar duplicados
             df_empleados.columns = df_empleados.columns.str.lower().str.strip()
@@ -52,43 +200,38 @@ def inicializar_archivos():
             df_empleados.rename(columns=actual_rename_map_empleados, inplace=True)
             
             # Añadir columnas faltantes
-            for col in columnas_empleados_esperadas:
+            for col in COLUMNAS_EMPLEADOS:
                 if col not in df_empleados.columns:
                     df_empleados[col] = pd.NA
-                    messagebox.showinfo("Actualización", f"La columna '{col}' ha sido añadida a '{ARCHIVO_EMPLEADOS}'.")
-                    print(f"Columna '{col}' añadida a '{ARCHIVO_EMPLEADOS}'.")
+                    _avisar("info", "Actualización", f"La columna '{col}' ha sido añadida a '{ARCHIVO_EMPLEADOS}'.")
+                    bitacora.info("Columna '%s' añadida a '%s'.", col, ARCHIVO_EMPLEADOS)
             
-            df_empleados = df_empleados.reindex(columns=columnas_empleados_esperadas)
-            df_empleados.to_excel(ARCHIVO_EMPLEADOS, index=False)
-            print(f"'{ARCHIVO_EMPLEADOS}' normalizado y guardado.")
+            df_empleados = df_empleados.reindex(columns=COLUMNAS_EMPLEADOS)
+            _escribir_excel(df_empleados, ARCHIVO_EMPLEADOS)
+            bitacora.info("'%s' normalizado y guardado.", ARCHIVO_EMPLEADOS)
         except Exception as e:
-            messagebox.showerror("Error al normalizar/actualizar", f"Error al normalizar o actualizar '{ARCHIVO_EMPLEADOS}': {e}")
-            print(f"Error al normalizar/actualizar '{ARCHIVO_EMPLEADOS}': {e}")
+            _avisar("error", "Error al normalizar/actualizar", f"Error al normalizar o actualizar '{ARCHIVO_EMPLEADOS}': {e}")
+            bitacora.error("Error al normalizar/actualizar '%s': %s", ARCHIVO_EMPLEADOS, e)
             return False
             
-    # Columnas esperadas para registro_personal.xlsx
-    columnas_registro_esperadas = ['id empleado', 'nombre completo', 'cargo', 'fecha', 'hora entrada', 
-                                   'jornada horas', 'hora inicio almuerzo', 'hora fin almuerzo', 
-                                   'hora salida', 'horas trabajadas', 'tiempo extra minutos', 
-                                   'tiempo almuerzo minutos']
-    
     # Inicializar ARCHIVO_REGISTRO
     if not os.path.exists(ARCHIVO_REGISTRO):
-        print(f"'{ARCHIVO_REGISTRO}' no encontrado, creando...")
-        df_registro = pd.DataFrame(columns=columnas_registro_esperadas)
+        bitacora.info("'%s' no encontrado, creando...", ARCHIVO_REGISTRO)
         try:
-            df_registro.to_excel(ARCHIVO_REGISTRO, index=False)
-            messagebox.showinfo("Información", f"El archivo '{ARCHIVO_REGISTRO}' ha sido creado con las columnas requeridas.")
-            print(f"'{ARCHIVO_REGISTRO}' creado exitosamente.")
+            _crear_excel_vacio(ARCHIVO_REGISTRO, COLUMNAS_REGISTRO)
+            _avisar("info", "Información", f"El archivo '{ARCHIVO_REGISTRO}' ha sido creado con las columnas requeridas.")
+            bitacora.info("'%s' creado exitosamente.", ARCHIVO_REGISTRO)
         except Exception as e:
-            messagebox.showerror("Error de Creación", f"No se pudo crear '{ARCHIVO_REGISTRO}'. Error: {e}")
-            print(f"Error al crear '{ARCHIVO_REGISTRO}': {e}")
+            _avisar("error", "Error de Creación", f"No se pudo crear '{ARCHIVO_REGISTRO}'. Error: {e}")
+            bitacora.error("Error al crear '%s': %s", ARCHIVO_REGISTRO, e)
             return False
+    elif _esquema_correcto(ARCHIVO_REGISTRO, COLUMNAS_REGISTRO):
+        bitacora.debug("'%s' encontrado con las columnas correctas.", ARCHIVO_REGISTRO)
     else:
         # Si el archivo existe, verificar y normalizar columnas, y añadir si faltan
-        print(f"'{ARCHIVO_REGISTRO}' encontrado, verificando y normalizando...")
+        bitacora.info("'%s' encontrado, verificando y normalizando...", ARCHIVO_REGISTRO)
         try:
-            df_registro = pd.read_excel(ARCHIVO_REGISTRO)
+            df_registro = _leer_excel(ARCHIVO_REGISTRO)
             
             # Normalizar nombres de columnas existentes y eliminar duplicados
             df_registro.columns = df_registro.columns.str.lower().str.strip()
@@ -111,243 +254,1425 @@ def inicializar_archivos():
             df_registro.rename(columns=actual_rename_map_registro, inplace=True)
 
             # Añadir columnas faltantes
-            for col in columnas_registro_esperadas:
+            for col in COLUMNAS_REGISTRO:
                 if col not in df_registro.columns:
                     df_registro[col] = pd.NA
-                    messagebox.showinfo("Actualización", f"La columna '{col}' ha sido añadida a '{ARCHIVO_REGISTRO}'.")
-                    print(f"Columna '{col}' añadida a '{ARCHIVO_REGISTRO}'.")
+                    _avisar("info", "Actualización", f"La columna '{col}' ha sido añadida a '{ARCHIVO_REGISTRO}'.")
+                    bitacora.info("Columna '%s' añadida a '%s'.", col, ARCHIVO_REGISTRO)
             
-            df_registro = df_registro.reindex(columns=columnas_registro_esperadas)
-            df_registro.to_excel(ARCHIVO_REGISTRO, index=False)
-            print(f"'{ARCHIVO_REGISTRO}' normalizado y guardado.")
+            df_registro = df_registro.reindex(columns=COLUMNAS_REGISTRO)
+            _escribir_excel(df_registro, ARCHIVO_REGISTRO)
+            bitacora.info("'%s' normalizado y guardado.", ARCHIVO_REGISTRO)
         except Exception as e:
-            messagebox.showerror("Error de Actualización", f"No se pudo verificar/actualizar '{ARCHIVO_REGISTRO}'. Error: {e}")
-            print(f"Error de actualización en '{ARCHIVO_REGISTRO}': {e}")
+            _avisar("error", "Error de Actualización", f"No se pudo verificar/actualizar '{ARCHIVO_REGISTRO}'. Error: {e}")
+            bitacora.error("Error de actualización en '%s': %s", ARCHIVO_REGISTRO, e)
             return False
-    print("Inicialización de archivos completada.")
+    TIEMPOS_ARRANQUE['inicializar_archivos'] = time.perf_counter() - inicio
+    bitacora.info("Inicialización de archivos completada en %.3f s.", TIEMPOS_ARRANQUE['inicializar_archivos'])
     return True
 
+# --- CACHÉ DE EMPLEADOS ---
+# Índice en memoria de empleados_nuevo.xlsx: {id normalizado: datos}. Se reconstruye
+# solo cuando cambia la firma (mtime, tamaño) del archivo.
+_cache_empleados = {
+    'firma': None,
+    'indice': {},
+    'aciertos': 0,
+    'fallos': 0,
+    'recargas': 0,
+}
+
+def _cargar_indice_empleados():
+    """Lee empleados.xlsx y construye el índice por ID normalizado.
+    Lanza FileNotFoundError si el archivo no existe y KeyError si falta la columna 'id empleado'."""
+    firma = _firma_archivo(ARCHIVO_EMPLEADOS)
+    if firma is None:
+        raise FileNotFoundError(ARCHIVO_EMPLEADOS)
+    if firma == _cache_empleados['firma']:
+        return _cache_empleados['indice']
+
+    bitacora.debug("Cargando índice de empleados desde '%s'...", ARCHIVO_EMPLEADOS)
+    df_empleados = _leer_excel(ARCHIVO_EMPLEADOS)
+    df_empleados.columns = df_empleados.columns.str.lower().str.strip()
+    if 'id empleado' not in df_empleados.columns:
+        raise KeyError('id empleado')
+    df_empleados['id empleado'] = df_empleados['id empleado'].astype(str).str.upper().str.strip()
+
+    indice = {}
+    for datos in df_empleados.to_dict('records'):
+        # Ante IDs duplicados se conserva la primera fila, igual que la búsqueda original
+        indice.setdefault(datos['id empleado'], datos)
+
+    _cache_empleados['firma'] = firma
+    _cache_empleados['indice'] = indice
+    _cache_empleados['recargas'] += 1
+    bitacora.info("Índice de empleados cargado: %s empleados.", len(indice))
+    return indice
+
+def invalidar_cache_empleados():
+    """Fuerza la recarga del índice de empleados en la próxima búsqueda."""
+    _cache_empleados['firma'] = None
+    _cache_empleados['indice'] = {}
+
+def estadisticas_cache_empleados():
+    """Devuelve aciertos, fallos, recargas y tamaño actual del índice de empleados."""
+    return {
+        'aciertos': _cache_empleados['aciertos'],
+        'fallos': _cache_empleados['fallos'],
+        'recargas': _cache_empleados['recargas'],
+        'empleados': len(_cache_empleados['indice']),
+    }
+
+@instrumentar
 def obtener_datos_empleado(id_empleado):
-    """Busca un empleado en empleados.xlsx y devuelve sus datos."""
-    print(f"Obteniendo datos para ID: {id_empleado}")
+    """Busca un empleado en el índice de empleados.xlsx y devuelve una copia de sus datos."""
+    bitacora.debug("Obteniendo datos para ID: %s", id_empleado)
     try:
-        df_empleados = pd.read_excel(ARCHIVO_EMPLEADOS)
-        df_empleados.columns = df_empleados.columns.str.lower().str.strip()
-        
-        if 'id empleado' in df_empleados.columns:
-            df_empleados['id empleado'] = df_empleados['id empleado'].astype(str).str.upper().str.strip()
-        else:
-            messagebox.showerror("Error de Columna", "La columna 'id empleado' no se encontró en 'empleados.xlsx'.")
-            print("Error: Columna 'id empleado' no encontrada en empleados.xlsx.")
-            return None
-
-        id_empleado_normalizado = str(id_empleado).upper().strip()
-        
-        datos = df_empleados[df_empleados['id empleado'] == id_empleado_normalizado]
-        if not datos.empty:
-            print(f"Datos de empleado encontrados: {datos.iloc[0].to_dict()}")
-            return datos.iloc[0].to_dict()
-        else:
-            print(f"ID de empleado '{id_empleado_normalizado}' no encontrado.")
-            return None
+        indice = _cargar_indice_empleados()
     except FileNotFoundError:
-        messagebox.showerror("Error de Archivo", f"El archivo '{ARCHIVO_EMPLEADOS}' no se encontró.")
-        print(f"Error: Archivo '{ARCHIVO_EMPLEADOS}' no encontrado.")
+        _avisar("error", "Error de Archivo", f"El archivo '{ARCHIVO_EMPLEADOS}' no se encontró.")
+        bitacora.error("Error: Archivo '%s' no encontrado.", ARCHIVO_EMPLEADOS)
+        return None
+    except KeyError:
+        _avisar("error", "Error de Columna", "La columna 'id empleado' no se encontró en 'empleados.xlsx'.")
+        bitacora.error("Error: Columna 'id empleado' no encontrada en empleados.xlsx.")
         return None
     except Exception as e:
-        messagebox.showerror("Error de Lectura", f"Error al leer '{ARCHIVO_EMPLEADOS}': {e}")
-        print(f"Error al leer '{ARCHIVO_EMPLEADOS}': {e}")
+        _avisar("error", "Error de Lectura", f"Error al leer '{ARCHIVO_EMPLEADOS}': {e}")
+        bitacora.error("Error al leer '%s': %s", ARCHIVO_EMPLEADOS, e)
+        return None
+
+    id_empleado_normalizado = str(id_empleado).upper().strip()
+
+    datos = indice.get(id_empleado_normalizado)
+    if datos is not None:
+        _cache_empleados['aciertos'] += 1
+        bitacora.debug("Datos de empleado encontrados: %s", datos)
+        return dict(datos)
+    else:
+        _cache_empleados['fallos'] += 1
+        bitacora.warning("ID de empleado '%s' no encontrado.", id_empleado_normalizado)
         return None
 
+@instrumentar
 def verificar_registro_hoy(id_empleado):
     """Verifica el estado del registro del empleado para hoy.
     Retorna: 'completo' si ya marcó salida, 'parcial' si solo tiene entrada, False si no tiene registro."""
-    print(f"Verificando registro de hoy para ID: {id_empleado}")
+    bitacora.debug("Verificando registro de hoy para ID: %s", id_empleado)
+    hoy = datetime.now().strftime('%Y-%m-%d')
+    id_empleado_normalizado = str(id_empleado).upper().strip()
+
     try:
-        df = pd.read_excel(ARCHIVO_REGISTRO)
-        df.columns = df.columns.str.lower().str.strip() # Normalizar columnas
+        registro_hoy = obtener_almacen().buscar(id_empleado_normalizado, hoy)
     except FileNotFoundError:
-        print(f"'{ARCHIVO_REGISTRO}' no encontrado para verificación.")
+        bitacora.warning("'%s' no encontrado para verificación.", ARCHIVO_REGISTRO)
         return False
     except Exception as e:
-        print(f"Error al leer '{ARCHIVO_REGISTRO}' para verificación: {e}")
+        bitacora.error("Error al leer el registro para verificación: %s", e)
         return False
 
-    hoy = datetime.now().strftime('%Y-%m-%d')
-    id_empleado_normalizado = str(id_empleado).upper().strip()
-    
-    if 'id empleado' in df.columns and 'fecha' in df.columns:
-        df['id empleado'] = df['id empleado'].astype(str).str.upper().str.strip()
-        registro_hoy = df[(df['id empleado'] == id_empleado_normalizado) & 
-                          (df['fecha'] == hoy)]
-        
-        if not registro_hoy.empty:
-            salida_marcada = pd.notna(registro_hoy.iloc[0]['hora salida'])
-            if salida_marcada:
-                print(f"Registro completo para hoy (salida marcada).")
-                return 'completo'
-            else:
-                print(f"Registro parcial para hoy (solo entrada).")
-                return 'parcial'
-    print("No hay registro para hoy.")
+    if registro_hoy is not None:
+        salida_marcada = pd.notna(registro_hoy.get('hora salida'))
+        if salida_marcada:
+            bitacora.debug("Registro completo para hoy (salida marcada).")
+            return 'completo'
+        else:
+            bitacora.debug("Registro parcial para hoy (solo entrada).")
+            return 'parcial'
+    bitacora.debug("No hay registro para hoy.")
     return False
 
+@instrumentar
 def obtener_registro_actual(id_empleado):
     """Obtiene el registro actual del empleado para hoy."""
-    print(f"Obteniendo registro actual para ID: {id_empleado}")
+    bitacora.debug("Obteniendo registro actual para ID: %s", id_empleado)
+    hoy = datetime.now().strftime('%Y-%m-%d')
+    id_empleado_normalizado = str(id_empleado).upper().strip()
+
     try:
-        df = pd.read_excel(ARCHIVO_REGISTRO)
-        df.columns = df.columns.str.lower().str.strip()
+        registro_hoy = obtener_almacen().buscar(id_empleado_normalizado, hoy)
     except FileNotFoundError:
-        print(f"'{ARCHIVO_REGISTRO}' no encontrado.")
+        bitacora.warning("'%s' no encontrado.", ARCHIVO_REGISTRO)
         return None
     except Exception as e:
-        print(f"Error al leer '{ARCHIVO_REGISTRO}': {e}")
+        bitacora.error("Error al leer el registro: %s", e)
         return None
 
-    hoy = datetime.now().strftime('%Y-%m-%d')
-    id_empleado_normalizado = str(id_empleado).upper().strip()
-    
-    if 'id empleado' in df.columns and 'fecha' in df.columns:
-        df['id empleado'] = df['id empleado'].astype(str).str.upper().str.strip()
-        registro_hoy = df[(df['id empleado'] == id_empleado_normalizado) & 
-                          (df['fecha'] == hoy)]
-        
-        if not registro_hoy.empty:
-            print(f"Registro actual encontrado: {registro_hoy.iloc[0].to_dict()}")
-            return registro_hoy.iloc[0].to_dict()
+    if registro_hoy is not None:
+        bitacora.debug("Registro actual encontrado: %s", registro_hoy)
+        return registro_hoy
     
-    print("No hay registro actual.")
+    bitacora.debug("No hay registro actual.")
     return None
 
-def registrar_evento(id_empleado, evento, jornada_horas=None):
-    """Registra un evento (entrada, almuerzo, salida) en el archivo de registro."""
-    print(f"Registrando evento '{evento}' para ID: {id_empleado}")
+@instrumentar
+def precargar_datos():
+    """Carga pandas, el índice de empleados y el almacén antes del primer login (en segundo plano).
+    En modo diario, además compacta los días cerrados. Retorna los tiempos de arranque medidos."""
+    inicio = time.perf_counter()
     try:
-        df = pd.read_excel(ARCHIVO_REGISTRO)
-        df.columns = df.columns.str.lower().str.strip()
-        print(f"'{ARCHIVO_REGISTRO}' leído exitosamente.")
-    except FileNotFoundError:
-        messagebox.showerror("Error", "El archivo de registro no existe. Por favor, reinicie la aplicación.")
-        print(f"Error: '{ARCHIVO_REGISTRO}' no encontrado en registrar_evento.")
-        return None
+        _cargar_indice_empleados()
+        obtener_almacen()
+        if ALMACENAMIENTO == 'diario':
+            compactar_diario()
+        if RESUMEN_PERIODOS:
+            obtener_resumen()
     except Exception as e:
-        messagebox.showerror("Error de Lectura", f"Error al leer '{ARCHIVO_REGISTRO}': {e}")
-        print(f"Error al leer '{ARCHIVO_REGISTRO}' en registrar_evento: {e}")
-        return None
+        bitacora.error("Error al precargar datos: %s", e)
+    TIEMPOS_ARRANQUE['precarga de datos'] = time.perf_counter() - inicio
+    return dict(TIEMPOS_ARRANQUE)
+
+@instrumentar
+def consultar_login(id_empleado):
+    """Reúne en una sola operación lo que necesita la pantalla de login.
+    Retorna (estado del registro de hoy, datos del empleado, registro actual si la jornada está en curso)."""
+    estado_registro = verificar_registro_hoy(id_empleado)
+    if estado_registro == 'completo':
+        return estado_registro, None, None
+    datos_empleado = obtener_datos_empleado(id_empleado)
+    registro_actual = None
+    if datos_empleado and estado_registro == 'parcial':
+        registro_actual = obtener_registro_actual(id_empleado)
+    return estado_registro, datos_empleado, registro_actual
+
+@instrumentar
+def registrar_entrada(id_empleado, jornada_horas):
+    """Comprueba que el empleado exista y registra su entrada.
+    Retorna (datos del empleado, registro); cualquiera de los dos es None si falló."""
+    datos_empleado = obtener_datos_empleado(id_empleado)
+    if not datos_empleado:
+        return None, None
+    return datos_empleado, registrar_evento(id_empleado, "entrada", jornada_horas=jornada_horas)
+
+@instrumentar
+def cargar_estado_turno():
+    """Instantánea para el modo turno: índice de empleados e IDs que ya tienen entrada hoy.
+    Con ella la interfaz reconoce cada escaneo sin tocar los archivos."""
+    hoy = datetime.now().strftime('%Y-%m-%d')
+    empleados = dict(_cargar_indice_empleados())
+    registros_hoy = obtener_almacen().leer(hoy, hoy)
+    presentes = set(registros_hoy['id empleado'].astype(str).str.upper().str.strip())
+    bitacora.info("Estado del turno cargado: %s empleados, %s con entrada hoy.", len(empleados), len(presentes))
+    return {'fecha': hoy, 'empleados': empleados, 'presentes': presentes}
+
+@instrumentar
+def registrar_entradas_lote(registros):
+    """Guarda de una vez las entradas reconocidas en modo turno. Se omiten las que ya existan en el
+    almacén (por ejemplo, marcadas desde otra terminal). Retorna {'guardados': n, 'duplicados': [ids]}."""
+    almacen = obtener_almacen()
+    nuevos = []
+    duplicados = []
+    for registro in registros:
+        if almacen.buscar(registro['id empleado'], registro['fecha']) is None:
+            nuevos.append(registro)
+        else:
+            duplicados.append(registro['id empleado'])
+    if nuevos:
+        _anotar_cambios(nuevos)
+        almacen.guardar_lote([(registro, "entrada") for registro in nuevos])
+        _anotar_replicacion([(registro, "entrada") for registro in nuevos])
+    bitacora.info("Lote de entradas guardado: %s nuevas, %s duplicadas.", len(nuevos), len(duplicados))
+    return {'guardados': len(nuevos), 'duplicados': duplicados}
+
+def calcular_percentiles(valores, percentiles=(50, 99)):
+    """Percentiles por rango más cercano de una lista de valores. Retorna {p: valor} (None si no hay datos)."""
+    ordenados = sorted(valores)
+    resultado = {}
+    for p in percentiles:
+        if not ordenados:
+            resultado[p] = None
+            continue
+        rango = max(1, -(-p * len(ordenados) // 100))
+        resultado[p] = ordenados[min(rango, len(ordenados)) - 1]
+    return resultado
+
+def _aplicar_evento_con_aviso(registro, evento, hora_actual):
+    """Como _aplicar_evento, pero informa al usuario de los errores de cálculo sin interrumpir el registro."""
+    try:
+        _aplicar_evento(registro, evento, hora_actual)
+    except Exception as e:
+        if evento == "fin_almuerzo":
+            _avisar("error", "Error", f"No se pudo calcular el tiempo de almuerzo: {e}")
+            bitacora.error("Error al calcular tiempo de almuerzo: %s", e)
+        else:
+            _avisar("error", "Error de Cálculo", f"No se pudieron calcular las horas. Error: {e}")
+            bitacora.error("Error de cálculo en salida: %s", e)
+
+@instrumentar(argumento_evento='evento')
+def registrar_evento(id_empleado, evento, jornada_horas=None):
+    """Registra un evento (entrada, almuerzo, salida) en el almacenamiento configurado."""
+    bitacora.debug("Registrando evento '%s' para ID: %s", evento, id_empleado)
+    almacen = obtener_almacen()
 
     hoy = datetime.now().strftime('%Y-%m-%d')
     hora_actual = datetime.now().strftime('%H:%M:%S')
 
     id_empleado_normalizado = str(id_empleado).upper().strip()
 
-    idx = df[(df['id empleado'] == id_empleado_normalizado) & (df['fecha'] == hoy)].index
+    try:
+        registro = almacen.buscar(id_empleado_normalizado, hoy)
+    except FileNotFoundError:
+        _avisar("error", "Error", "El archivo de registro no existe. Por favor, reinicie la aplicación.")
+        bitacora.error("Error: '%s' no encontrado en registrar_evento.", ARCHIVO_REGISTRO)
+        return None
+    except Exception as e:
+        _avisar("error", "Error de Lectura", f"Error al leer el registro: {e}")
+        bitacora.error("Error al leer el registro en registrar_evento: %s", e)
+        return None
 
     if evento == "entrada":
-        if not idx.empty:
-            messagebox.showinfo("Información", "Ya se ha registrado una entrada para este empleado hoy.")
-            print("Entrada ya registrada para hoy.")
-            return df.loc[idx[0]].to_dict()
+        if registro is not None:
+            _avisar("info", "Información", "Ya se ha registrado una entrada para este empleado hoy.")
+            bitacora.warning("Entrada ya registrada para hoy.")
+            return registro
         
         if jornada_horas is None:
-            messagebox.showerror("Error", "Las horas de jornada son requeridas para el registro de entrada.")
-            print("Error: Horas de jornada no proporcionadas para la entrada.")
+            _avisar("error", "Error", "Las horas de jornada son requeridas para el registro de entrada.")
+            bitacora.error("Error: Horas de jornada no proporcionadas para la entrada.")
             return None
 
         datos_empleado = obtener_datos_empleado(id_empleado_normalizado)
         if datos_empleado is None:
-            messagebox.showerror("Error", "ID de empleado no encontrado en el archivo de empleados.")
-            print("Error: ID de empleado no encontrado en empleados.xlsx.")
+            _avisar("error", "Error", "ID de empleado no encontrado en el archivo de empleados.")
+            bitacora.error("Error: ID de empleado no encontrado en empleados.xlsx.")
             return None
 
-        nuevo_registro = {
-            'id empleado': id_empleado_normalizado,
-            'nombre completo': datos_empleado.get('nombre completo', 'N/A'),
-            'cargo': datos_empleado.get('cargo', 'N/A'),
-            'fecha': hoy,
-            'hora entrada': hora_actual,
-            'jornada horas': jornada_horas,
-            'hora inicio almuerzo': pd.NA,
-            'hora fin almuerzo': pd.NA,
-            'hora salida': pd.NA,
-            'horas trabajadas': pd.NA,
-            'tiempo extra minutos': pd.NA,
-            'tiempo almuerzo minutos': pd.NA
-        }
-        df = pd.concat([df, pd.DataFrame([nuevo_registro])], ignore_index=True)
-        print(f"Intentando guardar el registro de entrada en '{ARCHIVO_REGISTRO}'...")
-        try:
-            df.to_excel(ARCHIVO_REGISTRO, index=False)
-            print(f"Registro de entrada guardado en '{ARCHIVO_REGISTRO}'.")
-        except Exception as e:
-            messagebox.showerror("Error de Escritura", f"No se pudo guardar el registro de entrada en '{ARCHIVO_REGISTRO}'. Error: {e}")
-            print(f"Error al guardar registro de entrada: {e}")
-            return None
-        return nuevo_registro
+        registro = _nuevo_registro(id_empleado_normalizado,
+                                   datos_empleado.get('nombre completo', 'N/A'),
+                                   datos_empleado.get('cargo', 'N/A'),
+                                   hoy, hora_actual, jornada_horas)
 
-    elif idx.empty:
-        messagebox.showerror("Error", "Debe registrar la entrada antes de cualquier otro evento.")
-        print("Error: Entrada no registrada para el evento actual.")
+    elif registro is None:
+        _avisar("error", "Error", "Debe registrar la entrada antes de cualquier otro evento.")
+        bitacora.error("Error: Entrada no registrada para el evento actual.")
         return None
-    
-    idx_row = idx[0]
-
-    if evento == "inicio_almuerzo":
-        df.loc[idx_row, 'hora inicio almuerzo'] = hora_actual
-    elif evento == "fin_almuerzo":
-        df.loc[idx_row, 'hora fin almuerzo'] = hora_actual
-        try:
-            inicio_alm_str = str(df.loc[idx_row, 'hora inicio almuerzo'])
-            fin_alm_str = hora_actual
-            
-            inicio_alm = datetime.strptime(inicio_alm_str, '%H:%M:%S')
-            fin_alm = datetime.strptime(fin_alm_str, '%H:%M:%S')
-            
-            tiempo_almuerzo = fin_alm - inicio_alm
-            df.loc[idx_row, 'tiempo almuerzo minutos'] = round(tiempo_almuerzo.total_seconds() / 60)
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo calcular el tiempo de almuerzo: {e}")
-            print(f"Error al calcular tiempo de almuerzo: {e}")
-            
-    elif evento == "salida":
-        df.loc[idx_row, 'hora salida'] = hora_actual
-        try:
-            entrada_str = str(df.loc[idx_row, 'hora entrada'])
-            salida_str = hora_actual
-            jornada_horas = float(df.loc[idx_row, 'jornada horas']) 
-            
-            entrada = datetime.strptime(entrada_str, '%H:%M:%S')
-            salida = datetime.strptime(salida_str, '%H:%M:%S')
-            
-            tiempo_almuerzo = timedelta(0)
-            inicio_alm_str = df.loc[idx_row, 'hora inicio almuerzo']
-            fin_alm_str = df.loc[idx_row, 'hora fin almuerzo']
-
-            if pd.notna(inicio_alm_str) and pd.notna(fin_alm_str):
-                inicio_alm = datetime.strptime(str(inicio_alm_str), '%H:%M:%S')
-                fin_alm = datetime.strptime(str(fin_alm_str), '%H:%M:%S')
-                tiempo_almuerzo = fin_alm - inicio_alm
-
-            tiempo_trabajado = (salida - entrada) - tiempo_almuerzo
-            horas_trabajadas_decimal = round(tiempo_trabajado.total_seconds() / 3600, 2)
-            df.loc[idx_row, 'horas trabajadas'] = horas_trabajadas_decimal
-            
-            tiempo_extra_segundos = max(0, tiempo_trabajado.total_seconds() - (jornada_horas * 3600))
-            df.loc[idx_row, 'tiempo extra minutos'] = round(tiempo_extra_segundos / 60)
 
-        except Exception as e:
-            messagebox.showerror("Error de Cálculo", f"No se pudieron calcular las horas. Error: {e}")
-            print(f"Error de cálculo en salida: {e}")
+    else:
+        _aplicar_evento_con_aviso(registro, evento, hora_actual)
 
-    print(f"Intentando guardar el evento '{evento}' en '{ARCHIVO_REGISTRO}'...")
+    bitacora.debug("Intentando guardar el evento '%s'...", evento)
+    try:
+        _anotar_cambios([registro])
+        almacen.guardar(registro, evento)
+        bitacora.info("Evento '%s' de %s guardado.", evento, id_empleado_normalizado)
+    except Exception as e:
+        _avisar("error", "Error de Escritura", f"No se pudo guardar el evento '{evento}'. Error: {e}")
+        bitacora.error("Error al guardar evento '%s': %s", evento, e)
+        return None
+    _anotar_replicacion([(registro, evento)])
+    if evento in ("salida", "fin_almuerzo"):
+        actualizar_resumen([registro])
+    return registro
+
+# --- REGISTRO DE SESIÓN TIPADO ---
+# Los almacenes devuelven filas (dict) con escalares de numpy, pd.NA y horas en texto. La interfaz las
+# convierte una sola vez al abrir la sesión en Empleado y RegistroDia, con tipos de Python: horas como
+# datetime.time, fecha como date, números como int/float y vacíos como None.
+
+def _valor_python(valor):
+    """Vacíos de pandas/numpy (NaN, NA, NaT) como None y escalares de numpy como int/float de Python."""
+    if valor is None or isinstance(valor, str):
+        return valor
+    if pd.isna(valor):
+        return None
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+def _a_texto(valor):
+    valor = _valor_python(valor)
+    return None if valor is None else str(valor)
+
+def _a_entero(valor):
+    valor = _valor_python(valor)
+    return None if valor is None else int(round(float(valor)))
+
+def _a_decimal(valor):
+    valor = _valor_python(valor)
+    return None if valor is None else float(valor)
+
+def _a_hora(valor):
+    """'HH:MM:SS', datetime.time o datetime (como los lee openpyxl) a datetime.time."""
+    valor = _valor_python(valor)
+    if valor is None or isinstance(valor, hora_dia):
+        return valor
+    if isinstance(valor, datetime):
+        return valor.time()
+    return datetime.strptime(str(valor).strip(), '%H:%M:%S').time()
+
+def _a_fecha(valor):
+    valor = _valor_python(valor)
+    if valor is None or (isinstance(valor, date) and not isinstance(valor, datetime)):
+        return valor
+    if isinstance(valor, datetime):
+        return valor.date()
+    return datetime.strptime(str(valor).strip()[:10], '%Y-%m-%d').date()
+
+def _a_celda(valor):
+    """Inverso de las conversiones: el valor tal como lo guardan los almacenes."""
+    if valor is None:
+        return pd.NA
+    if isinstance(valor, hora_dia):
+        return valor.strftime('%H:%M:%S')
+    if isinstance(valor, date):
+        return valor.strftime('%Y-%m-%d')
+    return valor
+
+class _FilaTipada:
+    """Base de Empleado y RegistroDia: un atributo por columna (espacios como '_') y un conversor por columna."""
+    __slots__ = ()
+    COLUMNAS = []
+    CONVERSORES = {}
+
+    @classmethod
+    def desde_fila(cls, fila):
+        objeto = cls.__new__(cls)
+        for columna, atributo in zip(cls.COLUMNAS, cls.__slots__):
+            setattr(objeto, atributo, cls.CONVERSORES.get(columna, _a_texto)(fila.get(columna)))
+        return objeto
+
+    def a_fila(self):
+        return {columna: _a_celda(getattr(self, atributo)) for columna, atributo in zip(self.COLUMNAS, self.__slots__)}
+
+    def __eq__(self, otro):
+        return type(self) is type(otro) and all(getattr(self, a) == getattr(otro, a) for a in self.__slots__)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{a}={getattr(self, a)!r}' for a in self.__slots__)})"
+
+class Empleado(_FilaTipada):
+    __slots__ = ('id_empleado', 'nombre_completo', 'edad', 'cargo', 'jornada_horas')
+    COLUMNAS = COLUMNAS_EMPLEADOS
+    CONVERSORES = {'edad': _a_entero, 'jornada horas': _a_decimal}
+
+class RegistroDia(_FilaTipada):
+    __slots__ = ('id_empleado', 'nombre_completo', 'cargo', 'fecha', 'hora_entrada', 'jornada_horas',
+                 'hora_inicio_almuerzo', 'hora_fin_almuerzo', 'hora_salida', 'horas_trabajadas',
+                 'tiempo_extra_minutos', 'tiempo_almuerzo_minutos')
+    COLUMNAS = COLUMNAS_REGISTRO
+    CONVERSORES = {'fecha': _a_fecha, 'hora entrada': _a_hora, 'hora inicio almuerzo': _a_hora,
+                   'hora fin almuerzo': _a_hora, 'hora salida': _a_hora, 'jornada horas': _a_decimal,
+                   'horas trabajadas': _a_decimal, 'tiempo extra minutos': _a_entero,
+                   'tiempo almuerzo minutos': _a_entero}
+
+def datos_sesion(datos_empleado, registro):
+    """(Empleado, RegistroDia) que recibe DashboardPage a partir de las filas de los almacenes."""
+    return Empleado.desde_fila(datos_empleado), RegistroDia.desde_fila(registro)
+
+# --- IMPORTACIÓN DE EMPLEADOS ---
+# Actualiza ARCHIVO_EMPLEADOS con la nómina que mantiene RR. HH. fuera de la aplicación: compara por
+# 'id empleado' normalizado, aplica solo altas, cambios y bajas, y actualiza esas entradas del índice en
+# memoria en lugar de descartarlo, así la siguiente búsqueda no vuelve a leer el archivo.
+
+def _normalizar_para_comparar(serie):
+    """Valores comparables entre xlsx y CSV: números como float, textos sin espacios, vacíos como ''."""
+    numeros = pd.to_numeric(serie, errors='coerce')
+    textos = serie.astype(object).where(serie.notna(), '').astype(str).str.strip()
+    return textos.where(numeros.isna(), numeros.astype(float).astype(str))
+
+def _leer_nomina(ruta):
+    """Lee una nómina .csv o .xlsx con columnas en minúsculas e IDs normalizados (sin duplicados)."""
+    if ruta.lower().endswith('.csv'):
+        df = pd.read_csv(ruta, dtype=str, keep_default_na=False)
+        _registrar_io(bytes_leidos=os.path.getsize(ruta), filas=len(df), archivos=1)
+    else:
+        df = _leer_excel(ruta)
+    df.columns = df.columns.str.lower().str.strip()
+    if 'id empleado' not in df.columns:
+        raise KeyError('id empleado')
+    df['id empleado'] = df['id empleado'].astype(str).str.upper().str.strip()
+    for col in ('edad', 'jornada horas'):
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            # En el CSV todo llega como texto; los números se convierten para que el Excel los guarde como tales
+            numeros = pd.to_numeric(df[col], errors='coerce')
+            vacio = df[col].astype(str).str.strip() == ''
+            df[col] = df[col].astype(object).where(numeros.isna(), numeros).where(~vacio, np.nan)
+    return df.drop_duplicates(subset='id empleado', keep='first').set_index('id empleado', drop=False)
+
+@instrumentar
+def importar_empleados(ruta, aplicar_bajas=True, simular=False):
+    """Aplica sobre ARCHIVO_EMPLEADOS las diferencias con la nómina de ruta, en tiempo proporcional a su tamaño.
+    Retorna {'altas': [ids], 'cambios': [ids], 'bajas': [ids]}; las bajas solo se aplican con aplicar_bajas."""
+    nueva = _leer_nomina(ruta)
+    actual = _leer_nomina(ARCHIVO_EMPLEADOS)
+    columnas = [col for col in COLUMNAS_EMPLEADOS if col in nueva.columns]
+
+    altas = nueva.index.difference(actual.index)
+    bajas = actual.index.difference(nueva.index)
+    comunes = nueva.index.intersection(actual.index)
+    distinto = pd.Series(False, index=comunes)
+    for col in columnas:
+        valor_actual = (_normalizar_para_comparar(actual.loc[comunes, col]) if col in actual.columns
+                        else pd.Series('', index=comunes))
+        distinto |= _normalizar_para_comparar(nueva.loc[comunes, col]) != valor_actual
+    cambios = comunes[distinto.to_numpy()]
+    diferencias = {'altas': list(altas), 'cambios': list(cambios), 'bajas': list(bajas)}
+    bitacora.info("Nómina '%s': %s alta(s), %s cambio(s), %s baja(s)%s.", ruta, len(altas), len(cambios), len(bajas),
+                  "" if aplicar_bajas or not len(bajas) else " (bajas no aplicadas)")
+    for tipo, ids in diferencias.items():
+        if ids:
+            bitacora.info("  %s: %s%s", tipo, ', '.join(ids[:20]), ' ...' if len(ids) > 20 else '')
+    if simular or not (len(altas) or len(cambios) or (aplicar_bajas and len(bajas))):
+        return diferencias
+
+    # El archivo se reescribe entero (es un xlsx), pero solo se tocan las filas que cambian
+    cache_vigente = _cache_empleados['firma'] == _firma_archivo(ARCHIVO_EMPLEADOS)
+    df = _leer_excel(ARCHIVO_EMPLEADOS)
+    df.columns = df.columns.str.lower().str.strip()
+    ids = df['id empleado'].astype(str).str.upper().str.strip()
+    if aplicar_bajas and len(bajas):
+        df = df[~ids.isin(bajas)]
+        ids = ids[df.index]
+    if len(cambios):
+        filas = ids.isin(cambios) & ~ids.duplicated() # Con IDs repetidos, el índice usa la primera fila
+        for col in columnas:
+            df[col] = df[col].astype(object)
+            df.loc[filas, col] = nueva.loc[ids[filas], col].to_numpy()
+    if len(altas):
+        df = pd.concat([df, nueva.loc[altas, columnas]], ignore_index=True)
+    _escribir_excel(df.reindex(columns=list(dict.fromkeys([*COLUMNAS_EMPLEADOS, *df.columns]))), ARCHIVO_EMPLEADOS)
+
+    if cache_vigente:
+        # Se reemplazan solo las entradas afectadas, con las mismas filas que leería una recarga completa
+        indice = _cache_empleados['indice']
+        if aplicar_bajas:
+            for id_empleado in bajas:
+                indice.pop(id_empleado, None)
+        ids = df['id empleado'].astype(str).str.upper().str.strip()
+        afectadas = ids.isin(altas.union(cambios)) & ~ids.duplicated()
+        for datos in df[afectadas].assign(**{'id empleado': ids[afectadas]}).to_dict('records'):
+            indice[datos['id empleado']] = datos
+        _cache_empleados['firma'] = _firma_archivo(ARCHIVO_EMPLEADOS)
+    return diferencias
+
+# --- RECÁLCULO POR LOTES ---
+# Recalcula 'horas trabajadas', 'tiempo extra minutos' y 'tiempo almuerzo minutos' de muchas filas a la
+# vez con operaciones de NumPy. Reproduce exactamente _calcular_almuerzo/_calcular_salida: las filas
+# cuyos datos esos cálculos no podrían leer conservan su valor, igual que cuando falla el evento.
+COLUMNAS_CALCULADAS = ['horas trabajadas', 'tiempo extra minutos', 'tiempo almuerzo minutos']
+
+def _redondear_horas(segundos):
+    """round(segundos / 3600, 2) elemento a elemento, con el mismo resultado que el round de Python."""
+    horas = segundos / 3600
+    redondeadas = np.round(horas, 2)
+    # Solo los empates exactos en centésimas (segundos ≡ 18 mod 36) pueden diferir de round()
+    empates = np.flatnonzero(np.mod(segundos, 36) == 18)
+    redondeadas[empates] = [round(x, 2) for x in horas[empates].tolist()] # floats de Python, no de NumPy
+    return redondeadas
+
+def recalcular_tiempos(df):
+    """Devuelve una copia de df con las columnas calculadas recalculadas para todas las filas."""
+    resultado = df.copy()
+    if df.empty:
+        return resultado
+    entrada = _segundos_del_dia(df['hora entrada'])
+    salida = _segundos_del_dia(df['hora salida'])
+    inicio_alm = _segundos_del_dia(df['hora inicio almuerzo'])
+    fin_alm = _segundos_del_dia(df['hora fin almuerzo'])
+    jornada = pd.to_numeric(df['jornada horas'], errors='coerce').to_numpy(dtype=float)
+
+    almuerzo = fin_alm - inicio_alm
+    hay_fin = df['hora fin almuerzo'].notna().to_numpy()
+    calcula_almuerzo = hay_fin & ~np.isnan(almuerzo)
+
+    # En la salida el almuerzo solo se descuenta si hay inicio y fin; si están pero no se leen, falla
+    almuerzo_marcado = (df['hora inicio almuerzo'].notna() & df['hora fin almuerzo'].notna()).to_numpy()
+    jornada_invalida = np.isnan(jornada) & df['jornada horas'].notna().to_numpy()
+    calcula_salida = (df['hora salida'].notna().to_numpy() & ~np.isnan(entrada) & ~np.isnan(salida)
+                      & ~(almuerzo_marcado & np.isnan(almuerzo)) & ~jornada_invalida)
+    trabajado = (salida - entrada) - np.where(almuerzo_marcado, almuerzo, 0)
+    extra = trabajado - jornada * 3600
+
+    nuevos = {
+        'tiempo almuerzo minutos': (calcula_almuerzo, np.rint(almuerzo / 60)),
+        'horas trabajadas': (calcula_salida, _redondear_horas(np.where(calcula_salida, trabajado, 0))),
+        'tiempo extra minutos': (calcula_salida, np.rint(np.where(extra > 0, extra, 0) / 60)),
+    }
+    for col, (calcula, valores) in nuevos.items():
+        if calcula.any():
+            resultado[col] = resultado[col].astype(object)
+            resultado.loc[calcula, col] = valores[calcula]
+    return resultado
+
+def _columnas_distintas(antes, despues):
+    """Máscara booleana (filas x columnas calculadas) de los valores que cambiaron; NaN igual a NaN."""
+    a = antes[COLUMNAS_CALCULADAS].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    d = despues[COLUMNAS_CALCULADAS].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    return ~((a == d) | (np.isnan(a) & np.isnan(d)))
+
+def verificar_recalculo(df):
+    """Compara recalcular_tiempos con el cálculo fila a fila de los eventos. Retorna las discrepancias."""
+    df = registro_como_texto(df)
+    vectorizado = recalcular_tiempos(df)
+    esperado = df.copy()
+    for col in COLUMNAS_CALCULADAS:
+        esperado[col] = esperado[col].astype(object)
+    for idx, fila in df.iterrows():
+        registro = fila.to_dict()
+        for campo, calculo in (('hora fin almuerzo', _calcular_almuerzo), ('hora salida', _calcular_salida)):
+            if pd.notna(registro[campo]):
+                try:
+                    calculo(registro)
+                except Exception:
+                    pass # El evento habría fallado y dejado los valores como estaban
+        for col in COLUMNAS_CALCULADAS:
+            esperado.at[idx, col] = registro[col]
+    distintas = _columnas_distintas(esperado, vectorizado)
+    return [(df.at[idx, 'id empleado'], df.at[idx, 'fecha'], col, esperado.at[idx, col], vectorizado.at[idx, col])
+            for i, idx in enumerate(df.index) for j, col in enumerate(COLUMNAS_CALCULADAS) if distintas[i, j]]
+
+def _valor_calculado(valor):
+    """Los minutos se guardan como enteros, igual que los deja round() en el cálculo por evento."""
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+@instrumentar
+def recalcular_periodo(desde=None, hasta=None, simular=False):
+    """Recalcula las columnas calculadas del rango de fechas y guarda solo las filas que cambiaron.
+    Retorna {'filas', 'cambiadas'}; con simular=True no escribe nada."""
+    almacen = obtener_almacen()
+    df = almacen.leer(desde, hasta).reset_index(drop=True)
+    recalculado = recalcular_tiempos(df)
+    distintas = _columnas_distintas(df, recalculado)
+    recalculado = registro_como_texto(recalculado)
+    eventos = []
+    for i in np.flatnonzero(distintas.any(axis=1)):
+        registro = recalculado.iloc[i].to_dict()
+        for col in ('tiempo almuerzo minutos', 'tiempo extra minutos'):
+            registro[col] = _valor_calculado(registro[col])
+        # Se reutilizan los eventos que escriben esas columnas (la hora marcada no cambia)
+        if distintas[i, COLUMNAS_CALCULADAS.index('tiempo almuerzo minutos')]:
+            eventos.append((registro, 'fin_almuerzo'))
+        if distintas[i, :2].any():
+            eventos.append((registro, 'salida'))
+    cambiadas = int(distintas.any(axis=1).sum())
+    bitacora.info("Recálculo %s a %s: %s fila(s), %s con cambios.", desde or 'inicio', hasta or 'fin', len(df), cambiadas)
+    if eventos and not simular:
+        _anotar_cambios([registro for registro, _ in eventos])
+        almacen.guardar_lote(eventos)
+        invalidar_archivo({registro['fecha'] for registro, _ in eventos})
+        actualizar_resumen(list({id(registro): registro for registro, _ in eventos}.values()))
+    return {'filas': len(df), 'cambiadas': cambiadas}
+
+# --- MEMORIA DEL REGISTRO ---
+# Compara el registro en texto con el mismo registro con ESQUEMA_REGISTRO (registro_comun.py) aplicado.
+
+def memoria_registro(df):
+    """Bytes por columna del registro en formato de texto y con ESQUEMA_REGISTRO aplicado."""
+    texto = registro_como_texto(df).memory_usage(deep=True, index=False)
+    tipado = tipar_registro(df).memory_usage(deep=True, index=False)
+    return {'filas': len(df),
+            'columnas': {col: {'texto': int(texto[col]), 'tipado': int(tipado[col])} for col in df.columns},
+            'texto': int(texto.sum()), 'tipado': int(tipado.sum())}
+
+@instrumentar
+def informe_memoria_registro(desde=None, hasta=None):
+    """Imprime la memoria del registro del rango antes y después de aplicar ESQUEMA_REGISTRO."""
+    informe = memoria_registro(obtener_almacen().leer(desde, hasta))
+    print(f"{'columna':<26} {'texto KB':>12} {'tipado KB':>12} {'ahorro':>8}")
+    for col, bytes_col in informe['columnas'].items():
+        ahorro = 1 - bytes_col['tipado'] / bytes_col['texto'] if bytes_col['texto'] else 0.0
+        print(f"{col:<26} {bytes_col['texto'] / 1024:>12.1f} {bytes_col['tipado'] / 1024:>12.1f} {ahorro:>8.0%}")
+    ahorro = 1 - informe['tipado'] / informe['texto'] if informe['texto'] else 0.0
+    print(f"{'total (' + str(informe['filas']) + ' filas)':<26} {informe['texto'] / 1024:>12.1f} "
+          f"{informe['tipado'] / 1024:>12.1f} {ahorro:>8.0%}")
+    return informe
+
+# --- ALMACÉN ACTIVO ---
+# Los almacenes están en almacenes.py; aquí se crea y se conserva el que eligen ALMACENAMIENTO y
+# ESCRITURA_DIFERIDA.
+_almacen_activo = {'tipo': None, 'almacen': None}
+
+def _crear_almacen(directorio=''):
+    """Almacén configurado en ALMACENAMIENTO (y ESCRITURA_DIFERIDA) sobre los archivos de directorio."""
+    almacen = _ALMACENES[ALMACENAMIENTO](directorio=directorio)
+    if ESCRITURA_DIFERIDA:
+        almacen = AlmacenDiferido(almacen, INTERVALO_ESCRITURA_DIFERIDA_S, LOTE_ESCRITURA_DIFERIDA, directorio)
+    return almacen
+
+def obtener_almacen():
+    """Devuelve el almacén configurado en ALMACENAMIENTO (con escritura diferida si
+    ESCRITURA_DIFERIDA está activa), creándolo la primera vez."""
+    tipo = (ALMACENAMIENTO, ESCRITURA_DIFERIDA)
+    if _almacen_activo['tipo'] != tipo:
+        if _almacen_activo['almacen'] is not None:
+            _almacen_activo['almacen'].cerrar()
+        _almacen_activo['almacen'] = _crear_almacen()
+        _almacen_activo['tipo'] = tipo
+    return _almacen_activo['almacen']
+
+def cerrar_almacen():
+    """Cierra el almacén activo (en SQLite, exporta antes el Excel) y el resumen por períodos."""
+    if _almacen_activo['almacen'] is not None:
+        _almacen_activo['almacen'].cerrar()
+    _almacen_activo['tipo'] = None
+    _almacen_activo['almacen'] = None
+    if _resumen_activo['resumen'] is not None:
+        _resumen_activo['resumen'].cerrar()
+        _resumen_activo['resumen'] = None
+
+# --- RESUMEN POR PERÍODOS ---
+# Totales por empleado de cada día, semana ISO ('AAAA-Www') y quincena ('AAAA-MM-Q1' del 1 al 15,
+# 'AAAA-MM-Q2' del 16 a fin de mes), guardados en ARCHIVO_RESUMEN. Cada salida o fin de almuerzo suma
+# al período la diferencia con el valor anterior del día, así que leer un período no recorre el historial.
+TIPOS_PERIODO = ('dia', 'semana', 'quincena')
+CAMPOS_RESUMEN = ('horas_trabajadas', 'tiempo_extra_minutos', 'exceso_almuerzo_minutos')
+
+def _claves_periodo(fecha):
+    """Claves de semana y quincena de una fecha 'AAAA-MM-DD'."""
+    anio, semana, _ = datetime.strptime(fecha, '%Y-%m-%d').isocalendar()
+    return {'semana': f"{anio}-W{semana:02d}",
+            'quincena': f"{fecha[:7]}-Q{1 if int(fecha[8:10]) <= 15 else 2}"}
+
+def _totales_registro(registro):
+    """Valores que aporta una fila de registro al resumen (0 en lo que aún no se calculó)."""
+    horas = registro.get('horas trabajadas')
+    extra = registro.get('tiempo extra minutos')
+    almuerzo = registro.get('tiempo almuerzo minutos')
+    return (
+        float(horas) if pd.notna(horas) else 0.0,
+        int(extra) if pd.notna(extra) else 0,
+        max(0, int(almuerzo) - DURACION_ALMUERZO_MINUTOS) if pd.notna(almuerzo) else 0,
+    )
+
+def _resumen_desde_registro(df):
+    """Recalcula desde las filas de registro la tabla diaria y las de semana y quincena."""
+    df = registro_como_texto(df)
+    df = df[df['horas trabajadas'].notna() | df['tiempo almuerzo minutos'].notna()]
+    dias = pd.DataFrame({
+        'id': df['id empleado'].astype(str),
+        'fecha': df['fecha'].astype(str),
+        'horas_trabajadas': pd.to_numeric(df['horas trabajadas'], errors='coerce').fillna(0.0),
+        'tiempo_extra_minutos': pd.to_numeric(df['tiempo extra minutos'], errors='coerce').fillna(0).astype(int),
+        'exceso_almuerzo_minutos': (pd.to_numeric(df['tiempo almuerzo minutos'], errors='coerce').fillna(0)
+                                    - DURACION_ALMUERZO_MINUTOS).clip(lower=0).astype(int),
+    })
+    fechas = pd.to_datetime(dias['fecha'])
+    iso = fechas.dt.isocalendar()
+    dias['semana'] = iso['year'].astype(str) + '-W' + iso['week'].astype(str).str.zfill(2)
+    dias['quincena'] = dias['fecha'].str[:7] + '-Q' + (fechas.dt.day > 15).map({False: '1', True: '2'})
+    periodos = {}
+    for tipo in ('semana', 'quincena'):
+        agrupado = dias.groupby([tipo, 'id'])[list(CAMPOS_RESUMEN)].sum()
+        agrupado['dias'] = dias.groupby([tipo, 'id']).size()
+        periodos[tipo] = agrupado.reset_index().rename(columns={tipo: 'periodo'})
+    return dias[['id', 'fecha', *CAMPOS_RESUMEN]], periodos
+
+class ResumenPeriodos:
+    """Tablas de resumen en SQLite: resumen_dia (id, fecha) y resumen_periodo (tipo, periodo, id).
+    Mientras la base no tenga la marca 'construido' en resumen_estado (base nueva o construcción
+    interrumpida) se construye desde el registro completo."""
+
+    def __init__(self, ruta=None, almacen=None):
+        self.ruta = ruta or ARCHIVO_RESUMEN
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS resumen_dia (id TEXT, fecha TEXT, horas_trabajadas REAL, "
+                               "tiempo_extra_minutos INTEGER, exceso_almuerzo_minutos INTEGER, PRIMARY KEY (id, fecha))")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS resumen_periodo (tipo TEXT, periodo TEXT, id TEXT, "
+                               "horas_trabajadas REAL, tiempo_extra_minutos INTEGER, exceso_almuerzo_minutos INTEGER, "
+                               "dias INTEGER, PRIMARY KEY (tipo, periodo, id))")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS resumen_estado (clave TEXT PRIMARY KEY, valor TEXT)")
+        if self._conn.execute("SELECT 1 FROM resumen_estado WHERE clave = 'construido'").fetchone() is None:
+            self.reconstruir((almacen or obtener_almacen()).leer())
+
+    def actualizar(self, registros):
+        """Aplica al resumen los valores actuales de una o varias filas de registro, en una transacción."""
+        with self._lock, _fase('sqlite'), self._conn:
+            for registro in registros:
+                id_empleado, fecha = str(registro['id empleado']), str(registro['fecha'])
+                nuevo = _totales_registro(registro)
+                fila = self._conn.execute("SELECT horas_trabajadas, tiempo_extra_minutos, exceso_almuerzo_minutos "
+                                          "FROM resumen_dia WHERE id = ? AND fecha = ?", (id_empleado, fecha)).fetchone()
+                anterior = fila or (0.0, 0, 0)
+                self._conn.execute("INSERT OR REPLACE INTO resumen_dia VALUES (?, ?, ?, ?, ?)",
+                                   (id_empleado, fecha, *nuevo))
+                delta = [n - a for n, a in zip(nuevo, anterior)]
+                for tipo, periodo in _claves_periodo(fecha).items():
+                    self._conn.execute(
+                        "INSERT INTO resumen_periodo VALUES (?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (tipo, periodo, id) DO UPDATE SET "
+                        "horas_trabajadas = horas_trabajadas + excluded.horas_trabajadas, "
+                        "tiempo_extra_minutos = tiempo_extra_minutos + excluded.tiempo_extra_minutos, "
+                        "exceso_almuerzo_minutos = exceso_almuerzo_minutos + excluded.exceso_almuerzo_minutos, "
+                        "dias = dias + excluded.dias",
+                        (tipo, periodo, id_empleado, *delta, 0 if fila else 1))
+
+    def totales(self, tipo, periodo):
+        """Totales por empleado de un período: {id: {campo: valor, ..., 'dias': n}}."""
+        if tipo not in TIPOS_PERIODO:
+            raise ValueError(f"Tipo de período desconocido: '{tipo}'. Use uno de {', '.join(TIPOS_PERIODO)}.")
+        with self._lock:
+            if tipo == 'dia':
+                filas = self._conn.execute("SELECT id, horas_trabajadas, tiempo_extra_minutos, exceso_almuerzo_minutos, "
+                                           "1 FROM resumen_dia WHERE fecha = ?", (periodo,)).fetchall()
+            else:
+                filas = self._conn.execute("SELECT id, horas_trabajadas, tiempo_extra_minutos, exceso_almuerzo_minutos, "
+                                           "dias FROM resumen_periodo WHERE tipo = ? AND periodo = ?",
+                                           (tipo, periodo)).fetchall()
+        return {fila[0]: {**dict(zip(CAMPOS_RESUMEN, fila[1:4])), 'horas_trabajadas': round(fila[1], 2), 'dias': fila[4]}
+                for fila in filas}
+
+    def reconstruir(self, df):
+        """Reemplaza el resumen por el recalculado desde las filas de registro df."""
+        dias, periodos = _resumen_desde_registro(df)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM resumen_dia")
+            self._conn.execute("DELETE FROM resumen_periodo")
+            self._conn.executemany("INSERT INTO resumen_dia VALUES (?, ?, ?, ?, ?)",
+                                   [tuple(_valor_sql(v) for v in fila) for fila in dias.itertuples(index=False)])
+            for tipo, agrupado in periodos.items():
+                self._conn.executemany("INSERT INTO resumen_periodo VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                       [(tipo, *(_valor_sql(v) for v in fila)) for fila in agrupado.itertuples(index=False)])
+            # En la misma transacción que los datos: una reconstrucción interrumpida no deja la marca
+            self._conn.execute("INSERT OR REPLACE INTO resumen_estado VALUES ('construido', ?)",
+                               (datetime.now().isoformat(timespec='seconds'),))
+        bitacora.info("Resumen reconstruido: %s día(s) de empleado.", len(dias))
+
+    def verificar(self, df):
+        """Compara el resumen guardado con el recalculado desde df. Retorna la lista de diferencias."""
+        dias, periodos = _resumen_desde_registro(df)
+        esperado = {('dia', fila.fecha, fila.id): (fila.horas_trabajadas, fila.tiempo_extra_minutos,
+                                                   fila.exceso_almuerzo_minutos, 1)
+                    for fila in dias.itertuples(index=False)}
+        for tipo, agrupado in periodos.items():
+            for fila in agrupado.itertuples(index=False):
+                esperado[(tipo, fila.periodo, fila.id)] = (fila.horas_trabajadas, fila.tiempo_extra_minutos,
+                                                           fila.exceso_almuerzo_minutos, fila.dias)
+        with self._lock:
+            guardado = {('dia', f, i): (h, e, x, 1) for i, f, h, e, x in self._conn.execute("SELECT * FROM resumen_dia")}
+            guardado.update({(t, p, i): (h, e, x, d) for t, p, i, h, e, x, d in
+                             self._conn.execute("SELECT * FROM resumen_periodo")})
+        diferencias = []
+        for clave in sorted(esperado.keys() | guardado.keys()):
+            e, g = esperado.get(clave), guardado.get(clave)
+            if e is None or g is None or abs(e[0] - g[0]) > 0.005 or tuple(e[1:]) != tuple(g[1:]):
+                diferencias.append((clave, e, g))
+        return diferencias
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+_resumen_activo = {'resumen': None}
+
+def obtener_resumen():
+    """Devuelve el resumen por períodos, creándolo (y construyéndolo si hace falta) la primera vez."""
+    if _resumen_activo['resumen'] is None:
+        _resumen_activo['resumen'] = ResumenPeriodos()
+    return _resumen_activo['resumen']
+
+def actualizar_resumen(registros, resumen=None):
+    """Lleva al resumen (el activo si no se indica otro) las filas indicadas; un fallo se informa sin
+    afectar el registro ya guardado."""
+    if not RESUMEN_PERIODOS:
+        return
     try:
-        df.to_excel(ARCHIVO_REGISTRO, index=False)
-        print(f"Evento '{evento}' guardado en '{ARCHIVO_REGISTRO}'.")
+        (resumen or obtener_resumen()).actualizar(registros)
     except Exception as e:
-        messagebox.showerror("Error de Escritura", f"No se pudo guardar el evento '{evento}' en '{ARCHIVO_REGISTRO}'. Error: {e}")
-        print(f"Error al guardar evento '{evento}': {e}")
+        bitacora.error("Error al actualizar el resumen por períodos: %s. Use 'resumen --reconstruir'.", e)
+
+# --- EXPORTACIÓN ---
+# Exporta el registro recorriéndolo por bloques (almacen.iterar) y escribiendo cada bloque en cuanto llega,
+# así la memoria no crece con el tamaño del período. El Excel se escribe con openpyxl en modo write_only.
+FORMATOS_EXPORTACION = ('xlsx', 'csv', 'jsonl')
+
+def _pico_memoria_mb():
+    """Pico de memoria residente del proceso en MB (None si el sistema no lo informa, p. ej. en Windows)."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024 # macOS informa bytes; Linux, KB
+
+@contextmanager
+def _escritor_exportacion(ruta, formato):
+    """Abre la salida y entrega una función que escribe una lista de filas (listas en el orden de COLUMNAS_REGISTRO)."""
+    if formato == 'xlsx':
+        from openpyxl import Workbook
+        libro = Workbook(write_only=True)
+        hoja = libro.create_sheet('registro')
+        hoja.append(COLUMNAS_REGISTRO)
+        def escribir(filas):
+            for fila in filas:
+                hoja.append(fila)
+        yield escribir
+        libro.save(ruta)
+    else:
+        with open(ruta, 'w', encoding='utf-8', newline='') as f:
+            if formato == 'csv':
+                escritor = csv.writer(f)
+                escritor.writerow(COLUMNAS_REGISTRO)
+                yield escritor.writerows
+            else:
+                def escribir(filas):
+                    f.writelines(json.dumps(dict(zip(COLUMNAS_REGISTRO, fila)), ensure_ascii=False) + '\n'
+                                 for fila in filas)
+                yield escribir
+
+@instrumentar
+def exportar_registro(ruta, desde=None, hasta=None, empleado=None, cargo=None):
+    """Exporta a ruta (.xlsx, .csv o .jsonl) las filas del rango de fechas, opcionalmente de un empleado
+    o de un cargo. Retorna {'filas', 'segundos', 'filas_por_segundo', 'pico_memoria_mb'}."""
+    formato = os.path.splitext(ruta)[1].lower().lstrip('.')
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato de exportación no soportado: '{formato}'. Use {', '.join(FORMATOS_EXPORTACION)}.")
+    empleado = str(empleado).upper().strip() if empleado else None
+    cargo = cargo.lower().strip() if cargo else None
+    inicio = time.perf_counter()
+    filas = 0
+    with _escritor_exportacion(ruta, formato) as escribir:
+        for bloque in obtener_almacen().iterar(desde, hasta):
+            if empleado is not None:
+                bloque = bloque[bloque['id empleado'] == empleado]
+            if cargo is not None:
+                bloque = bloque[bloque['cargo'].astype(str).str.lower().str.strip() == cargo]
+            bloque = registro_como_texto(bloque.reindex(columns=COLUMNAS_REGISTRO))
+            with _fase('escritura_exportacion'):
+                escribir([[_valor_sql(v) for v in fila] for fila in bloque.itertuples(index=False)])
+            filas += len(bloque)
+    _registrar_io(bytes_escritos=os.path.getsize(ruta), filas=filas, archivos=1)
+    segundos = time.perf_counter() - inicio
+    resultado = {
+        'filas': filas,
+        'segundos': round(segundos, 3),
+        'filas_por_segundo': round(filas / segundos) if segundos > 0 else None,
+        'pico_memoria_mb': _pico_memoria_mb(),
+    }
+    memoria = f"{resultado['pico_memoria_mb']:.0f} MB" if resultado['pico_memoria_mb'] is not None else "no disponible"
+    bitacora.info("Exportadas %s fila(s) a '%s' en %.2f s (%s filas/s, pico de memoria %s).",
+                  filas, ruta, segundos, resultado['filas_por_segundo'] or 0, memoria)
+    return resultado
+
+# --- EXPORTACIÓN INCREMENTAL ---
+# Antes de guardar, cada fila que cambia se anota (id, fecha) en ARCHIVO_CAMBIOS. La exportación
+# incremental lee ese archivo desde la marca (offset en bytes) de la exportación anterior y emite solo
+# esas filas, así su costo depende de lo que cambió y no del tamaño del historial. El archivo de salida
+# se nombra por el rango de offsets: repetir una exportación interrumpida produce el mismo archivo.
+ARCHIVO_CAMBIOS = 'registro_cambios.jsonl'
+DIRECTORIO_EXPORTACION = 'exportacion'
+FORMATOS_INCREMENTALES = ('csv', 'parquet')
+
+def _anotar_cambios(registros, directorio=''):
+    """Anota en ARCHIVO_CAMBIOS las filas que se van a guardar y lo fuerza a disco (si REGISTRO_CAMBIOS)."""
+    if not REGISTRO_CAMBIOS:
+        return
+    texto = ''.join(json.dumps({'id empleado': r['id empleado'], 'fecha': r['fecha']}, ensure_ascii=False) + '\n'
+                    for r in registros)
+    with _fase('fsync_cambios'), open(os.path.join(directorio, ARCHIVO_CAMBIOS), 'a', encoding='utf-8') as f:
+        f.write(texto)
+        f.flush()
+        os.fsync(f.fileno())
+    _registrar_io(bytes_escritos=len(texto.encode('utf-8')), archivos=1)
+
+def _cambios_desde(offset):
+    """Claves (id, fecha) anotadas desde offset y el offset tras la última línea completa."""
+    claves = set()
+    if not os.path.exists(ARCHIVO_CAMBIOS):
+        return claves, offset
+    with open(ARCHIVO_CAMBIOS, 'rb') as f:
+        f.seek(offset)
+        for linea in f:
+            if not linea.endswith(b'\n'):
+                break # Escritura a medias: queda para la próxima exportación
+            offset += len(linea)
+            cambio = json.loads(linea)
+            claves.add((cambio['id empleado'], cambio['fecha']))
+    return claves, offset
+
+def _ruta_marca_exportacion(directorio):
+    return os.path.join(directorio, 'marca.json')
+
+def _leer_marca_exportacion(directorio):
+    try:
+        with open(_ruta_marca_exportacion(directorio), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _guardar_marca_exportacion(directorio, marca):
+    _guardar_json_atomico(_ruta_marca_exportacion(directorio), marca)
+
+def _escribir_exportacion(df, ruta, formato):
+    df = df.reindex(columns=COLUMNAS_REGISTRO)
+    if formato == 'parquet':
+        try:
+            df.to_parquet(ruta, index=False)
+        except ImportError as e:
+            raise RuntimeError(f"La exportación a Parquet necesita pyarrow ('pip install pyarrow'): {e}") from e
+    else:
+        df.to_csv(ruta, index=False)
+
+@instrumentar
+def exportar_incremental(formato='csv', directorio=None):
+    """Exporta las filas nuevas o modificadas desde la exportación anterior y avanza la marca.
+    La primera vez (sin marca) exporta el registro completo. Retorna la ruta escrita o None si no hubo cambios."""
+    if formato not in FORMATOS_INCREMENTALES:
+        raise ValueError(f"Formato no soportado: '{formato}'. Use {', '.join(FORMATOS_INCREMENTALES)}.")
+    if not REGISTRO_CAMBIOS:
+        raise RuntimeError("La exportación incremental necesita REGISTRO_CAMBIOS = True en todas las terminales.")
+    directorio = directorio or DIRECTORIO_EXPORTACION
+    os.makedirs(directorio, exist_ok=True)
+    marca = _leer_marca_exportacion(directorio)
+    desde = marca['offset'] if marca else 0
+    claves, hasta = _cambios_desde(desde)
+    if marca and not claves:
+        bitacora.info("Exportación incremental: sin cambios desde la anterior.")
         return None
-    return df.loc[idx_row].to_dict()
+
+    ruta = os.path.join(directorio, f"registro_{desde:012d}-{hasta:012d}.{formato}")
+    almacen = obtener_almacen()
+    if marca is None:
+        filas = registro_como_texto(almacen.leer())
+    else:
+        fechas = sorted({fecha for _, fecha in claves})
+        bloques = []
+        for bloque in almacen.iterar(fechas[0], fechas[-1]):
+            bloque = registro_como_texto(bloque)
+            en_cambios = [clave in claves for clave in zip(bloque['id empleado'], bloque['fecha'])]
+            bloques.append(bloque[en_cambios])
+        filas = pd.concat(bloques, ignore_index=True) if bloques else pd.DataFrame(columns=COLUMNAS_REGISTRO)
+    with _fase('escritura_exportacion'):
+        _escribir_exportacion(filas, ruta, formato)
+    _registrar_io(bytes_escritos=os.path.getsize(ruta), filas=len(filas), archivos=1)
+    _guardar_marca_exportacion(directorio, {'offset': hasta, 'archivo': os.path.basename(ruta),
+                                            'filas': len(filas), 'fecha': datetime.now().isoformat(timespec='seconds')})
+    bitacora.info("Exportación incremental: %s fila(s) en '%s'.", len(filas), ruta)
+    return ruta
+
+# --- ARCHIVO COLUMNAR ---
+# Los meses cerrados no cambian, pero cada análisis los vuelve a leer del xlsx, el formato más lento
+# que lee pandas. archivar_meses() guarda cada mes cerrado en DIRECTORIO_ARCHIVO/AAAA-MM.npz, un archivo
+# columnar comprimido de NumPy: textos repetidos como categorías (códigos + valores), fecha como
+# datetime64[D] y las horas como segundos desde medianoche. cargar_archivo() solo descomprime las
+# columnas pedidas de los meses del rango. El almacén configurado sigue siendo la fuente de verdad.
+DIRECTORIO_ARCHIVO = 'archivo'
+
+def _ruta_archivo_mes(mes, directorio=''):
+    return os.path.join(directorio, DIRECTORIO_ARCHIVO, f"{mes}.npz")
+
+def _ultimo_dia_mes(mes):
+    """'AAAA-MM' -> 'AAAA-MM-DD' con el último día de ese mes."""
+    anio, numero = (int(parte) for parte in mes.split('-'))
+    return f"{mes}-{calendar.monthrange(anio, numero)[1]:02d}"
+
+def _meses_archivados():
+    if not os.path.isdir(DIRECTORIO_ARCHIVO):
+        return []
+    return sorted(nombre[:-len('.npz')] for nombre in os.listdir(DIRECTORIO_ARCHIVO) if nombre.endswith('.npz'))
+
+def _guardar_archivo_mes(df, ruta):
+    """Codifica las filas de un mes por columnas y las guarda comprimidas en ruta."""
+    columnas = {'fecha': df['fecha'].astype(str).str[:10].to_numpy().astype('datetime64[D]')}
+    for col in COLUMNAS_CATEGORICAS:
+        categorias = pd.Categorical(df[col].astype('string')) # Las celdas vacías quedan con código -1, no como 'nan'
+        columnas[f"{col}/codigos"] = categorias.codes.astype(np.int32)
+        columnas[f"{col}/categorias"] = np.asarray(categorias.categories, dtype=str)
+    for col in COLUMNAS_HORA:
+        columnas[col] = np.nan_to_num(_segundos_del_dia(df[col]), nan=-1).astype(np.int32) # -1: sin marcar
+    for col in ('jornada horas', *COLUMNAS_CALCULADAS):
+        columnas[col] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64)
+    with _fase('escritura_archivo'):
+        np.savez_compressed(ruta, **columnas)
+    _registrar_io(bytes_escritos=os.path.getsize(ruta), filas=len(df), archivos=1)
+
+@instrumentar
+def archivar_meses(hasta_mes=None, forzar=False):
+    """Archiva los meses cerrados (anteriores al actual, o hasta hasta_mes 'AAAA-MM' incluido) que aún no
+    lo estén; con forzar=True los vuelve a archivar. Retorna {mes: filas archivadas}."""
+    hasta_mes = hasta_mes or (datetime.now().replace(day=1) - timedelta(days=1)).strftime('%Y-%m')
+    ya_archivados = set() if forzar else set(_meses_archivados())
+    por_mes = {}
+    for bloque in obtener_almacen().iterar(hasta=_ultimo_dia_mes(hasta_mes)):
+        meses = bloque['fecha'].astype(str).str[:7]
+        for mes, filas in bloque.groupby(meses):
+            if mes not in ya_archivados:
+                por_mes.setdefault(mes, []).append(filas)
+    os.makedirs(DIRECTORIO_ARCHIVO, exist_ok=True)
+    resumen = {}
+    for mes, bloques in sorted(por_mes.items()):
+        filas = pd.concat(bloques, ignore_index=True).reindex(columns=COLUMNAS_REGISTRO)
+        _guardar_archivo_mes(filas, _ruta_archivo_mes(mes))
+        resumen[mes] = len(filas)
+        bitacora.info("Mes %s archivado: %s fila(s).", mes, len(filas))
+    bitacora.info("Archivo columnar: %s mes(es) nuevo(s) en '%s'.", len(resumen), DIRECTORIO_ARCHIVO)
+    return resumen
+
+def invalidar_archivo(fechas, directorio=''):
+    """Borra el archivo de los meses de esas fechas para que se vuelvan a archivar con los datos nuevos."""
+    for mes in {str(fecha)[:7] for fecha in fechas}:
+        ruta = _ruta_archivo_mes(mes, directorio)
+        if os.path.exists(ruta):
+            os.remove(ruta)
+            bitacora.warning("Archivo del mes %s invalidado; vuelva a ejecutar 'archivar'.", mes)
+
+@instrumentar
+def cargar_archivo(desde=None, hasta=None, columnas=None, horas_como_texto=False):
+    """Lee del archivo columnar las filas del rango de fechas, solo con las columnas pedidas.
+    Las columnas de hora salen como timedelta (o como texto 'HH:MM:SS' con horas_como_texto=True)
+    y los textos repetidos como category."""
+    columnas = list(columnas or COLUMNAS_REGISTRO)
+    bloques = []
+    for mes in _meses_archivados():
+        if (desde is not None and mes < desde[:7]) or (hasta is not None and mes > hasta[:7]):
+            continue
+        ruta = _ruta_archivo_mes(mes)
+        _registrar_io(bytes_leidos=os.path.getsize(ruta), archivos=1)
+        with _fase('lectura_archivo'), np.load(ruta, allow_pickle=False) as npz:
+            fechas = npz['fecha']
+            filtro = np.ones(len(fechas), dtype=bool)
+            if desde is not None:
+                filtro &= fechas >= np.datetime64(desde, 'D')
+            if hasta is not None:
+                filtro &= fechas <= np.datetime64(hasta, 'D')
+            bloque = {}
+            for col in columnas:
+                if col == 'fecha':
+                    bloque[col] = np.datetime_as_string(fechas[filtro], unit='D')
+                elif col in COLUMNAS_CATEGORICAS:
+                    bloque[col] = pd.Categorical.from_codes(npz[f"{col}/codigos"][filtro], npz[f"{col}/categorias"])
+                elif col in COLUMNAS_HORA:
+                    segundos = npz[col][filtro].astype(float)
+                    segundos[segundos < 0] = np.nan
+                    bloque[col] = pd.to_timedelta(segundos, unit='s')
+                else:
+                    bloque[col] = npz[col][filtro]
+        _registrar_io(filas=int(filtro.sum()))
+        bloques.append(pd.DataFrame(bloque, columns=columnas))
+    if not bloques:
+        return pd.DataFrame(columns=columnas)
+    df = pd.concat(bloques, ignore_index=True)
+    for col in COLUMNAS_CATEGORICAS:
+        if col in df.columns: # concat pierde el tipo category si las categorías difieren entre meses
+            df[col] = df[col].astype('category')
+    if horas_como_texto:
+        for col in COLUMNAS_HORA:
+            if col in df.columns:
+                segundos = df[col].dt.total_seconds()
+                texto = _hhmmss_vectorizado(segundos.fillna(0).astype(int))
+                df[col] = texto.where(segundos.notna())
+    return df
+
+# --- INGESTA MASIVA ---
+# Carga marcas en bloque (lectores de torniquete, tarjetas antiguas) desde un CSV con las columnas
+# 'id empleado', 'fecha hora' y 'evento' (y opcionalmente 'jornada horas'). Aplica las mismas reglas que
+# registrar_evento (una entrada por día, ningún evento sin entrada), calcula las columnas derivadas con
+# recalcular_tiempos y guarda todo en una sola escritura. Las marcas rechazadas van a un CSV con su motivo.
+COLUMNAS_INGESTA = ['id empleado', 'fecha hora', 'evento']
+
+@instrumentar
+def ingerir_marcas(ruta, ruta_rechazos=None, formato_fecha='ISO8601', simular=False):
+    """Valida y guarda las marcas del CSV ruta. Si en un mismo día se repite un evento posterior a la
+    entrada, queda el último, igual que al registrarlos uno a uno. Con simular=True solo valida.
+    Retorna {'marcas', 'aceptadas', 'rechazadas', 'filas', 'rechazos'}."""
+    marcas = pd.read_csv(ruta, dtype=str, keep_default_na=False)
+    marcas.columns = marcas.columns.str.lower().str.strip()
+    faltantes = [col for col in COLUMNAS_INGESTA if col not in marcas.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en '{ruta}': {', '.join(faltantes)}.")
+    columnas_originales = list(marcas.columns)
+    _registrar_io(bytes_leidos=os.path.getsize(ruta), filas=len(marcas), archivos=1)
+
+    marcas['id empleado'] = marcas['id empleado'].str.upper().str.strip()
+    marcas['evento'] = marcas['evento'].str.lower().str.strip()
+    momento = pd.to_datetime(marcas['fecha hora'].str.strip(), errors='coerce', format=formato_fecha)
+    marcas['fecha'] = momento.dt.strftime('%Y-%m-%d')
+    marcas['hora'] = momento.dt.strftime('%H:%M:%S')
+    empleados = _cargar_indice_empleados()
+
+    motivos = pd.Series('', index=marcas.index, dtype=object)
+    def rechazar(mascara, motivo):
+        motivos[mascara & (motivos == '')] = motivo
+    rechazar(momento.isna(), "fecha hora no válida")
+    rechazar(~marcas['evento'].isin(EVENTOS_REGISTRO), "evento desconocido")
+    rechazar(~marcas['id empleado'].isin(list(empleados)), "id de empleado no encontrado")
+    # Jornada de cada entrada: la del CSV, si no la del empleado y si no JORNADA_POR_DEFECTO_HORAS
+    jornada = (marcas['jornada horas'].str.strip() if 'jornada horas' in marcas.columns
+               else pd.Series('', index=marcas.index, dtype=object))
+    jornada = jornada.where(jornada != '', marcas['id empleado'].map(lambda i: empleados.get(i, {}).get('jornada horas')))
+    sin_jornada = jornada.isna() | (jornada.astype(str).str.strip() == '')
+    horas_jornada = pd.to_numeric(jornada.where(~sin_jornada), errors='coerce')
+    rechazar((marcas['evento'] == 'entrada') & ~sin_jornada & horas_jornada.isna(), "jornada horas no válida")
+    marcas['jornada'] = horas_jornada.fillna(float(JORNADA_POR_DEFECTO_HORAS))
+
+    # Reglas de registrar_evento, por (id, fecha) en orden de hora
+    validas = marcas[motivos == ''].sort_values(['id empleado', 'fecha', 'hora'], kind='stable')
+    existentes = {}
+    if not validas.empty:
+        claves_marcas = set(zip(validas['id empleado'], validas['fecha']))
+        for registro in registro_como_texto(obtener_almacen().leer(validas['fecha'].min(), validas['fecha'].max())).to_dict('records'):
+            clave = (registro['id empleado'], registro['fecha'])
+            if clave in claves_marcas:
+                existentes.setdefault(clave, registro)
+    dia = validas['id empleado'] + '|' + validas['fecha']
+    ya_registrado = pd.Series([clave in existentes for clave in zip(validas['id empleado'], validas['fecha'])],
+                              index=validas.index, dtype=bool)
+    es_entrada = validas['evento'] == 'entrada'
+    entrada_valida = es_entrada & ~ya_registrado & (es_entrada.groupby(dia).cumsum() == 1)
+    dia_abierto = ya_registrado | (entrada_valida.groupby(dia).cumsum() > 0)
+    rechazar((es_entrada & ~entrada_valida).reindex(marcas.index, fill_value=False), "entrada ya registrada ese día")
+    rechazar((~es_entrada & ~dia_abierto).reindex(marcas.index, fill_value=False), "evento sin entrada previa ese día")
+    aceptadas = validas[motivos.loc[validas.index] == '']
+
+    registros = {}
+    eventos_por_dia = {}
+    for marca in aceptadas[aceptadas['evento'] == 'entrada'].to_dict('records'):
+        datos = empleados[marca['id empleado']]
+        clave = (marca['id empleado'], marca['fecha'])
+        registros[clave] = _nuevo_registro(marca['id empleado'], datos.get('nombre completo', 'N/A'),
+                                           datos.get('cargo', 'N/A'), marca['fecha'], marca['hora'],
+                                           float(marca['jornada']))
+        eventos_por_dia[clave] = ['entrada']
+    posteriores = aceptadas[aceptadas['evento'] != 'entrada']
+    ultimas = posteriores.groupby(['id empleado', 'fecha', 'evento'])['hora'].last().items()
+    # groupby ordena los eventos alfabéticamente; se anotan en el orden del día para que el diario
+    # y la replicación los reproduzcan como si se hubieran registrado uno a uno
+    for (id_empleado, fecha, evento), hora in sorted(ultimas, key=lambda m: (EVENTOS_REGISTRO.index(m[0][2]), m[1])):
+        clave = (id_empleado, fecha)
+        if clave not in registros:
+            registros[clave] = dict(existentes[clave])
+        registros[clave][COLUMNAS_POR_EVENTO[evento][0]] = hora
+        eventos_por_dia.setdefault(clave, []).append(evento)
+
+    ruta_rechazos = ruta_rechazos or os.path.splitext(ruta)[0] + '_rechazos.csv'
+    rechazadas = marcas.loc[motivos != '', columnas_originales].assign(motivo=motivos[motivos != ''])
+    rechazadas.to_csv(ruta_rechazos, index=False)
+
+    eventos = []
+    if registros:
+        calculados = recalcular_tiempos(pd.DataFrame(list(registros.values()), columns=COLUMNAS_REGISTRO))
+        for clave, registro in zip(registros, calculados.to_dict('records')):
+            for col in ('tiempo almuerzo minutos', 'tiempo extra minutos'):
+                registro[col] = _valor_calculado(registro[col])
+            eventos.extend((registro, evento) for evento in eventos_por_dia[clave])
+    if eventos and not simular:
+        finales = list({id(registro): registro for registro, _ in eventos}.values())
+        _anotar_cambios(finales)
+        obtener_almacen().guardar_lote(eventos)
+        _anotar_replicacion(eventos)
+        invalidar_archivo({registro['fecha'] for registro in finales})
+        actualizar_resumen(finales)
+
+    resultado = {'marcas': len(marcas), 'aceptadas': len(aceptadas), 'rechazadas': len(rechazadas),
+                 'filas': len(registros), 'rechazos': ruta_rechazos}
+    bitacora.info("Ingesta de '%s': %s marca(s) aceptadas en %s fila(s), %s rechazada(s) en '%s'%s",
+                  ruta, resultado['aceptadas'], resultado['filas'], resultado['rechazadas'], ruta_rechazos,
+                  " (simulación, sin guardar)." if simular else ".")
+    return resultado
+
+# --- REPLICACIÓN ENTRE NODOS ---
+# El intercambio de eventos está en replicacion.py; aquí se arman los nodos con el almacén configurado.
+
+def _guardar_filas(almacen, eventos, filas, directorio='', resumen=None):
+    """Guarda en almacen las filas fusionadas por la replicación, con los mismos pasos que un evento propio."""
+    _anotar_cambios(filas, directorio)
+    almacen.guardar_lote(eventos)
+    invalidar_archivo({registro['fecha'] for registro in filas}, directorio)
+    actualizar_resumen(filas, resumen)
+
+def _nodo_local():
+    """El nodo de la carpeta de trabajo, con el almacén y el resumen activos."""
+    almacen = obtener_almacen()
+    return {'directorio': os.getcwd(), 'almacen': almacen, 'guardar': functools.partial(_guardar_filas, almacen),
+            'replicacion': _estado_replicacion()}
+
+@contextmanager
+def _abrir_nodo(directorio):
+    """Otro nodo con su propio almacén y resumen, con todas las rutas dentro de directorio. No cambia la
+    carpeta de trabajo: os.chdir afectaría a todos los hilos (E/S, escritura diferida, servidor)."""
+    almacen = _crear_almacen(directorio)
+    resumen = None
+    try:
+        if RESUMEN_PERIODOS:
+            resumen = ResumenPeriodos(os.path.join(directorio, ARCHIVO_RESUMEN), almacen)
+        yield {'directorio': directorio, 'almacen': almacen,
+               'guardar': functools.partial(_guardar_filas, almacen, directorio=directorio, resumen=resumen),
+               'replicacion': _cargar_estado_replicacion(directorio)}
+    finally:
+        if resumen is not None:
+            resumen.cerrar()
+        almacen.cerrar()
+
+@instrumentar
+def iniciar_nodo(nombre, desde=None):
+    """Convierte la carpeta actual en el nodo `nombre`; desde ese momento se anotan sus eventos.
+    Con desde (carpeta de otro nodo) copia además su registro completo y sus eventos (instantánea)."""
+    _marcar_nodo(nombre)
+    bitacora.info("Carpeta '%s' iniciada como nodo '%s'.", os.getcwd(), nombre)
+    if desde:
+        almacen_par = _crear_almacen(desde)
+        try:
+            instantanea = registro_como_texto(almacen_par.leer())
+        finally:
+            almacen_par.cerrar()
+        local = _nodo_local()
+        filas = _fusionar_en_almacen([ev for registro in instantanea.to_dict('records') for ev in _eventos_de_fila(registro)],
+                                     local)
+        bitacora.info("Instantánea de '%s': %s fila(s), %s nueva(s) o cambiada(s).", desde, len(instantanea), len(filas))
+        _recibir_de(local, desde)
+
+@instrumentar
+def sincronizar(directorio_par):
+    """Intercambia con el nodo de directorio_par los eventos que le faltan a cada uno.
+    Retorna {'recibidos': n, 'enviados': n}."""
+    local = os.getcwd()
+    if os.path.abspath(directorio_par) == local:
+        raise ValueError("No se puede sincronizar un nodo consigo mismo.")
+    recibidos = _recibir_de(_nodo_local(), directorio_par)
+    with _abrir_nodo(directorio_par) as par:
+        enviados = _recibir_de(par, local)
+    return {'recibidos': recibidos, 'enviados': enviados}
+
+# --- TABLERO DE SUPERVISIÓN ---
+# El tablero muestra a todos los que tienen entrada hoy y aún no marcaron salida. Se carga una vez con
+# cargar_tablero() y después cambios_tablero() lee ARCHIVO_CAMBIOS desde el offset anterior y solo busca
+# las filas que cambiaron, sin volver a leer el registro (con REGISTRO_CAMBIOS = False relee el día). Las horas llegan ya convertidas a segundos del
+# día para que la interfaz calcule los estados de cada segundo sin strptime.
+INTERVALO_TABLERO_MS = 1000
+
+def _fila_tablero(registro):
+    jornada = pd.to_numeric(registro.get('jornada horas'), errors='coerce')
+    return {
+        'id empleado': registro['id empleado'],
+        'nombre completo': str(registro.get('nombre completo', 'N/A')),
+        'cargo': str(registro.get('cargo', 'N/A')),
+        'entrada': _segundos_hora(registro.get('hora entrada')),
+        'inicio almuerzo': _segundos_hora(registro.get('hora inicio almuerzo')),
+        'fin almuerzo': _segundos_hora(registro.get('hora fin almuerzo')),
+        'jornada': int((float(jornada) if pd.notna(jornada) else JORNADA_POR_DEFECTO_HORAS) * 3600),
+    }
+
+def _en_turno(registro):
+    return pd.isna(registro.get('hora salida')) and _segundos_hora(registro.get('hora entrada')) is not None
+
+@instrumentar
+def cargar_tablero():
+    """Estado inicial del tablero: {'fecha', 'offset', 'filas': {id: fila}} con quienes están en turno hoy."""
+    hoy = datetime.now().strftime('%Y-%m-%d')
+    # El offset se toma antes de leer: un cambio que llegue durante la lectura se vuelve a pedir después
+    offset = os.path.getsize(ARCHIVO_CAMBIOS) if os.path.exists(ARCHIVO_CAMBIOS) else 0
+    filas = _filas_en_turno(hoy)
+    bitacora.info("Tablero cargado: %s empleado(s) en turno.", len(filas))
+    return {'fecha': hoy, 'offset': offset, 'filas': filas}
+
+def _filas_en_turno(fecha):
+    """{id: fila del tablero} de quienes tienen entrada y no salida en `fecha`, leyendo el día completo."""
+    filas = {}
+    for registro in registro_como_texto(obtener_almacen().leer(fecha, fecha)).to_dict('records'):
+        registro['id empleado'] = str(registro['id empleado']).upper().strip()
+        if _en_turno(registro):
+            filas[registro['id empleado']] = _fila_tablero(registro)
+    return filas
+
+@instrumentar
+def cambios_tablero(fecha, offset, repasar=()):
+    """Filas de `fecha` anotadas en ARCHIVO_CAMBIOS desde offset. Los cambios se anotan antes de guardarse,
+    así que los ids de repasar (los del sondeo anterior) se vuelven a buscar por si otra terminal aún
+    no había terminado de escribir. Retorna {'offset', 'filas': {id: fila}, 'retirados': [ids], 'ids': [ids]};
+    sin REGISTRO_CAMBIOS, 'filas' trae el tablero completo y 'completo' es True."""
+    if not REGISTRO_CAMBIOS:
+        return {'offset': offset, 'filas': _filas_en_turno(fecha), 'retirados': [], 'ids': [], 'completo': True}
+    claves, offset = _cambios_desde(offset)
+    ids = sorted({id_empleado for id_empleado, f in claves if f == fecha})
+    almacen = obtener_almacen()
+    filas = {}
+    retirados = []
+    for id_empleado in sorted(set(ids) | set(repasar)):
+        registro = almacen.buscar(id_empleado, fecha)
+        if registro is not None and _en_turno(registro):
+            filas[id_empleado] = _fila_tablero(registro)
+        else:
+            retirados.append(id_empleado)
+    return {'offset': offset, 'filas': filas, 'retirados': retirados, 'ids': ids}
+
+def estado_tablero(fila, ahora):
+    """(estado, segundos trabajados, segundos de almuerzo) de una fila del tablero a la hora `ahora`
+    (segundos del día). Estados: 'almuerzo excedido', 'jornada cumplida', 'en almuerzo' o 'trabajando'."""
+    inicio, fin = fila['inicio almuerzo'], fila['fin almuerzo']
+    estado = None
+    if inicio is not None and fin is None:
+        almuerzo = max(0, ahora - inicio)
+        estado = 'almuerzo excedido' if almuerzo > DURACION_ALMUERZO_MINUTOS * 60 else 'en almuerzo'
+    else:
+        almuerzo = fin - inicio if inicio is not None and fin is not None else 0
+    trabajado = max(0, ahora - fila['entrada'] - almuerzo)
+    if estado is None:
+        estado = 'jornada cumplida' if trabajado >= fila['jornada'] else 'trabajando'
+    return estado, trabajado, almuerzo
+
+# --- E/S EN SEGUNDO PLANO ---
+INTERVALO_SONDEO_MS = 15 # Cada cuánto revisa la interfaz si terminó una operación en segundo plano
+
+class TrabajadorES:
+    """Hilo dedicado a la E/S de datos. Las operaciones se encolan y se ejecutan en orden, una a la vez,
+    así que nunca compiten por el archivo de registro. enviar() devuelve un Future; los avisos que la
+    operación quiso mostrar quedan en futuro.avisos para mostrarlos desde el hilo de Tk.
+    Con un cliente, las operaciones de OPERACIONES_REMOTAS se ejecutan en el servidor de datos."""
+
+    def __init__(self, cliente=None):
+        self.cliente = cliente
+        self._cola = queue.Queue()
+        self._hilo = threading.Thread(target=self._bucle, name="trabajador-es", daemon=True)
+        self._hilo.start()
+
+    def enviar(self, funcion, *args, **kwargs):
+        if self.cliente is not None and getattr(funcion, '__name__', None) in OPERACIONES_REMOTAS:
+            funcion = functools.partial(self.cliente.llamar, funcion.__name__)
+        futuro = Future()
+        futuro.avisos = []
+        self._cola.put((futuro, funcion, args, kwargs))
+        return futuro
+
+    def _bucle(self):
+        while True:
+            tarea = self._cola.get()
+            if tarea is None:
+                break
+            futuro, funcion, args, kwargs = tarea
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            with capturar_avisos() as avisos:
+                try:
+                    resultado = funcion(*args, **kwargs)
+                except BaseException as e:
+                    futuro.avisos.extend(avisos)
+                    futuro.set_exception(e)
+                else:
+                    futuro.avisos.extend(avisos)
+                    futuro.set_result(resultado)
+
+    def detener(self):
+        """Termina las operaciones ya encoladas y detiene el hilo."""
+        self._cola.put(None)
+        self._hilo.join()
+
+# --- SERVIDOR LOCAL ---
+# `python Registros_base.py servidor` atiende estas operaciones por HTTP (servidor_datos.py) como único dueño
+# de los datos; con SERVIDOR_DATOS = 'host:puerto' la interfaz las llama con ClienteDatos.
+OPERACIONES_REMOTAS = {funcion.__name__: funcion for funcion in (
+    precargar_datos, consultar_login, registrar_entrada, registrar_evento, cargar_estado_turno,
+    registrar_entradas_lote, obtener_datos_empleado, verificar_registro_hoy, obtener_registro_actual,
+    cargar_tablero, cambios_tablero,
+)}
+
+def servir(host='127.0.0.1', puerto=PUERTO_SERVIDOR):
+    """Ejecuta el servidor de datos hasta Ctrl+C; al salir guarda y cierra el almacén."""
+    if not inicializar_archivos():
+        return
+    precargar_datos()
+    servidor = _crear_servidor(host, puerto, OPERACIONES_REMOTAS, {'almacenamiento': ALMACENAMIENTO})
+    if threading.current_thread() is threading.main_thread():
+        # SIGTERM (p. ej. al detener el servicio) cierra igual que Ctrl+C; shutdown() debe llamarse desde otro hilo
+        signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=servidor.shutdown).start())
+    bitacora.info("Servidor de datos escuchando en %s:%s (almacenamiento '%s').", host, puerto, ALMACENAMIENTO)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        bitacora.info("Deteniendo el servidor de datos...")
+    finally:
+        servidor.server_close()
+        cerrar_almacen()
 
 # --- INTERFAZ GRÁFICA (GUI) ---
 
@@ -358,19 +1683,40 @@ class App(tk.Tk):
         self.geometry("900x700")
         self.configure(bg="#2c3e50")
 
+        # Toda la E/S de datos corre en este hilo para que la ventana no se congele
+        self.trabajador = TrabajadorES(ClienteDatos(SERVIDOR_DATOS) if SERVIDOR_DATOS else None)
+        self.protocol("WM_DELETE_WINDOW", self.al_cerrar)
+
         container = tk.Frame(self, bg="#2c3e50")
         container.pack(side="top", fill="both", expand=True)
         container.grid_rowconfigure(0, weight=1)
         container.grid_columnconfigure(0, weight=1)
 
         self.frames = {}
-        for F in (LoginPage, DashboardPage):
+        for F in (LoginPage, DashboardPage, TableroPage):
             page_name = F.__name__
             frame = F(parent=container, controller=self)
             self.frames[page_name] = frame
             frame.grid(row=0, column=0, sticky="nsew")
 
+        # Atajo oculto de administración: panel de métricas de las operaciones de datos
+        self.bind_all('<Control-Shift-KeyPress-M>', lambda event: MetricasDialog(self))
+        # Tablero de supervisión con todos los empleados en turno
+        self.bind_all('<Control-Shift-KeyPress-T>', lambda event: self.mostrar_tablero())
+
         self.show_frame("LoginPage")
+        self.after_idle(self.arranque_completado)
+
+    def arranque_completado(self):
+        """Mide cuánto tardó la ventana en estar lista y precarga los datos en segundo plano."""
+        self.update_idletasks()
+        TIEMPOS_ARRANQUE['ventana lista'] = time.perf_counter() - _INICIO_PROCESO
+        bitacora.info("Ventana lista %.3f s después de iniciar.", TIEMPOS_ARRANQUE['ventana lista'])
+        self.en_segundo_plano(precargar_datos, al_terminar=self.datos_precargados)
+
+    def datos_precargados(self, tiempos):
+        if tiempos:
+            bitacora.info("Tiempos de arranque: %s", ", ".join(f"{etapa} {segundos:.3f} s" for etapa, segundos in tiempos.items()))
 
     def show_frame(self, page_name, data=None):
         frame = self.frames[page_name]
@@ -378,46 +1724,69 @@ class App(tk.Tk):
             frame.set_data(data)
         frame.tkraise()
 
+    def mostrar_tablero(self):
+        self.show_frame("TableroPage")
+        self.frames["TableroPage"].iniciar()
+
+    def en_segundo_plano(self, funcion, *args, al_terminar=None, **kwargs):
+        """Ejecuta funcion en el hilo de E/S y llama a al_terminar(resultado) desde el hilo de Tk.
+        Si la operación lanza una excepción se informa al usuario y al_terminar recibe None."""
+        futuro = self.trabajador.enviar(funcion, *args, **kwargs)
+        self.after(INTERVALO_SONDEO_MS, self._esperar_resultado, futuro, al_terminar)
+        return futuro
+
+    def _esperar_resultado(self, futuro, al_terminar):
+        if not futuro.done():
+            self.after(INTERVALO_SONDEO_MS, self._esperar_resultado, futuro, al_terminar)
+            return
+        mostrar_avisos(futuro.avisos)
+        error = futuro.exception()
+        if error is not None:
+            bitacora.error("Error en operación en segundo plano: %s", error, exc_info=error)
+            messagebox.showerror("Error de Sistema", f"Ocurrió un error inesperado: {error}")
+        if al_terminar is not None:
+            al_terminar(futuro.result() if error is None else None)
+
+    def al_cerrar(self):
+        """Espera a que terminen las escrituras pendientes antes de cerrar la ventana."""
+        self.frames["LoginPage"].vaciar_lote_rapido()
+        self.trabajador.detener()
+        self.destroy()
+
     def handle_login_and_jornada(self, id_empleado, selected_jornada_horas):
-        print(f"handle_login_and_jornada llamado con ID: {id_empleado}, Jornada: {selected_jornada_horas}")
-        
+        bitacora.debug("handle_login_and_jornada llamado con ID: %s, Jornada: %s", id_empleado, selected_jornada_horas)
+        self.en_segundo_plano(registrar_entrada, id_empleado, selected_jornada_horas,
+                              al_terminar=lambda resultado: self._entrada_registrada(id_empleado, selected_jornada_horas, resultado))
+
+    def _entrada_registrada(self, id_empleado, selected_jornada_horas, resultado):
         try:
+            datos_empleado, registro_actual = resultado or (None, None)
             # Verificar que el empleado aún existe
-            datos_empleado = obtener_datos_empleado(id_empleado)
             if not datos_empleado:
                 messagebox.showerror("Error", "ID de empleado no encontrado.")
-                print("Error: ID de empleado no encontrado en handle_login_and_jornada.")
+                bitacora.error("Error: ID de empleado no encontrado en handle_login_and_jornada.")
                 return
                 
-            print("Datos de empleado obtenidos en handle_login_and_jornada.")
-            
-            # Intentar registrar la entrada
-            registro_actual = registrar_evento(id_empleado, "entrada", jornada_horas=selected_jornada_horas)
+            bitacora.debug("Datos de empleado obtenidos en handle_login_and_jornada.")
             
             if registro_actual:
-                print("Registro de entrada exitoso. Mostrando Dashboard.")
-                # Combinar datos del empleado con el registro
-                datos_completos = {**datos_empleado, **registro_actual}
-                
-                # Forzar la actualización de la ventana principal
-                self.update()
-                
+                bitacora.debug("Registro de entrada exitoso. Mostrando Dashboard.")
                 # Mostrar el dashboard
-                self.show_frame("DashboardPage", data=datos_completos)
+                self.show_frame("DashboardPage", data=datos_sesion(datos_empleado, registro_actual))
                 
                 # Mensaje de confirmación
                 messagebox.showinfo("Entrada Registrada", 
                                   f"¡Bienvenido {datos_empleado.get('nombre completo', '')}!\n"
                                   f"Entrada registrada exitosamente para jornada de {selected_jornada_horas} horas.")
             else:
-                print("Fallo al registrar evento de entrada.")
+                bitacora.error("Fallo al registrar evento de entrada.")
                 messagebox.showerror("Error", "No se pudo registrar la entrada. Intente nuevamente.")
                 
         except Exception as e:
-            print(f"Error en handle_login_and_jornada: {e}")
+            bitacora.error("Error en handle_login_and_jornada: %s", e, exc_info=True)
             messagebox.showerror("Error de Sistema", f"Ocurrió un error inesperado: {e}")
         
-        print("Fin de handle_login_and_jornada.")
+        bitacora.debug("Fin de handle_login_and_jornada.")
 
 
 class JornadaSelectionDialog(Toplevel):
@@ -481,31 +1850,73 @@ class JornadaSelectionDialog(Toplevel):
         self.focus_set()
 
     def on_confirm(self):
-        print("DEBUG: Entrando a JornadaSelectionDialog.on_confirm")
+        bitacora.debug("Entrando a JornadaSelectionDialog.on_confirm")
         selected_jornada = float(self.jornada_var.get())
-        print(f"Jornada seleccionada: {selected_jornada}")
+        bitacora.debug("Jornada seleccionada: %s", selected_jornada)
         
         # Liberar el grab antes de cualquier operación
         self.grab_release()
-        print("Grab released.")
+        bitacora.debug("Grab released.")
         
         try:
             # Llamar al callback con los parámetros correctos
             self.callback(self.id_empleado, selected_jornada)
-            print("Callback (handle_login_and_jornada) llamado exitosamente.")
+            bitacora.debug("Callback (handle_login_and_jornada) llamado exitosamente.")
         except Exception as e:
-            print(f"Error llamando al callback: {e}")
+            bitacora.error("Error llamando al callback: %s", e)
             messagebox.showerror("Error de Aplicación", f"Ocurrió un error al procesar la jornada: {e}")
         finally:
             # Asegurar que la ventana se cierre
             self.destroy()
-            print("JornadaSelectionDialog destruida.")
+            bitacora.debug("JornadaSelectionDialog destruida.")
 
     def on_closing(self):
         """Maneja el cierre de la ventana con la X"""
         self.grab_release()
         self.destroy()
 
+class MetricasDialog(Toplevel):
+    """Panel de administración con las métricas de las operaciones de datos (Ctrl+Shift+M)."""
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.transient(parent)
+        self.title("Métricas de operaciones")
+        self.geometry("1100x420")
+        self.configure(bg="#34495e")
+
+        button_font = font.Font(family="Helvetica", size=10, weight="bold")
+        self.texto = tk.Text(self, font=("Courier", 9), bg="#2c3e50", fg="#ecf0f1", wrap="none")
+        self.texto.pack(fill="both", expand=True, padx=10, pady=(10, 5))
+
+        button_frame = tk.Frame(self, bg="#34495e")
+        button_frame.pack(pady=(0, 10))
+        for texto, color, comando in (("Actualizar", "#3498db", self.actualizar),
+                                      ("Exportar JSON", "#27ae60", lambda: self.exportar(ARCHIVO_METRICAS)),
+                                      ("Exportar Prometheus", "#27ae60",
+                                       lambda: self.exportar(os.path.splitext(ARCHIVO_METRICAS)[0] + '.prom')),
+                                      ("Reiniciar", "#e74c3c", self.reiniciar)):
+            tk.Button(button_frame, text=texto, font=button_font, bg=color, fg="white",
+                      command=comando, width=18).pack(side="left", padx=5)
+
+        self.bind('<Escape>', lambda event: self.destroy())
+        self.actualizar()
+
+    def actualizar(self):
+        self.texto.configure(state="normal")
+        self.texto.delete("1.0", tk.END)
+        self.texto.insert(tk.END, resumen_metricas())
+        self.texto.configure(state="disabled")
+
+    def exportar(self, ruta):
+        try:
+            messagebox.showinfo("Métricas", f"Métricas exportadas a '{exportar_metricas(ruta)}'.", parent=self)
+        except OSError as e:
+            messagebox.showerror("Error", f"No se pudieron exportar las métricas: {e}", parent=self)
+
+    def reiniciar(self):
+        reiniciar_metricas()
+        self.actualizar()
+
 class LoginPage(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent, bg="#2c3e50")
@@ -527,43 +1938,81 @@ class LoginPage(tk.Frame):
         
         self.id_entry.bind("<Return>", self.login)
 
-        login_button = tk.Button(main_frame, text="Ingresar", font=button_font, bg="#2980b9", fg="#ecf0f1", command=self.login)
-        login_button.pack(pady=20, padx=50, ipadx=10, ipady=5)
+        self.login_button = tk.Button(main_frame, text="Ingresar", font=button_font, bg="#2980b9", fg="#ecf0f1", command=self.login)
+        self.login_button.pack(pady=20, padx=50, ipadx=10, ipady=5)
+        self.consulta_pendiente = False
+
+        # Modo turno: cada escaneo (los lectores tipo teclado terminan en Enter) se reconoce desde
+        # memoria con la jornada por defecto del empleado y las entradas se guardan en lotes
+        self.modo_rapido = tk.BooleanVar(self, value=False)
+        tk.Checkbutton(main_frame, text="Modo turno (escaneo rápido)", variable=self.modo_rapido,
+                       command=self.alternar_modo_rapido, font=label_font, fg="#ecf0f1", bg="#34495e",
+                       selectcolor="#2c3e50", activebackground="#34495e",
+                       activeforeground="#ecf0f1").pack(pady=(0, 15), padx=50)
+        self.panel_rapido = tk.Frame(main_frame, bg="#34495e")
+        self.lista_escaneos = tk.Listbox(self.panel_rapido, font=("Consolas", 11), width=55, height=8,
+                                         bg="#2c3e50", fg="#ecf0f1", highlightthickness=0)
+        self.lista_escaneos.pack(padx=20)
+        self.estado_rapido_label = tk.Label(self.panel_rapido, text="", font=("Arial", 10),
+                                            fg="#bdc3c7", bg="#34495e")
+        self.estado_rapido_label.pack(pady=(5, 15))
+        self.turno = None
+        self.cola_escaneos = deque()
+        self.procesando_escaneos = False
+        self.lote_pendiente = []
+        self.lote_id = None
+        self.latencias_escaneo = []
 
     def login(self, event=None):
+        if self.modo_rapido.get():
+            self.escanear()
+            return
+        if self.consulta_pendiente:
+            return
         id_empleado = self.id_entry.get().strip().upper()
-        print(f"Intento de login para ID: {id_empleado}")
+        bitacora.debug("Intento de login para ID: %s", id_empleado)
         
         if not id_empleado:
             messagebox.showwarning("Entrada Inválida", "Por favor, ingrese un ID.")
-            print("Advertencia: ID de empleado vacío.")
+            bitacora.warning("Advertencia: ID de empleado vacío.")
             return
         
-        # Verificar el estado del registro del empleado
-        estado_registro = verificar_registro_hoy(id_empleado)
+        # Verificar el estado del registro del empleado en segundo plano
+        self.set_pendiente(True)
+        self.controller.en_segundo_plano(consultar_login, id_empleado,
+                                         al_terminar=lambda resultado: self.continuar_login(id_empleado, resultado))
+
+    def set_pendiente(self, pendiente):
+        """Bloquea el formulario mientras se consulta el registro, sin congelar la ventana."""
+        self.consulta_pendiente = pendiente
+        self.login_button.config(text="Verificando..." if pendiente else "Ingresar",
+                                 state="disabled" if pendiente else "normal")
+
+    def continuar_login(self, id_empleado, resultado):
+        self.set_pendiente(False)
+        if resultado is None:
+            self.id_entry.delete(0, tk.END)
+            return
+        estado_registro, datos_empleado, registro_actual = resultado
         
         if estado_registro == 'completo':
             messagebox.showinfo("Registro Completo", "Este empleado ya completó su registro para hoy.")
-            print("Info: Empleado ya completó registro hoy.")
+            bitacora.info("Info: Empleado ya completó registro hoy.")
             self.id_entry.delete(0, tk.END)
             return
         
-        # Verificar que el empleado existe
-        datos_empleado = obtener_datos_empleado(id_empleado)
+        # Verificar que el empleado existe (consultar_login ya lo buscó en segundo plano)
         if not datos_empleado:
             messagebox.showerror("Error", "ID de empleado no encontrado.")
-            print("Error: ID de empleado no encontrado en la base de datos.")
+            bitacora.error("Error: ID de empleado no encontrado en la base de datos.")
             self.id_entry.delete(0, tk.END)
             return
         
         if estado_registro == 'parcial':
             # El empleado ya tiene entrada registrada, ir directo al dashboard
-            print("Empleado ya registrado hoy. Cargando dashboard directamente.")
-            registro_actual = obtener_registro_actual(id_empleado)
+            bitacora.debug("Empleado ya registrado hoy. Cargando dashboard directamente.")
             if registro_actual:
-                # Combinar datos del empleado con el registro actual
-                datos_completos = {**datos_empleado, **registro_actual}
-                self.controller.show_frame("DashboardPage", data=datos_completos)
+                self.controller.show_frame("DashboardPage", data=datos_sesion(datos_empleado, registro_actual))
                 messagebox.showinfo("Bienvenido de Nuevo", 
                                 f"¡Hola {datos_empleado.get('nombre completo', '')}!\n"
                                 f"Continuando con tu jornada laboral.")
@@ -571,7 +2020,7 @@ class LoginPage(tk.Frame):
                 messagebox.showerror("Error", "No se pudo cargar el registro actual.")
         else:
             # Empleado nuevo del día, pedir jornada laboral
-            print("Empleado nuevo del día. Abriendo diálogo de jornada.")
+            bitacora.debug("Empleado nuevo del día. Abriendo diálogo de jornada.")
             try:
                 # Crear y mostrar el diálogo de jornada
                 dialog = JornadaSelectionDialog(self.controller, id_empleado, 
@@ -584,25 +2033,258 @@ class LoginPage(tk.Frame):
                 dialog.wait_window()
                 
             except Exception as e:
-                print(f"Error al crear diálogo de jornada: {e}")
+                bitacora.error("Error al crear diálogo de jornada: %s", e)
                 messagebox.showerror("Error", f"Error al mostrar selección de jornada: {e}")
         
         # Limpiar el campo de entrada
         self.id_entry.delete(0, tk.END)
 
+    def alternar_modo_rapido(self):
+        if self.modo_rapido.get():
+            bitacora.info("Activando modo turno.")
+            self.panel_rapido.pack()
+            self.id_entry.config(state="disabled")
+            self.estado_rapido_label.config(text="Cargando estado del turno...")
+            self.controller.en_segundo_plano(cargar_estado_turno, al_terminar=self.estado_turno_cargado)
+        else:
+            bitacora.info("Desactivando modo turno.")
+            if self.lote_id:
+                self.after_cancel(self.lote_id)
+                self.lote_id = None
+            self.vaciar_lote_rapido()
+            bitacora.info("%s", self.resumen_latencias())
+            self.panel_rapido.pack_forget()
+            self.turno = None
+
+    def estado_turno_cargado(self, estado):
+        self.id_entry.config(state="normal")
+        self.id_entry.focus()
+        if estado is None:
+            self.modo_rapido.set(False)
+            self.panel_rapido.pack_forget()
+            return
+        self.turno = estado
+        self.latencias_escaneo = []
+        self.estado_rapido_label.config(text=f"Listo: {len(estado['empleados'])} empleados, "
+                                             f"{len(estado['presentes'])} con entrada hoy.")
+        self.lote_id = self.after(INTERVALO_LOTE_RAPIDO_MS, self.tick_lote_rapido)
+
+    def escanear(self):
+        """Encola el ID escaneado; el reconocimiento se hace en cuanto Tk queda libre."""
+        inicio = time.perf_counter()
+        id_empleado = self.id_entry.get().strip().upper()
+        self.id_entry.delete(0, tk.END)
+        if not id_empleado or self.turno is None:
+            return
+        self.cola_escaneos.append((id_empleado, inicio))
+        if not self.procesando_escaneos:
+            self.procesando_escaneos = True
+            self.after_idle(self.procesar_escaneos)
+
+    def procesar_escaneos(self):
+        while self.cola_escaneos:
+            id_empleado, inicio = self.cola_escaneos.popleft()
+            texto, color = self.reconocer_escaneo(id_empleado)
+            self.lista_escaneos.insert(0, texto)
+            self.lista_escaneos.itemconfig(0, fg=color)
+            self.lista_escaneos.delete(50, tk.END)
+            self.update_idletasks()
+            self.latencias_escaneo.append(time.perf_counter() - inicio)
+        self.procesando_escaneos = False
+        self.estado_rapido_label.config(text=self.resumen_latencias())
+
+    def reconocer_escaneo(self, id_empleado):
+        """Decide el resultado de un escaneo usando solo el estado en memoria del turno."""
+        ahora = datetime.now()
+        hoy = ahora.strftime('%Y-%m-%d')
+        hora_actual = ahora.strftime('%H:%M:%S')
+        if self.turno['fecha'] != hoy:
+            # Cambió el día: las entradas de ayer ya no cuentan como presentes
+            self.turno['fecha'] = hoy
+            self.turno['presentes'] = set()
+
+        datos_empleado = self.turno['empleados'].get(id_empleado)
+        if datos_empleado is None:
+            bitacora.warning("Modo turno: ID '%s' no encontrado.", id_empleado)
+            return f"✘ {hora_actual}  {id_empleado}: ID no encontrado", "#e74c3c"
+        nombre = datos_empleado.get('nombre completo', 'N/A')
+        if id_empleado in self.turno['presentes']:
+            return f"• {hora_actual}  {id_empleado} {nombre}: ya registrado hoy", "#f39c12"
+
+        jornada_horas = datos_empleado.get('jornada horas')
+        jornada_horas = float(jornada_horas) if pd.notna(jornada_horas) else float(JORNADA_POR_DEFECTO_HORAS)
+        self.turno['presentes'].add(id_empleado)
+        self.lote_pendiente.append(_nuevo_registro(id_empleado, nombre, datos_empleado.get('cargo', 'N/A'),
+                                                   hoy, hora_actual, jornada_horas))
+        if len(self.lote_pendiente) >= TAMANO_LOTE_RAPIDO:
+            self.vaciar_lote_rapido()
+        return f"✔ {hora_actual}  {id_empleado} {nombre} ({jornada_horas:g} h)", "#2ecc71"
+
+    def tick_lote_rapido(self):
+        self.vaciar_lote_rapido()
+        self.lote_id = self.after(INTERVALO_LOTE_RAPIDO_MS, self.tick_lote_rapido)
+
+    def vaciar_lote_rapido(self):
+        """Envía al hilo de E/S las entradas reconocidas que aún no se han guardado."""
+        if not self.lote_pendiente:
+            return
+        lote, self.lote_pendiente = self.lote_pendiente, []
+        bitacora.debug("Modo turno: guardando lote de %s entrada(s).", len(lote))
+        self.controller.en_segundo_plano(registrar_entradas_lote, lote,
+                                         al_terminar=lambda resultado: self.lote_guardado(lote, resultado))
+
+    def lote_guardado(self, lote, resultado):
+        if resultado is None:
+            # Se reintenta con el siguiente lote
+            self.lote_pendiente = lote + self.lote_pendiente
+            self.estado_rapido_label.config(text=f"No se pudo guardar un lote de {len(lote)} entrada(s); se reintentará.",
+                                            fg="#e74c3c")
+            return
+        if resultado['duplicados']:
+            bitacora.warning("Modo turno: entradas ya registradas en otra terminal: %s", resultado['duplicados'])
+        self.estado_rapido_label.config(fg="#bdc3c7")
+
+    def resumen_latencias(self):
+        """Latencia escaneo-reconocimiento (p50/p99) del modo turno."""
+        p = calcular_percentiles(self.latencias_escaneo)
+        if p[50] is None:
+            return "Sin escaneos."
+        return (f"{len(self.latencias_escaneo)} escaneo(s), latencia p50 {p[50] * 1000:.1f} ms, "
+                f"p99 {p[99] * 1000:.1f} ms, {len(self.lote_pendiente)} pendiente(s) de guardar")
+
+class MotorTemporizadores:
+    """Un solo ciclo de after() para todos los temporizadores de una pantalla.
+    vincular(etiqueta, calcular): en cada tick se llama calcular(ahora), con ahora = time.monotonic(), que
+    devuelve las opciones de la etiqueta ({'text': ..., 'fg': ...}); solo se aplican si cambiaron.
+    programar(segundos, accion, periodo=None) ejecuta accion() en ese instante (y después cada periodo
+    segundos) dentro del mismo ciclo y cancelar(evento) lo anula. El ciclo despierta cada intervalo_s o
+    antes si vence un evento. estadisticas cuenta ticks, su costo (con histograma) y las etiquetas actualizadas
+    u omitidas; son métricas de la interfaz y no se mezclan con las de la capa de datos (metricas())."""
+
+    def __init__(self, widget, intervalo_s=1.0):
+        self.widget = widget
+        self.intervalo_s = intervalo_s
+        self._etiquetas = [] # [etiqueta, calcular, opciones mostradas]
+        self._eventos = [] # Montículo de [instante, secuencia, accion, periodo, activo]
+        self._secuencia = 0
+        self._after_id = None
+        self._activo = False
+        self._ultimo_tick = None
+        self.reiniciar_estadisticas()
+
+    def reiniciar_estadisticas(self):
+        self.estadisticas = {'ticks': 0, 'tick_total_s': 0.0, 'tick_max_s': 0.0, 'mayor_intervalo_s': 0.0,
+                             'cubetas_tick': [0] * (len(LIMITES_HISTOGRAMA_S) + 1),
+                             'actualizaciones': 0, 'sin_cambios': 0, 'eventos': 0}
+
+    def vincular(self, etiqueta, calcular):
+        self._etiquetas.append([etiqueta, calcular, None])
+
+    def programar(self, segundos, accion, periodo=None):
+        self._secuencia += 1
+        evento = [time.monotonic() + segundos, self._secuencia, accion, periodo, True]
+        heapq.heappush(self._eventos, evento)
+        if self._after_id is not None:
+            self._agendar() # Puede vencer antes que el próximo tick
+        return evento
+
+    def cancelar(self, evento):
+        if evento is not None:
+            evento[4] = False
+
+    def iniciar(self):
+        self._activo = True
+        self._ultimo_tick = None
+        self._tick()
+
+    def detener(self):
+        """Cancela el ciclo y todos los eventos; la próxima vez las etiquetas se vuelven a escribir."""
+        self._activo = False
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        for evento in self._eventos:
+            evento[4] = False
+        self._eventos = []
+        for renglon in self._etiquetas:
+            renglon[2] = None
+
+    def _agendar(self):
+        siguiente = self._ultimo_tick + self.intervalo_s
+        while self._eventos and not self._eventos[0][4]:
+            heapq.heappop(self._eventos)
+        if self._eventos:
+            siguiente = min(siguiente, self._eventos[0][0])
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+        self._after_id = self.widget.after(max(0, round((siguiente - time.monotonic()) * 1000)), self._tick)
+
+    def _tick(self):
+        self._after_id = None
+        inicio = time.perf_counter()
+        ahora = time.monotonic()
+        if self._ultimo_tick is not None:
+            self.estadisticas['mayor_intervalo_s'] = max(self.estadisticas['mayor_intervalo_s'], ahora - self._ultimo_tick)
+        self._ultimo_tick = ahora
+
+        while self._eventos and self._eventos[0][0] <= ahora:
+            evento = heapq.heappop(self._eventos)
+            if not evento[4]:
+                continue
+            evento[2]()
+            self.estadisticas['eventos'] += 1
+            if evento[3] and evento[4]:
+                evento[0] = max(evento[0] + evento[3], ahora) # Sin ráfagas de recuperación tras una pausa
+                heapq.heappush(self._eventos, evento)
+
+        for renglon in self._etiquetas:
+            opciones = renglon[1](ahora)
+            if opciones is None or opciones == renglon[2]:
+                self.estadisticas['sin_cambios'] += 1
+                continue
+            renglon[0].config(**opciones)
+            renglon[2] = opciones
+            self.estadisticas['actualizaciones'] += 1
+
+        duracion = time.perf_counter() - inicio
+        self.estadisticas['ticks'] += 1
+        self.estadisticas['tick_total_s'] += duracion
+        self.estadisticas['tick_max_s'] = max(self.estadisticas['tick_max_s'], duracion)
+        self.estadisticas['cubetas_tick'][bisect.bisect_left(LIMITES_HISTOGRAMA_S, duracion)] += 1
+        if self._activo:
+            self._agendar()
+
+    def resumen(self):
+        e = self.estadisticas
+        medio = e['tick_total_s'] / e['ticks'] * 1000 if e['ticks'] else 0.0
+        p95 = _percentil_histograma({'conteo': e['ticks'], 'cubetas': e['cubetas_tick'], 'max_s': e['tick_max_s']}, 95)
+        return (f"{e['ticks']} tick(s), costo medio {medio:.3f} ms, p95≤ {p95 * 1000:.0f} ms, "
+                f"máximo {e['tick_max_s'] * 1000:.3f} ms, "
+                f"mayor intervalo {e['mayor_intervalo_s']:.3f} s, {e['actualizaciones']} etiqueta(s) actualizadas, "
+                f"{e['sin_cambios']} sin cambios, {e['eventos']} evento(s)")
+
 class DashboardPage(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent, bg="#ecf0f1")
         self.controller = controller
-        self.datos_empleado = {}
-        self.tiempo_almuerzo_restante = timedelta(minutes=DURACION_ALMUERZO_MINUTOS)
+        self.empleado = None # Empleado y RegistroDia de la sesión (ver datos_sesion)
+        self.registro = None
         self.almuerzo_activo = False
         self.alarma_almuerzo_on = False
-        self.mensaje_almuerzo_mostrado = False
-        self.inicio_almuerzo_time = None
-        self.timer_id = None
+        self.parpadeo_rojo = False
+        # Horas de la sesión convertidas una vez a instantes de time.monotonic() (ver preparar_temporizadores)
+        self.instantes = {'hora_entrada': None, 'hora_inicio_almuerzo': None, 'hora_fin_almuerzo': None}
+        self.jornada_s = 0.0
+        self.evento_alarma = None
+        self.evento_parpadeo = None
         
         self.crear_widgets()
+
+        # Los tres temporizadores y la alarma comparten un solo ciclo
+        self.motor = MotorTemporizadores(self)
+        self.motor.vincular(self.jornada_timer_label, self.texto_jornada_restante)
+        self.motor.vincular(self.almuerzo_timer_label, self.texto_almuerzo)
+        self.motor.vincular(self.total_timer_label, self.texto_tiempo_laborado)
         
     def crear_widgets(self):
         header_font = font.Font(family="Arial", size=24, weight="bold")
@@ -673,43 +2355,50 @@ class DashboardPage(tk.Frame):
                                     "¿Está seguro de que desea volver al login?\n"
                                     "Esto permitirá que otro empleado se registre.")
         if respuesta:
-            if self.timer_id:
-                self.after_cancel(self.timer_id)
-                self.timer_id = None
+            self.detener_timers()
             self.controller.show_frame("LoginPage")
 
+    def detener_timers(self):
+        """Cancela el ciclo de los temporizadores y la alarma e informa sus estadísticas."""
+        self.motor.detener()
+        self.evento_alarma = self.evento_parpadeo = None
+        if self.motor.estadisticas['ticks']:
+            bitacora.info("DashboardPage: temporizadores: %s", self.motor.resumen())
+        self.motor.reiniciar_estadisticas()
+
+    def set_boton_pendiente(self, boton):
+        """Deshabilita el botón y muestra que la operación está en curso."""
+        boton.texto_original = boton.cget("text")
+        boton.config(text="Guardando...", state="disabled")
+
+    def restaurar_boton(self, boton, estado="normal"):
+        boton.config(text=getattr(boton, 'texto_original', boton.cget("text")), state=estado)
+
     def set_data(self, data):
-        print(f"DashboardPage: set_data llamado con datos: {data}")
-        self.datos_empleado = data
-        self.nombre_label.config(text=f"Bienvenido, {data.get('nombre completo', 'N/A')}")
-        self.cargo_label.config(text=f"Cargo: {data.get('cargo', 'N/A')}")
-        self.edad_label.config(text=f"Edad: {data.get('edad', 'N/A')} años")
-        self.jornada_label.config(text=f"Jornada: {int(data.get('jornada horas', 7))} horas")
-        self.entrada_label.config(text=f"Entrada: {data.get('hora entrada', 'N/A')}")
+        """data: (Empleado, RegistroDia) de la sesión, ver datos_sesion."""
+        empleado, registro = data
+        bitacora.debug("DashboardPage: set_data llamado con datos: %s %s", empleado, registro)
+        self.empleado, self.registro = empleado, registro
+        jornada = registro.jornada_horas or empleado.jornada_horas or JORNADA_POR_DEFECTO_HORAS
+        entrada = registro.hora_entrada
+        self.nombre_label.config(text=f"Bienvenido, {registro.nombre_completo or empleado.nombre_completo or 'N/A'}")
+        self.cargo_label.config(text=f"Cargo: {registro.cargo or empleado.cargo or 'N/A'}")
+        self.edad_label.config(text=f"Edad: {empleado.edad if empleado.edad is not None else 'N/A'} años")
+        self.jornada_label.config(text=f"Jornada: {int(jornada)} horas")
+        self.entrada_label.config(text=f"Entrada: {entrada.strftime('%H:%M:%S') if entrada else 'N/A'}")
         
         # Configurar botones según el estado actual del registro
-        inicio_almuerzo = data.get('hora inicio almuerzo')
-        fin_almuerzo = data.get('hora fin almuerzo')
+        inicio_almuerzo = registro.hora_inicio_almuerzo
+        fin_almuerzo = registro.hora_fin_almuerzo
         
-        if pd.notna(inicio_almuerzo) and pd.isna(fin_almuerzo):
+        if inicio_almuerzo is not None and fin_almuerzo is None:
             # Está en almuerzo actualmente
             self.btn_almuerzo_inicio.config(state="disabled")
             self.btn_almuerzo_fin.config(state="normal")
             self.almuerzo_activo = True
-            self.mensaje_almuerzo_mostrado = True
-            
-            # Calcular tiempo restante de almuerzo
-            inicio_alm = datetime.strptime(str(inicio_almuerzo), '%H:%M:%S')
-            tiempo_transcurrido = datetime.now() - inicio_alm
-            self.tiempo_almuerzo_restante = timedelta(minutes=DURACION_ALMUERZO_MINUTOS) - tiempo_transcurrido
-            
-            if self.tiempo_almuerzo_restante.total_seconds() <= 0:
-                self.tiempo_almuerzo_restante = timedelta(0)
-                self.alarma_almuerzo_on = True
-            
             self.mensaje_label.config(text="Almuerzo en progreso. Recuerde finalizar cuando termine.", 
                                     fg="#f39c12")
-        elif pd.notna(fin_almuerzo):
+        elif fin_almuerzo is not None:
             # Ya terminó el almuerzo
             self.btn_almuerzo_inicio.config(state="disabled")
             self.btn_almuerzo_fin.config(state="disabled")
@@ -721,115 +2410,107 @@ class DashboardPage(tk.Frame):
             self.btn_almuerzo_fin.config(state="disabled")
             self.almuerzo_activo = False
             
-        if not self.almuerzo_activo:
-            self.almuerzo_timer_label.config(text=f"{DURACION_ALMUERZO_MINUTOS:02d}:00:00", fg="#2980b9")
-            self.tiempo_almuerzo_restante = timedelta(minutes=DURACION_ALMUERZO_MINUTOS)
-        
+        self.detener_timers()
+        self.preparar_temporizadores()
+        self.motor.iniciar()
+        bitacora.debug("DashboardPage: set_data completado. Timers actualizándose.")
+
+
+    def preparar_temporizadores(self):
+        """Convierte una sola vez las horas del registro en instantes de time.monotonic() y programa la
+        alarma de almuerzo si está en curso. Los ticks solo restan números."""
+        ahora_reloj = datetime.now()
+        ahora = time.monotonic()
+        for atributo in self.instantes:
+            hora = getattr(self.registro, atributo)
+            self.instantes[atributo] = (None if hora is None else
+                                        ahora - (ahora_reloj - datetime.combine(ahora_reloj.date(), hora)).total_seconds())
+        self.jornada_s = float(self.registro.jornada_horas or JORNADA_POR_DEFECTO_HORAS) * 3600
+        self.almuerzo_tomado_minutos = self.registro.tiempo_almuerzo_minutos
+
+        self.motor.cancelar(self.evento_alarma)
+        self.motor.cancelar(self.evento_parpadeo)
         self.alarma_almuerzo_on = False
-        self.inicio_almuerzo_time = None
-
-        if self.timer_id:
-            self.after_cancel(self.timer_id)
-            self.timer_id = None
-        self.actualizar_timers()
-        print("DashboardPage: set_data completado. Timers actualizándose.")
-
-
-    def actualizar_timers(self):
-        if 'hora entrada' not in self.datos_empleado or self.datos_empleado['hora entrada'] is None:
-            self.timer_id = self.after(1000, self.actualizar_timers)
-            return
-
-        hora_entrada = datetime.strptime(self.datos_empleado['hora entrada'], '%H:%M:%S')
-        jornada_horas = float(self.datos_empleado.get('jornada horas', 7))
-
-        tiempo_laborado = datetime.now() - hora_entrada
-        
-        # Calcular tiempo de almuerzo ya tomado
-        tiempo_almuerzo_tomado = timedelta(0)
-        inicio_alm_str = self.datos_empleado.get('hora inicio almuerzo')
-        fin_alm_str = self.datos_empleado.get('hora fin almuerzo')
-        
-        if pd.notna(inicio_alm_str):
-            inicio_alm = datetime.strptime(str(inicio_alm_str), '%H:%M:%S')
-            if pd.notna(fin_alm_str):
-                # Almuerzo completado
-                fin_alm = datetime.strptime(str(fin_alm_str), '%H:%M:%S')
-                tiempo_almuerzo_tomado = fin_alm - inicio_alm
-            elif self.almuerzo_activo:
-                # Almuerzo en progreso
-                tiempo_almuerzo_tomado = datetime.now() - inicio_alm
-                
-                # Actualizar tiempo restante de almuerzo
-                self.tiempo_almuerzo_restante = timedelta(minutes=DURACION_ALMUERZO_MINUTOS) - tiempo_almuerzo_tomado
-                
-                if not self.mensaje_almuerzo_mostrado:
-                    self.mensaje_label.config(text="¡Ha comenzado su hora de almuerzo! Recuerde que tiene 60 minutos.", 
-                                            fg="#f39c12")
-                    self.mensaje_almuerzo_mostrado = True
-                
-                if self.tiempo_almuerzo_restante.total_seconds() <= 0:
-                    self.tiempo_almuerzo_restante = timedelta(0)
-                    if not self.alarma_almuerzo_on:
-                        self.activar_alarma_almuerzo()
-
-        # Calcular tiempo laborado neto
-        tiempo_laborado_neto = tiempo_laborado - tiempo_almuerzo_tomado
-
-        jornada_total = timedelta(hours=jornada_horas)
-        jornada_restante = jornada_total - tiempo_laborado_neto
-        if jornada_restante.total_seconds() < 0:
-            jornada_restante = timedelta(0)
+        inicio_almuerzo = self.instantes['hora_inicio_almuerzo']
+        if self.almuerzo_activo and inicio_almuerzo is not None:
+            vence = inicio_almuerzo + DURACION_ALMUERZO_MINUTOS * 60
+            self.evento_alarma = self.motor.programar(max(0.0, vence - ahora), self.activar_alarma_almuerzo)
+
+    def _almuerzo_tomado(self, ahora):
+        inicio, fin = self.instantes['hora_inicio_almuerzo'], self.instantes['hora_fin_almuerzo']
+        if inicio is None:
+            return 0.0
+        if fin is not None:
+            return fin - inicio
+        return ahora - inicio if self.almuerzo_activo else 0.0
+
+    def _tiempo_laborado(self, ahora):
+        return max(0.0, ahora - self.instantes['hora_entrada'] - self._almuerzo_tomado(ahora))
+
+    @staticmethod
+    def _hhmmss(segundos):
+        return str(timedelta(seconds=int(segundos)))
+
+    def texto_tiempo_laborado(self, ahora):
+        if self.instantes['hora_entrada'] is None:
+            return None
+        return {'text': self._hhmmss(self._tiempo_laborado(ahora))}
 
-        self.total_timer_label.config(text=str(tiempo_laborado_neto).split('.')[0])
-        self.jornada_timer_label.config(text=str(jornada_restante).split('.')[0])
-        
-        # Actualizar timer de almuerzo
-        if self.almuerzo_activo and not self.alarma_almuerzo_on:
-            total_seconds = int(self.tiempo_almuerzo_restante.total_seconds())
-            hours, remainder = divmod(total_seconds, 3600)
-            minutes, seconds = divmod(remainder, 60)
-            self.almuerzo_timer_label.config(text=f"{hours:02d}:{minutes:02d}:{seconds:02d}")
-        elif not self.almuerzo_activo and pd.isna(self.datos_empleado.get('hora fin almuerzo')):
-            # No ha iniciado almuerzo
-            self.almuerzo_timer_label.config(text=f"{DURACION_ALMUERZO_MINUTOS:02d}:00:00", fg="#2980b9")
-        elif pd.notna(self.datos_empleado.get('hora fin almuerzo')):
-            # Almuerzo completado
-            tiempo_tomado = self.datos_empleado.get('tiempo almuerzo minutos', 0)
-            if pd.notna(tiempo_tomado):
-                horas_alm = int(tiempo_tomado // 60)
-                mins_alm = int(tiempo_tomado % 60)
-                self.almuerzo_timer_label.config(text=f"{horas_alm:02d}:{mins_alm:02d}:00", fg="#27ae60")
-        
-        self.timer_id = self.after(1000, self.actualizar_timers)
+    def texto_jornada_restante(self, ahora):
+        if self.instantes['hora_entrada'] is None:
+            return None
+        return {'text': self._hhmmss(max(0.0, self.jornada_s - self._tiempo_laborado(ahora)))}
+
+    def texto_almuerzo(self, ahora):
+        if self.alarma_almuerzo_on:
+            return {'text': "TIEMPO AGOTADO", 'fg': "red" if self.parpadeo_rojo else "black"}
+        if self.almuerzo_activo and self.instantes['hora_inicio_almuerzo'] is not None:
+            restante = max(0, int(DURACION_ALMUERZO_MINUTOS * 60 - self._almuerzo_tomado(ahora)))
+            return {'text': f"{restante // 3600:02d}:{restante // 60 % 60:02d}:{restante % 60:02d}", 'fg': "#2980b9"}
+        if self.instantes['hora_fin_almuerzo'] is not None and self.almuerzo_tomado_minutos is not None:
+            return {'text': f"{self.almuerzo_tomado_minutos // 60:02d}:{self.almuerzo_tomado_minutos % 60:02d}:00",
+                    'fg': "#27ae60"}
+        return {'text': f"{DURACION_ALMUERZO_MINUTOS:02d}:00:00", 'fg': "#2980b9"}
 
     def iniciar_almuerzo(self):
-        print("Botón 'Iniciar Almuerzo' presionado.")
-        registro_actual = registrar_evento(self.datos_empleado['id empleado'], "inicio_almuerzo")
+        bitacora.debug("Botón 'Iniciar Almuerzo' presionado.")
+        self.set_boton_pendiente(self.btn_almuerzo_inicio)
+        self.controller.en_segundo_plano(registrar_evento, self.registro.id_empleado, "inicio_almuerzo",
+                                         al_terminar=self.almuerzo_iniciado)
+
+    def almuerzo_iniciado(self, registro_actual):
+        self.restaurar_boton(self.btn_almuerzo_inicio)
         if registro_actual:
-            print("Inicio de almuerzo registrado exitosamente.")
+            bitacora.debug("Inicio de almuerzo registrado exitosamente.")
             self.almuerzo_activo = True
-            self.inicio_almuerzo_time = datetime.now()
+            self.registro = RegistroDia.desde_fila(registro_actual)
+            self.preparar_temporizadores()
             self.btn_almuerzo_inicio.config(state="disabled")
             self.btn_almuerzo_fin.config(state="normal")
+            self.mensaje_label.config(text=f"¡Ha comenzado su hora de almuerzo! Recuerde que tiene "
+                                           f"{DURACION_ALMUERZO_MINUTOS} minutos.", fg="#f39c12")
 
     def finalizar_almuerzo(self):
-        print("Botón 'Finalizar Almuerzo' presionado.")
-        registro_actual = registrar_evento(self.datos_empleado['id empleado'], "fin_almuerzo")
+        bitacora.debug("Botón 'Finalizar Almuerzo' presionado.")
+        self.set_boton_pendiente(self.btn_almuerzo_fin)
+        self.controller.en_segundo_plano(registrar_evento, self.registro.id_empleado, "fin_almuerzo",
+                                         al_terminar=self.almuerzo_finalizado)
+
+    def almuerzo_finalizado(self, registro_actual):
+        self.restaurar_boton(self.btn_almuerzo_fin)
         if registro_actual:
-            print("Fin de almuerzo registrado exitosamente.")
+            bitacora.debug("Fin de almuerzo registrado exitosamente.")
             self.almuerzo_activo = False
-            self.alarma_almuerzo_on = False
-            self.almuerzo_timer_label.config(fg="#2980b9")
             self.btn_almuerzo_fin.config(state="disabled")
             
-            # Actualizar los datos del empleado con la nueva información
-            self.datos_empleado.update(registro_actual)
+            # Actualizar el registro de la sesión con la nueva información (cancela la alarma)
+            self.registro = RegistroDia.desde_fila(registro_actual)
+            self.preparar_temporizadores()
             
-            tiempo_almuerzo_tomado = registro_actual.get('tiempo almuerzo minutos', 0)
-            if pd.notna(tiempo_almuerzo_tomado):
-                horas_alm = int(tiempo_almuerzo_tomado // 60)
-                mins_alm = int(tiempo_almuerzo_tomado % 60)
+            tiempo_almuerzo_tomado = self.registro.tiempo_almuerzo_minutos
+            if tiempo_almuerzo_tomado is not None:
+                horas_alm = tiempo_almuerzo_tomado // 60
+                mins_alm = tiempo_almuerzo_tomado % 60
                 tiempo_str = f"{horas_alm:02d}:{mins_alm:02d}"
                 messagebox.showinfo("Almuerzo Finalizado", 
                                 f"Has finalizado tu hora de almuerzo.\n"
@@ -843,41 +2524,400 @@ class DashboardPage(tk.Frame):
                 self.mensaje_label.config(text="Almuerzo finalizado.", 
                                         fg="#27ae60")
 
-            self.tiempo_almuerzo_restante = timedelta(minutes=DURACION_ALMUERZO_MINUTOS)
-            self.mensaje_almuerzo_mostrado = False
 
     def activar_alarma_almuerzo(self):
+        """Evento programado al agotarse el almuerzo: avisa y hace parpadear el temporizador cada 500 ms."""
+        self.evento_alarma = None
         self.alarma_almuerzo_on = True
-        current_color = self.almuerzo_timer_label.cget("fg")
-        new_color = "red" if current_color == "black" else "black"
-        self.almuerzo_timer_label.config(fg=new_color, text="TIEMPO AGOTADO")
+        self.parpadeo_rojo = True
         self.mensaje_label.config(text="¡ATENCIÓN! Su tiempo de almuerzo ha terminado. Por favor, finalice el almuerzo.", 
                                 fg="red")
-        if self.almuerzo_activo:
-            self.after(500, self.activar_alarma_almuerzo)
+        self.evento_parpadeo = self.motor.programar(0.5, self.parpadear_alarma, periodo=0.5)
+
+    def parpadear_alarma(self):
+        self.parpadeo_rojo = not self.parpadeo_rojo
 
     def marcar_salida(self):
-        print("Botón 'Marcar Salida' presionado.")
+        bitacora.debug("Botón 'Marcar Salida' presionado.")
         if messagebox.askyesno("Confirmar Salida", "¿Estás seguro de que deseas marcar tu salida?"):
-            registro_actual = registrar_evento(self.datos_empleado['id empleado'], "salida")
-            if registro_actual:
-                print("Salida registrada exitosamente.")
-                horas_trabajadas = registro_actual.get('horas trabajadas', 0)
-                tiempo_extra = registro_actual.get('tiempo extra minutos', 0)
-                
-                mensaje_salida = f"¡Salida registrada exitosamente!\n"
-                mensaje_salida += f"Horas trabajadas: {horas_trabajadas:.2f}\n"
-                if pd.notna(tiempo_extra) and tiempo_extra > 0:
-                    mensaje_salida += f"Tiempo extra: {tiempo_extra} minutos"
-                
-                messagebox.showinfo("Salida Registrada", mensaje_salida)
-                if self.timer_id:
-                    self.after_cancel(self.timer_id)
-                    self.timer_id = None
-                self.controller.show_frame("LoginPage")
+            self.set_boton_pendiente(self.btn_salida)
+            self.controller.en_segundo_plano(registrar_evento, self.registro.id_empleado, "salida",
+                                             al_terminar=self.salida_registrada)
+
+    def salida_registrada(self, registro_actual):
+        self.restaurar_boton(self.btn_salida)
+        if registro_actual:
+            bitacora.debug("Salida registrada exitosamente.")
+            self.registro = RegistroDia.desde_fila(registro_actual)
+            horas_trabajadas = self.registro.horas_trabajadas or 0.0
+            tiempo_extra = self.registro.tiempo_extra_minutos
+            
+            mensaje_salida = f"¡Salida registrada exitosamente!\n"
+            mensaje_salida += f"Horas trabajadas: {horas_trabajadas:.2f}\n"
+            if tiempo_extra:
+                mensaje_salida += f"Tiempo extra: {tiempo_extra} minutos"
+            
+            messagebox.showinfo("Salida Registrada", mensaje_salida)
+            self.detener_timers()
+            self.controller.show_frame("LoginPage")
+
+class TableroPage(tk.Frame):
+    """Tablero de supervisión (Ctrl+Shift+T). Lista virtual: solo existen en el canvas los renglones
+    visibles, que se reutilizan al desplazarse, y cada uno se reconfigura solo si cambia su texto o color.
+    Los estados se calculan cada segundo a partir de horas ya convertidas a segundos; los datos se
+    refrescan con cambios_tablero, que solo trae las filas que cambiaron."""
+    ALTO_FILA = 22
+    ESTADOS = {  # estado -> (orden en la lista, color)
+        'almuerzo excedido': (0, "#e74c3c"),
+        'jornada cumplida': (1, "#f39c12"),
+        'en almuerzo': (2, "#3498db"),
+        'trabajando': (3, "#27ae60"),
+    }
+
+    def __init__(self, parent, controller):
+        super().__init__(parent, bg="#2c3e50")
+        self.controller = controller
+        self.fecha = None
+        self.offset = 0
+        self.filas = {}
+        self.estados = {}
+        self.calculados = {}
+        self.orden = []
+        self.primera = 0 # Índice en self.orden del primer renglón visible
+        self.renglones = [] # Renglones del canvas: [rectángulo, texto, (texto y color mostrados)]
+        self.repasar = []
+        self.sondeo_pendiente = False
+        self.tick_id = None
+        self.duracion_refresco = 0.0
+
+        header_frame = tk.Frame(self, bg="#34495e")
+        header_frame.pack(fill="x")
+        tk.Button(header_frame, text="← Volver", font=("Arial", 12), bg="#e74c3c", fg="white",
+                  command=self.volver_login, relief=tk.RAISED, bd=2).pack(side="left", padx=10, pady=10)
+        tk.Label(header_frame, text="Tablero de Supervisión", font=("Arial", 20, "bold"),
+                 fg="white", bg="#34495e").pack(side="left", padx=20)
+        self.resumen_label = tk.Label(self, text="", font=("Arial", 11), fg="#ecf0f1", bg="#2c3e50", anchor="w")
+        self.resumen_label.pack(fill="x", padx=10, pady=(8, 0))
+        tk.Label(self, text=self._texto_renglon("ID", "Nombre", "Cargo", "Entrada", "Estado", "Trabajado", "Almuerzo"),
+                 font=("Consolas", 10, "bold"), fg="#bdc3c7", bg="#2c3e50", anchor="w").pack(fill="x", padx=10)
+
+        lista = tk.Frame(self, bg="#2c3e50")
+        lista.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        self.barra = tk.Scrollbar(lista, orient="vertical", command=self.desplazar)
+        self.barra.pack(side="right", fill="y")
+        self.canvas = tk.Canvas(lista, bg="#ecf0f1", highlightthickness=0)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.canvas.bind('<Configure>', self.redimensionar)
+        self.canvas.bind('<MouseWheel>', lambda event: self.desplazar('scroll', -event.delta // 120, 'units'))
+        self.canvas.bind('<Button-4>', lambda event: self.desplazar('scroll', -1, 'units'))
+        self.canvas.bind('<Button-5>', lambda event: self.desplazar('scroll', 1, 'units'))
+
+    @staticmethod
+    def _texto_renglon(id_empleado, nombre, cargo, entrada, estado, trabajado, almuerzo):
+        return f"{id_empleado:<10} {nombre:<26.26} {cargo:<20.20} {entrada:<8} {estado:<18} {trabajado:>9} {almuerzo:>9}"
+
+    @staticmethod
+    def _hhmm(segundos):
+        return f"{segundos // 3600:02d}:{segundos // 60 % 60:02d}"
+
+    def iniciar(self):
+        self.detener()
+        self.resumen_label.config(text="Cargando empleados en turno...")
+        self.controller.en_segundo_plano(cargar_tablero, al_terminar=self.tablero_cargado)
+
+    def tablero_cargado(self, estado):
+        if estado is None:
+            self.resumen_label.config(text="No se pudo cargar el tablero.")
+            return
+        self.fecha, self.offset, self.filas = estado['fecha'], estado['offset'], estado['filas']
+        self.repasar = []
+        self.estados = {}
+        self.orden = None
+        self.tick()
+
+    def detener(self):
+        if self.tick_id:
+            self.after_cancel(self.tick_id)
+            self.tick_id = None
+
+    def volver_login(self):
+        self.detener()
+        self.controller.show_frame("LoginPage")
+
+    def tick(self):
+        """Un solo ciclo por segundo: pide los cambios (si no hay un sondeo en curso) y refresca la lista."""
+        ahora = datetime.now()
+        if ahora.strftime('%Y-%m-%d') != self.fecha:
+            self.iniciar() # Cambió el día: se vuelve a cargar el estado inicial
+            return
+        if not self.sondeo_pendiente:
+            self.sondeo_pendiente = True
+            self.controller.en_segundo_plano(cambios_tablero, self.fecha, self.offset, self.repasar,
+                                             al_terminar=self.cambios_recibidos)
+        self.refrescar(ahora.hour * 3600 + ahora.minute * 60 + ahora.second)
+        self.tick_id = self.after(INTERVALO_TABLERO_MS, self.tick)
+
+    def cambios_recibidos(self, cambios):
+        self.sondeo_pendiente = False
+        if cambios is None:
+            return # Se reintenta en el siguiente ciclo desde el mismo offset
+        self.offset = cambios['offset']
+        self.repasar = cambios['ids']
+        if cambios.get('completo'):
+            # Sin registro de cambios llega el tablero completo: se aplican solo las diferencias
+            completo = cambios['filas']
+            cambios['filas'] = {i: fila for i, fila in completo.items() if self.filas.get(i) != fila}
+            cambios['retirados'] = [i for i in self.filas if i not in completo]
+        self.filas.update(cambios['filas'])
+        for id_empleado in cambios['retirados']:
+            self.filas.pop(id_empleado, None)
+            self.estados.pop(id_empleado, None)
+        if cambios['filas'] or cambios['retirados']:
+            self.orden = None # Se reordena en el próximo refresco
+
+    def refrescar(self, ahora):
+        inicio = time.perf_counter()
+        self.calculados = {}
+        reordenar = self.orden is None
+        for id_empleado, fila in self.filas.items():
+            calculado = estado_tablero(fila, ahora)
+            self.calculados[id_empleado] = calculado
+            if self.estados.get(id_empleado) != calculado[0]:
+                self.estados[id_empleado] = calculado[0]
+                reordenar = True
+        if reordenar:
+            self.orden = sorted(self.filas, key=lambda i: (self.ESTADOS[self.estados[i]][0],
+                                                           self.filas[i]['nombre completo'], i))
+            self.primera = min(self.primera, max(0, len(self.orden) - len(self.renglones) + 1))
+        conteo = {estado: 0 for estado in self.ESTADOS}
+        for estado in self.estados.values():
+            conteo[estado] += 1
+        self.dibujar()
+        self.duracion_refresco = time.perf_counter() - inicio
+        self.resumen_label.config(text=f"{len(self.filas)} en turno  |  "
+                                       + "  |  ".join(f"{estado}: {n}" for estado, n in conteo.items())
+                                       + f"  |  refresco {self.duracion_refresco * 1000:.1f} ms")
+
+    def redimensionar(self, event=None):
+        visibles = self.canvas.winfo_height() // self.ALTO_FILA + 1
+        ancho = self.canvas.winfo_width()
+        while len(self.renglones) < visibles:
+            y = len(self.renglones) * self.ALTO_FILA
+            rectangulo = self.canvas.create_rectangle(0, y, ancho, y + self.ALTO_FILA, width=0, fill="#ecf0f1")
+            texto = self.canvas.create_text(6, y + self.ALTO_FILA // 2, anchor="w", font=("Consolas", 10))
+            self.renglones.append([rectangulo, texto, None])
+        while len(self.renglones) > visibles:
+            rectangulo, texto, _ = self.renglones.pop()
+            self.canvas.delete(rectangulo, texto)
+        for i, (rectangulo, _, _) in enumerate(self.renglones):
+            self.canvas.coords(rectangulo, 0, i * self.ALTO_FILA, ancho, (i + 1) * self.ALTO_FILA)
+        if self.orden:
+            self.dibujar()
+
+    def desplazar(self, accion, cantidad, unidad=None):
+        """Comando de la barra y de la rueda del ratón: mueve la primera fila visible."""
+        total = len(self.orden or [])
+        visibles = max(1, len(self.renglones) - 1)
+        if accion == 'moveto':
+            primera = int(float(cantidad) * total)
+        else:
+            primera = self.primera + int(cantidad) * (visibles if unidad == 'pages' else 1)
+        self.primera = max(0, min(primera, total - visibles))
+        self.dibujar()
+
+    def dibujar(self):
+        """Actualiza solo los renglones visibles cuyo contenido cambió."""
+        orden = self.orden or []
+        for i, renglon in enumerate(self.renglones):
+            indice = self.primera + i
+            if indice < len(orden):
+                id_empleado = orden[indice]
+                fila = self.filas[id_empleado]
+                estado, trabajado, almuerzo = self.calculados[id_empleado]
+                contenido = (self._texto_renglon(id_empleado, fila['nombre completo'], fila['cargo'],
+                                                 self._hhmm(fila['entrada']), estado, self._hhmm(trabajado),
+                                                 self._hhmm(almuerzo) if fila['inicio almuerzo'] is not None else "-"),
+                             self.ESTADOS[estado][1])
+                fondo = "#ffffff" if indice % 2 else "#f4f6f7"
+            else:
+                contenido, fondo = ("", "#2c3e50"), "#ecf0f1"
+            if renglon[2] != contenido:
+                renglon[2] = contenido
+                self.canvas.itemconfigure(renglon[1], text=contenido[0], fill=contenido[1])
+                self.canvas.itemconfigure(renglon[0], fill=fondo)
+        if orden:
+            visibles = max(1, len(self.renglones) - 1)
+            self.barra.set(self.primera / len(orden), min(1.0, (self.primera + visibles) / len(orden)))
+        else:
+            self.barra.set(0, 1)
 
 # --- INICIO DE LA APLICACIÓN ---
-if __name__ == "__main__":
-    if inicializar_archivos():
+
+def main(argv=None):
+    """Sin argumentos abre la interfaz; los subcomandos ejecutan tareas de mantenimiento sin ventana."""
+    parser = argparse.ArgumentParser(description="Sistema de Registro de Personal")
+    parser.add_argument('--servidor', default=None, metavar='HOST:PUERTO',
+                        help="Usa el servidor de datos indicado en lugar de los archivos locales")
+    parser.add_argument('--tablero', action='store_true',
+                        help="Abre directamente el tablero de supervisión (también con Ctrl+Shift+T)")
+    parser.add_argument('--nivel-bitacora', default=NIVEL_BITACORA, choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        type=str.upper, help=f"Nivel mínimo de los mensajes (por defecto {NIVEL_BITACORA})")
+    parser.add_argument('--bitacora', default=ARCHIVO_BITACORA, metavar='ARCHIVO',
+                        help=f"Archivo rotativo de la bitácora (por defecto '{ARCHIVO_BITACORA}'; '' para no escribirlo)")
+    subparsers = parser.add_subparsers(dest='comando')
+    p_migrar = subparsers.add_parser('migrar-particiones',
+                                     help="Divide el registro monolítico en particiones mensuales")
+    p_migrar.add_argument('--origen', default=None, help=f"Archivo de origen (por defecto '{ARCHIVO_REGISTRO}')")
+    p_recalcular = subparsers.add_parser('recalcular',
+                                         help="Recalcula horas trabajadas, tiempo extra y almuerzo de un período")
+    p_recalcular.add_argument('--desde', default=None, help="Fecha inicial AAAA-MM-DD (por defecto, todo el historial)")
+    p_recalcular.add_argument('--hasta', default=None, help="Fecha final AAAA-MM-DD, incluida")
+    p_recalcular.add_argument('--simular', action='store_true', help="Solo informa cuántas filas cambiarían")
+    p_recalcular.add_argument('--verificar', action='store_true',
+                              help="Compara el recálculo por lotes con el cálculo por evento, fila a fila, sin escribir")
+    p_resumen = subparsers.add_parser('resumen', help="Totales por empleado de un día, semana o quincena")
+    p_resumen.add_argument('--tipo', choices=TIPOS_PERIODO, default='quincena')
+    p_resumen.add_argument('--periodo', default=None,
+                           help="AAAA-MM-DD, AAAA-Www o AAAA-MM-Q1/Q2 (por defecto, el período de hoy)")
+    p_resumen.add_argument('--verificar', action='store_true',
+                           help="Recalcula el resumen desde el registro e informa las diferencias")
+    p_resumen.add_argument('--reconstruir', action='store_true', help="Reconstruye el resumen desde el registro")
+    p_exportar = subparsers.add_parser('exportar', help="Exporta el registro por bloques, con memoria constante")
+    p_exportar.add_argument('--salida', required=True, help="Archivo .xlsx, .csv o .jsonl")
+    p_exportar.add_argument('--desde', default=None, help="Fecha inicial AAAA-MM-DD")
+    p_exportar.add_argument('--hasta', default=None, help="Fecha final AAAA-MM-DD, incluida")
+    p_exportar.add_argument('--empleado', default=None, help="Solo las filas de este id de empleado")
+    p_exportar.add_argument('--cargo', default=None, help="Solo las filas de este cargo")
+    p_incremental = subparsers.add_parser('exportar-incremental',
+                                          help="Exporta solo las filas nuevas o modificadas desde la última vez")
+    p_incremental.add_argument('--formato', choices=FORMATOS_INCREMENTALES, default='csv')
+    p_incremental.add_argument('--directorio', default=None,
+                               help=f"Directorio de salida y de la marca (por defecto '{DIRECTORIO_EXPORTACION}')")
+    p_archivar = subparsers.add_parser('archivar', help="Guarda los meses cerrados en el archivo columnar")
+    p_archivar.add_argument('--hasta-mes', default=None, help="Último mes a archivar AAAA-MM (por defecto, el anterior)")
+    p_archivar.add_argument('--forzar', action='store_true', help="Vuelve a archivar los meses ya archivados")
+    p_memoria = subparsers.add_parser('memoria', help="Memoria del registro en texto y con el plan de tipos")
+    p_memoria.add_argument('--desde', default=None, help="Fecha inicial AAAA-MM-DD")
+    p_memoria.add_argument('--hasta', default=None, help="Fecha final AAAA-MM-DD")
+    p_ingerir = subparsers.add_parser('ingerir', help="Carga en bloque marcas de un CSV (id empleado, fecha hora, evento)")
+    p_ingerir.add_argument('archivo', help="CSV de marcas")
+    p_ingerir.add_argument('--rechazos', default=None, help="CSV de marcas rechazadas (por defecto <archivo>_rechazos.csv)")
+    p_ingerir.add_argument('--formato-fecha', default='ISO8601',
+                           help="Formato de 'fecha hora' para pandas.to_datetime (por defecto ISO8601)")
+    p_ingerir.add_argument('--simular', action='store_true', help="Solo valida y escribe los rechazos")
+    p_empleados = subparsers.add_parser('importar-empleados',
+                                        help="Actualiza el archivo de empleados con una nómina .csv o .xlsx")
+    p_empleados.add_argument('archivo', help="Nómina completa con la columna 'id empleado'")
+    p_empleados.add_argument('--sin-bajas', action='store_true',
+                             help="No elimina los empleados que faltan en la nómina")
+    p_empleados.add_argument('--simular', action='store_true', help="Solo muestra las diferencias")
+    p_nodo = subparsers.add_parser('iniciar-nodo', help="Convierte esta carpeta en un nodo de replicación")
+    p_nodo.add_argument('nombre', help="Nombre único del nodo (p. ej. kiosco-1, central)")
+    p_nodo.add_argument('--desde', default=None,
+                        help="Carpeta de otro nodo de la que copiar el registro completo y sus eventos")
+    p_sincronizar = subparsers.add_parser('sincronizar', help="Intercambia los eventos nuevos con otro nodo")
+    p_sincronizar.add_argument('carpeta', help="Carpeta del otro nodo (p. ej. una unidad de red o un USB)")
+    p_servidor = subparsers.add_parser('servidor', help="Servidor de datos local para varios kioscos")
+    p_servidor.add_argument('--host', default='127.0.0.1')
+    p_servidor.add_argument('--puerto', type=int, default=PUERTO_SERVIDOR)
+    args = parser.parse_args(argv)
+    configurar_bitacora(args.nivel_bitacora, args.bitacora)
+
+    global SERVIDOR_DATOS
+    if args.servidor:
+        SERVIDOR_DATOS = args.servidor
+
+    if args.comando == 'servidor':
+        servir(args.host, args.puerto)
+        return
+
+    if args.comando == 'migrar-particiones':
+        migrar_a_particiones(args.origen)
+        return
+
+    if args.comando == 'recalcular':
+        if args.verificar:
+            discrepancias = verificar_recalculo(obtener_almacen().leer(args.desde, args.hasta))
+            for id_empleado, fecha, col, esperado, obtenido in discrepancias:
+                print(f"{id_empleado} {fecha} '{col}': por evento {esperado}, por lotes {obtenido}")
+            print(f"Verificación: {len(discrepancias)} discrepancia(s).")
+            if discrepancias:
+                raise SystemExit(1)
+        else:
+            recalcular_periodo(args.desde, args.hasta, simular=args.simular)
+        cerrar_almacen()
+        return
+
+    if args.comando == 'exportar':
+        exportar_registro(args.salida, args.desde, args.hasta, args.empleado, args.cargo)
+        cerrar_almacen()
+        return
+
+    if args.comando == 'exportar-incremental':
+        exportar_incremental(args.formato, args.directorio)
+        cerrar_almacen()
+        return
+
+    if args.comando == 'archivar':
+        archivar_meses(args.hasta_mes, args.forzar)
+        cerrar_almacen()
+        return
+
+    if args.comando == 'memoria':
+        informe_memoria_registro(args.desde, args.hasta)
+        cerrar_almacen()
+        return
+
+    if args.comando == 'ingerir':
+        ingerir_marcas(args.archivo, args.rechazos, args.formato_fecha, args.simular)
+        cerrar_almacen()
+        return
+
+    if args.comando == 'importar-empleados':
+        importar_empleados(args.archivo, aplicar_bajas=not args.sin_bajas, simular=args.simular)
+        return
+
+    if args.comando == 'iniciar-nodo':
+        iniciar_nodo(args.nombre, args.desde)
+        cerrar_almacen()
+        return
+
+    if args.comando == 'sincronizar':
+        sincronizar(args.carpeta)
+        cerrar_almacen()
+        return
+
+    if args.comando == 'resumen':
+        resumen = obtener_resumen()
+        if args.reconstruir:
+            resumen.reconstruir(obtener_almacen().leer())
+        elif args.verificar:
+            diferencias = resumen.verificar(obtener_almacen().leer())
+            for (tipo, periodo, id_empleado), esperado, guardado in diferencias:
+                print(f"{tipo} {periodo} {id_empleado}: registro {esperado}, resumen {guardado}")
+            print(f"Verificación del resumen: {len(diferencias)} diferencia(s).")
+        else:
+            if not RESUMEN_PERIODOS:
+                # Sin RESUMEN_PERIODOS los kioscos no lo mantienen: se rehace antes de consultarlo
+                resumen.reconstruir(obtener_almacen().leer())
+            hoy = datetime.now().strftime('%Y-%m-%d')
+            periodo = args.periodo or (hoy if args.tipo == 'dia' else _claves_periodo(hoy)[args.tipo])
+            print(f"{'id empleado':<14}{'días':>6}{'horas':>10}{'extra min':>11}{'exceso almuerzo min':>21}")
+            for id_empleado, t in sorted(resumen.totales(args.tipo, periodo).items()):
+                print(f"{id_empleado:<14}{t['dias']:>6}{t['horas_trabajadas']:>10.2f}"
+                      f"{t['tiempo_extra_minutos']:>11}{t['exceso_almuerzo_minutos']:>21}")
+        cerrar_almacen()
+        if args.verificar and diferencias:
+            raise SystemExit(1)
+        return
+
+    # Como cliente del servidor de datos, el kiosco no toca los archivos compartidos
+    if SERVIDOR_DATOS or inicializar_archivos():
         app = App()
-        app.mainloop()
\ No newline at end of file
+        if args.tablero:
+            app.mostrar_tablero()
+        app.mainloop()
+        cerrar_almacen()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
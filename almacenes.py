@@ -0,0 +1,689 @@
+"""Almacenes intercambiables del registro (Excel, diario de eventos, SQLite, particionado por mes) y la
+escritura diferida que se monta sobre cualquiera de ellos. Registros_base elige y mantiene el activo."""
+import os
+import json
+import calendar
+import sqlite3
+import threading
+from datetime import datetime
+
+from registro_comun import (
+    pd, ARCHIVO_REGISTRO, COLUMNAS_REGISTRO, COLUMNAS_POR_EVENTO, ESQUEMA_REGISTRO, bitacora, instrumentar,
+    _fase, _registrar_io, _leer_excel, _escribir_excel, _crear_excel_vacio, _firma_archivo, _valor_sql,
+    _nuevo_registro, _aplicar_evento, tipar_registro, registro_como_texto, _valor_tipado, _valor_como_texto,
+)
+
+# Archivos de cada almacén, relativos a la carpeta del nodo
+DIRECTORIO_DIARIO = 'diario'
+ARCHIVO_SQLITE = 'registro_personal.db'
+DIRECTORIO_PARTICIONES = 'registro'
+ARCHIVO_PENDIENTES = 'registro_pendiente.jsonl' # Eventos de la escritura diferida aún no guardados
+
+# --- DIARIO DE EVENTOS ---
+# Cada evento es una línea JSON anexada a diario/AAAA-MM-DD.jsonl. El estado del día se
+# siembra una vez desde el Excel y después solo se leen las líneas nuevas del diario, de
+# modo que registrar un evento cuesta lo mismo sin importar el tamaño del historial.
+# Las funciones reciben la carpeta del nodo (directorio, '' = la carpeta de trabajo).
+
+def _ruta_diario(fecha, directorio=''):
+    return os.path.join(directorio, DIRECTORIO_DIARIO, f"{fecha}.jsonl")
+
+def _anexar_diario(lineas, directorio=''):
+    """Anexa eventos al diario con una sola escritura por fecha y los fuerza a disco antes de volver."""
+    os.makedirs(os.path.join(directorio, DIRECTORIO_DIARIO), exist_ok=True)
+    por_fecha = {}
+    for linea in lineas:
+        por_fecha.setdefault(linea['fecha'], []).append(json.dumps(linea, ensure_ascii=False, default=_valor_sql) + '\n')
+    for fecha, textos in por_fecha.items():
+        texto = ''.join(textos)
+        with _fase('fsync_diario'), open(_ruta_diario(fecha, directorio), 'a', encoding='utf-8') as f:
+            f.write(texto)
+            f.flush()
+            os.fsync(f.fileno())
+        _registrar_io(bytes_escritos=len(texto.encode('utf-8')), filas=len(textos), archivos=1)
+
+def _linea_diario(registro, evento):
+    """Línea de diario que representa un evento ya aplicado sobre registro."""
+    linea = {'id empleado': registro['id empleado'], 'evento': evento, 'fecha': registro['fecha']}
+    if evento in ("entrada", "correccion_entrada"):
+        linea['hora'] = registro['hora entrada']
+        linea['jornada horas'] = registro['jornada horas']
+        linea['nombre completo'] = registro['nombre completo']
+        linea['cargo'] = registro['cargo']
+    else:
+        linea['hora'] = registro[COLUMNAS_POR_EVENTO[evento][0]]
+    return linea
+
+def _fechas_en_diario(directorio=''):
+    """Fechas con diario pendiente de compactar, en orden."""
+    carpeta = os.path.join(directorio, DIRECTORIO_DIARIO)
+    if not os.path.isdir(carpeta):
+        return []
+    return sorted(nombre[:-len('.jsonl')] for nombre in os.listdir(carpeta) if nombre.endswith('.jsonl'))
+
+def _registros_de_fecha(df, fecha):
+    """Devuelve {id normalizado: fila} con las filas del DataFrame de registro para una fecha."""
+    if 'id empleado' not in df.columns or 'fecha' not in df.columns:
+        return {}
+    del_dia = df[df['fecha'] == fecha].copy()
+    del_dia['id empleado'] = del_dia['id empleado'].astype(str).str.upper().str.strip()
+    registros = {}
+    for registro in del_dia.to_dict('records'):
+        registros.setdefault(registro['id empleado'], registro)
+    return registros
+
+def _reproducir_diario(registros, ruta, offset=0):
+    """Aplica sobre registros las líneas del diario a partir de offset y devuelve el nuevo offset.
+    Una última línea sin salto de línea (escritura a medias) se deja para la siguiente lectura."""
+    if not os.path.exists(ruta):
+        return offset
+    offset_inicial = offset
+    lineas = 0
+    with _fase('reproducir_diario'), open(ruta, 'rb') as f:
+        f.seek(offset)
+        for linea in f:
+            if not linea.endswith(b'\n'):
+                break
+            offset += len(linea)
+            lineas += 1
+            ev = json.loads(linea)
+            id_empleado = ev['id empleado']
+            if ev['evento'] == 'entrada':
+                registros.setdefault(id_empleado, _nuevo_registro(
+                    id_empleado, ev['nombre completo'], ev['cargo'],
+                    ev['fecha'], ev['hora'], ev['jornada horas']))
+            elif ev['evento'] == 'correccion_entrada' and id_empleado in registros:
+                registros[id_empleado].update({'hora entrada': ev['hora'], 'jornada horas': ev['jornada horas'],
+                                               'nombre completo': ev['nombre completo'], 'cargo': ev['cargo']})
+            elif id_empleado in registros:
+                try:
+                    _aplicar_evento(registros[id_empleado], ev['evento'], ev['hora'])
+                except Exception as e:
+                    bitacora.error("Error de cálculo al reproducir '%s' de %s: %s", ev['evento'], id_empleado, e)
+    _registrar_io(bytes_leidos=offset - offset_inicial, filas=lineas, archivos=1)
+    return offset
+
+def _estado_dia(estado, fecha, directorio=''):
+    """Devuelve el estado en memoria del día ({'fecha', 'offset', 'registros'} de un almacén), poniéndolo
+    al día con las líneas nuevas del diario. Otros procesos que escriban en el mismo diario quedan
+    reflejados en la siguiente llamada."""
+    if estado['fecha'] != fecha:
+        try:
+            registros = _registros_de_fecha(_leer_registro_excel(os.path.join(directorio, ARCHIVO_REGISTRO)), fecha)
+        except FileNotFoundError:
+            registros = {}
+        estado.update(fecha=fecha, offset=0, registros=registros)
+    estado['offset'] = _reproducir_diario(estado['registros'], _ruta_diario(fecha, directorio), estado['offset'])
+    return estado['registros']
+
+@instrumentar
+def compactar_diario(directorio=''):
+    """Vuelca al Excel de registro los días cerrados del diario en una sola escritura.
+    Los archivos compactados se renombran a .jsonl.compactado. Devuelve el número de días volcados."""
+    hoy = datetime.now().strftime('%Y-%m-%d')
+    fechas = [fecha for fecha in _fechas_en_diario(directorio) if fecha < hoy]
+    if not fechas:
+        return 0
+
+    ruta_registro = os.path.join(directorio, ARCHIVO_REGISTRO)
+    bitacora.info("Compactando %s día(s) del diario en '%s'...", len(fechas), ruta_registro)
+    try:
+        df = _leer_registro_excel(ruta_registro)
+        filas = []
+        for fecha in fechas:
+            registros = _registros_de_fecha(df, fecha)
+            _reproducir_diario(registros, _ruta_diario(fecha, directorio))
+            filas.extend(registros.values())
+        # Las filas de esas fechas se sustituyen por el estado final reconstruido
+        df = df[~df['fecha'].isin(fechas)]
+        df = pd.concat([df, pd.DataFrame(filas, columns=COLUMNAS_REGISTRO)], ignore_index=True)
+        _escribir_excel(df, ruta_registro)
+    except Exception as e:
+        bitacora.error("Error al compactar el diario: %s", e)
+        return 0
+
+    for fecha in fechas:
+        ruta = _ruta_diario(fecha, directorio)
+        os.replace(ruta, ruta + '.compactado')
+    bitacora.info("Diario compactado: %s registro(s) de %s día(s).", len(filas), len(fechas))
+    return len(fechas)
+
+# --- ALMACENAMIENTO ---
+# Las funciones de datos trabajan sobre un almacén intercambiable con la misma interfaz:
+#   buscar(id, fecha) -> dict o None       guardar(registro, evento)
+#   guardar_lote([(registro, evento), ...]) -> una sola escritura para varios eventos
+#   leer(desde, hasta) -> DataFrame        iterar(desde, hasta) -> DataFrames por bloques
+# leer e iterar entregan los DataFrames con ESQUEMA_REGISTRO aplicado; buscar y guardar usan filas en texto.
+#   exportar_xlsx()                        cerrar()
+# Registros_base elige el almacén activo con ALMACENAMIENTO ('excel', 'diario', 'sqlite' o 'particionado').
+
+def _leer_registro_excel(ruta=None):
+    """Lee ARCHIVO_REGISTRO (u otro archivo de registro) con columnas e IDs normalizados."""
+    df = _leer_excel(ruta or ARCHIVO_REGISTRO)
+    df.columns = df.columns.str.lower().str.strip()
+    if 'id empleado' in df.columns:
+        df['id empleado'] = df['id empleado'].astype(str).str.upper().str.strip()
+    return df
+
+def _iterar_registro_excel(ruta=None, desde=None, hasta=None, filas_por_bloque=5000):
+    """Recorre un archivo de registro por bloques con openpyxl en modo solo lectura, sin cargarlo entero.
+    Cada bloque sale con las mismas columnas e IDs normalizados que _leer_registro_excel."""
+    from openpyxl import load_workbook
+    ruta = ruta or ARCHIVO_REGISTRO
+    libro = load_workbook(ruta, read_only=True)
+    _registrar_io(bytes_leidos=os.path.getsize(ruta), archivos=1)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        encabezado = next(filas, None)
+        if encabezado is None:
+            return
+        columnas = [str(c).lower().strip() for c in encabezado]
+        while True:
+            with _fase('lectura_por_bloques'):
+                bloque = [fila for _, fila in zip(range(filas_por_bloque), filas)]
+            if not bloque:
+                break
+            _registrar_io(filas=len(bloque))
+            df = pd.DataFrame(bloque, columns=columnas)
+            if 'id empleado' in df.columns:
+                df['id empleado'] = df['id empleado'].astype(str).str.upper().str.strip()
+            yield _filtrar_fechas(df, desde, hasta)
+    finally:
+        libro.close()
+
+def _limite_fecha(texto, es_desde):
+    """Convierte un extremo 'AAAA-MM-DD' en Timestamp para comparar con la columna 'fecha' tipada.
+    Un día que el mes no tiene (p. ej. '2026-09-31') queda entre el último día del mes y el primero
+    del siguiente, igual que al comparar texto."""
+    try:
+        return pd.Timestamp(texto)
+    except ValueError:
+        anio, mes, dia = (int(parte) for parte in str(texto)[:10].split('-'))
+        ultimo = calendar.monthrange(anio, mes)[1]
+        if dia <= ultimo:
+            raise
+        return pd.Timestamp(anio, mes, ultimo) + pd.Timedelta(days=1 if es_desde else 0)
+
+def _filtrar_fechas(df, desde=None, hasta=None):
+    """Filtra un DataFrame de registro por rango de fechas 'AAAA-MM-DD' (extremos incluidos).
+    La columna 'fecha' puede estar en texto o ya tipada como datetime64."""
+    tipada = 'fecha' in df.columns and pd.api.types.is_datetime64_any_dtype(df['fecha'])
+    if desde is not None:
+        df = df[df['fecha'] >= (_limite_fecha(desde, True) if tipada else desde)]
+    if hasta is not None:
+        df = df[df['fecha'] <= (_limite_fecha(hasta, False) if tipada else hasta)]
+    return df
+
+class AlmacenExcel:
+    """Todo el historial en ARCHIVO_REGISTRO de directorio (o en la ruta indicada), reescrito completo en cada
+    evento. El DataFrame leído se reutiliza, con ESQUEMA_REGISTRO aplicado, mientras la firma del archivo no cambie."""
+
+    def __init__(self, ruta=None, directorio=''):
+        self.ruta = ruta
+        self.directorio = directorio
+        self._df = None
+        self._firma = None
+
+    def _ruta(self):
+        return self.ruta or os.path.join(self.directorio, ARCHIVO_REGISTRO)
+
+    def _cargar(self):
+        ruta = self._ruta()
+        firma = (ruta, _firma_archivo(ruta))
+        if firma[1] is None:
+            raise FileNotFoundError(ruta)
+        if firma != self._firma:
+            self._df = tipar_registro(_leer_registro_excel(ruta))
+            self._firma = firma
+        return self._df
+
+    def _indice(self, df, id_empleado, fecha):
+        if 'id empleado' not in df.columns or 'fecha' not in df.columns:
+            return df.index[:0]
+        _registrar_io(filas=len(df))
+        with _fase('busqueda_dataframe'):
+            return df[(df['id empleado'] == id_empleado) & (df['fecha'] == _valor_tipado(df['fecha'], 'fecha', fecha))].index
+
+    def buscar(self, id_empleado, fecha):
+        df = self._cargar()
+        idx = self._indice(df, id_empleado, fecha)
+        return {col: _valor_como_texto(col, valor) for col, valor in df.loc[idx[0]].items()} if not idx.empty else None
+
+    def guardar(self, registro, evento):
+        self.guardar_lote([(registro, evento)])
+
+    def guardar_lote(self, eventos):
+        """Aplica varios eventos sobre el DataFrame y reescribe el archivo una sola vez."""
+        df = self._cargar()
+        nuevos = {} # Filas nuevas del lote; los eventos posteriores del mismo día las reemplazan
+        posiciones = None
+        if len(eventos) > 1 and 'id empleado' in df.columns and 'fecha' in df.columns:
+            # En lotes grandes (p. ej. un recálculo) se indexa una vez en lugar de recorrer el DataFrame por evento
+            _registrar_io(filas=len(df))
+            posiciones = {}
+            for i, clave in zip(df.index, zip(df['id empleado'], registro_como_texto(df[['fecha']])['fecha'])):
+                posiciones.setdefault(clave, i)
+        for registro, evento in eventos:
+            clave = (registro['id empleado'], registro['fecha'])
+            if posiciones is not None:
+                fila = posiciones.get(clave)
+            else:
+                idx = self._indice(df, *clave)
+                fila = None if idx.empty else idx[0]
+            if fila is None:
+                nuevos[clave] = registro
+                continue
+            for col in COLUMNAS_POR_EVENTO.get(evento, []):
+                valor = _valor_tipado(df[col], col, registro[col])
+                if str(df[col].dtype) == ESQUEMA_REGISTRO[col]:
+                    if isinstance(df[col].dtype, pd.CategoricalDtype) and valor is not None \
+                            and valor not in df[col].cat.categories:
+                        df[col] = df[col].cat.add_categories([valor])
+                elif df[col].dtype != object:
+                    # Columna sin convertir: las aún vacías se leen como float; se pasan a object antes de asignar texto
+                    df[col] = df[col].astype(object)
+                df.loc[fila, col] = valor
+        if nuevos:
+            # concat pierde el tipo category si las categorías difieren; tipar_registro lo restablece
+            df = tipar_registro(pd.concat([df, tipar_registro(pd.DataFrame(list(nuevos.values())))], ignore_index=True))
+        ruta = self._ruta()
+        try:
+            _escribir_excel(registro_como_texto(df), ruta)
+        except Exception:
+            self._firma = None # El DataFrame en memoria ya no refleja el archivo
+            raise
+        self._df = df
+        self._firma = (ruta, _firma_archivo(ruta))
+
+    def leer(self, desde=None, hasta=None):
+        return _filtrar_fechas(self._cargar(), desde, hasta).copy()
+
+    def iterar(self, desde=None, hasta=None):
+        """Si el archivo ya está en memoria lo reutiliza; si no, lo lee por bloques sin cargarlo entero."""
+        ruta = self._ruta()
+        if self._firma is not None and self._firma == (ruta, _firma_archivo(ruta)):
+            yield self.leer(desde, hasta)
+        else:
+            for bloque in _iterar_registro_excel(ruta, desde, hasta):
+                yield tipar_registro(bloque)
+
+    def exportar_xlsx(self):
+        pass # El propio almacén ya es el Excel
+
+    def cerrar(self):
+        pass
+
+class AlmacenDiario:
+    """Eventos anexados al diario del día (ver DIARIO DE EVENTOS); el Excel guarda los días compactados."""
+
+    def __init__(self, directorio=''):
+        self.directorio = directorio
+        self.ruta_registro = os.path.join(directorio, ARCHIVO_REGISTRO)
+        self._estado = {'fecha': None, 'offset': 0, 'registros': {}}
+
+    def buscar(self, id_empleado, fecha):
+        registro = _estado_dia(self._estado, fecha, self.directorio).get(id_empleado)
+        return dict(registro) if registro is not None else None
+
+    def guardar(self, registro, evento):
+        self.guardar_lote([(registro, evento)])
+
+    def guardar_lote(self, eventos):
+        _anexar_diario([_linea_diario(registro, evento) for registro, evento in eventos], self.directorio)
+        for fecha in {registro['fecha'] for registro, _ in eventos}:
+            _estado_dia(self._estado, fecha, self.directorio)
+
+    def _fechas(self, desde, hasta):
+        return [f for f in _fechas_en_diario(self.directorio)
+                if (desde is None or f >= desde) and (hasta is None or f <= hasta)]
+
+    def leer(self, desde=None, hasta=None):
+        df = _leer_registro_excel(self.ruta_registro)
+        fechas = self._fechas(desde, hasta)
+        if fechas:
+            filas = []
+            for fecha in fechas:
+                registros = _registros_de_fecha(df, fecha)
+                _reproducir_diario(registros, _ruta_diario(fecha, self.directorio))
+                filas.extend(registros.values())
+            df = pd.concat([df[~df['fecha'].isin(fechas)], pd.DataFrame(filas, columns=COLUMNAS_REGISTRO)],
+                           ignore_index=True)
+        return tipar_registro(_filtrar_fechas(df, desde, hasta))
+
+    def iterar(self, desde=None, hasta=None):
+        """Recorre el Excel por bloques y al final entrega los días que aún viven en el diario."""
+        fechas = self._fechas(desde, hasta)
+        base_diario = [] # Filas del Excel de los días con diario, que se completan reproduciéndolo
+        if os.path.exists(self.ruta_registro):
+            for bloque in _iterar_registro_excel(self.ruta_registro, desde, hasta):
+                en_diario = bloque['fecha'].isin(fechas)
+                base_diario.append(bloque[en_diario])
+                yield tipar_registro(bloque[~en_diario])
+        if fechas:
+            df = pd.concat(base_diario, ignore_index=True) if base_diario else pd.DataFrame(columns=COLUMNAS_REGISTRO)
+            for fecha in fechas:
+                registros = _registros_de_fecha(df, fecha)
+                _reproducir_diario(registros, _ruta_diario(fecha, self.directorio))
+                yield tipar_registro(pd.DataFrame(list(registros.values()), columns=COLUMNAS_REGISTRO))
+
+    def exportar_xlsx(self):
+        compactar_diario(self.directorio)
+
+    def cerrar(self):
+        self._estado.update(fecha=None, offset=0, registros={})
+
+class AlmacenSQLite:
+    """Registro en una base SQLite (modo WAL) con índice único (id empleado, fecha) e índice por fecha.
+    Buscar el registro de hoy es una consulta por índice y cada evento es un INSERT o UPDATE de una fila.
+    Al crearse la base se importa el historial de ARCHIVO_REGISTRO; al cerrar se exporta de nuevo al Excel."""
+
+    def __init__(self, ruta=None, directorio=''):
+        self.ruta = ruta or os.path.join(directorio, ARCHIVO_SQLITE)
+        self.ruta_registro = os.path.join(directorio, ARCHIVO_REGISTRO)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.ruta, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columnas = ", ".join(f'"{col}" {tipo}' for col, tipo in _TIPOS_SQLITE.items())
+        with self._conn:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS registro ({columnas})")
+            self._conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS ix_registro_id_fecha ON registro ("id empleado", fecha)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS ix_registro_fecha ON registro (fecha)')
+        if self._conn.execute("SELECT COUNT(*) FROM registro").fetchone()[0] == 0:
+            self._importar_excel()
+
+    def _importar_excel(self):
+        if not os.path.exists(self.ruta_registro):
+            return
+        bitacora.info("Importando historial de '%s' a '%s'...", self.ruta_registro, self.ruta)
+        df = _leer_registro_excel(self.ruta_registro).reindex(columns=COLUMNAS_REGISTRO)
+        filas = [[_valor_sql(v) for v in fila] for fila in df.itertuples(index=False)]
+        with self._conn:
+            self._conn.executemany(f"INSERT OR IGNORE INTO registro ({_COLUMNAS_SQL}) VALUES ({_MARCAS_SQL})", filas)
+        bitacora.info("%s registro(s) importados a '%s'.", len(filas), self.ruta)
+
+    def buscar(self, id_empleado, fecha):
+        with self._lock, _fase('sqlite'):
+            fila = self._conn.execute('SELECT * FROM registro WHERE "id empleado" = ? AND fecha = ?',
+                                      (id_empleado, fecha)).fetchone()
+        return dict(fila) if fila is not None else None
+
+    def guardar(self, registro, evento):
+        self.guardar_lote([(registro, evento)])
+
+    def guardar_lote(self, eventos):
+        """Guarda varios eventos en una sola transacción."""
+        _registrar_io(filas=len(eventos))
+        with self._lock, _fase('sqlite'), self._conn:
+            for registro, evento in eventos:
+                if evento == "entrada":
+                    # Si la fila ya existe (p. ej. al recuperar eventos pendientes que sí se guardaron antes
+                    # de la caída) la entrada se ignora, como en los demás almacenes; no pisa los eventos posteriores
+                    self._conn.execute(f"INSERT OR IGNORE INTO registro ({_COLUMNAS_SQL}) VALUES ({_MARCAS_SQL})",
+                                       [_valor_sql(registro.get(col)) for col in COLUMNAS_REGISTRO])
+                else:
+                    columnas = COLUMNAS_POR_EVENTO[evento]
+                    asignaciones = ", ".join(f'"{col}" = ?' for col in columnas)
+                    self._conn.execute(f'UPDATE registro SET {asignaciones} WHERE "id empleado" = ? AND fecha = ?',
+                                       [_valor_sql(registro.get(col)) for col in columnas]
+                                       + [registro['id empleado'], registro['fecha']])
+
+    def leer(self, desde=None, hasta=None):
+        with self._lock:
+            df = pd.read_sql_query('SELECT * FROM registro WHERE fecha >= ? AND fecha <= ? ORDER BY fecha',
+                                   self._conn, params=(desde or '0000-00-00', hasta or '9999-99-99'))
+        return tipar_registro(df)
+
+    def iterar(self, desde=None, hasta=None, filas_por_bloque=50000):
+        with self._lock:
+            cursor = self._conn.execute('SELECT * FROM registro WHERE fecha >= ? AND fecha <= ? ORDER BY fecha',
+                                        (desde or '0000-00-00', hasta or '9999-99-99'))
+            columnas = [d[0] for d in cursor.description]
+            while True:
+                filas = cursor.fetchmany(filas_por_bloque)
+                if not filas:
+                    break
+                yield tipar_registro(pd.DataFrame([tuple(f) for f in filas], columns=columnas))
+
+    def exportar_xlsx(self):
+        bitacora.info("Exportando '%s' a '%s'...", self.ruta, self.ruta_registro)
+        _escribir_excel(registro_como_texto(self.leer()), self.ruta_registro)
+
+    def cerrar(self):
+        self.exportar_xlsx()
+        self._conn.close()
+
+class AlmacenParticionado:
+    """Registro dividido por mes en DIRECTORIO_PARTICIONES/AAAA-MM.xlsx.
+    Las operaciones del día solo abren la partición del mes en curso; cada partición se maneja
+    como un AlmacenExcel propio. migrar_a_particiones() divide un registro monolítico existente."""
+
+    def __init__(self, directorio=''):
+        self.directorio = directorio
+        self._particiones = {}
+
+    def _particion(self, fecha):
+        mes = fecha[:7]
+        if mes not in self._particiones:
+            self._particiones[mes] = AlmacenExcel(_ruta_particion(mes, self.directorio))
+        return self._particiones[mes]
+
+    def buscar(self, id_empleado, fecha):
+        if not os.path.exists(_ruta_particion(fecha[:7], self.directorio)):
+            return None
+        return self._particion(fecha).buscar(id_empleado, fecha)
+
+    def guardar(self, registro, evento):
+        self.guardar_lote([(registro, evento)])
+
+    def guardar_lote(self, eventos):
+        """Agrupa los eventos por mes y escribe cada partición afectada una sola vez."""
+        por_mes = {}
+        for registro, evento in eventos:
+            por_mes.setdefault(registro['fecha'][:7], []).append((registro, evento))
+        for mes, eventos_mes in por_mes.items():
+            ruta = _ruta_particion(mes, self.directorio)
+            if not os.path.exists(ruta):
+                os.makedirs(os.path.dirname(ruta), exist_ok=True)
+                _crear_excel_vacio(ruta, COLUMNAS_REGISTRO)
+                bitacora.info("Partición '%s' creada.", ruta)
+            self._particion(mes).guardar_lote(eventos_mes)
+
+    def _meses(self, desde=None, hasta=None):
+        return [mes for mes in _meses_particionados(self.directorio)
+                if (desde is None or mes >= desde[:7]) and (hasta is None or mes <= hasta[:7])]
+
+    def leer(self, desde=None, hasta=None):
+        bloques = [_filtrar_fechas(_leer_registro_excel(_ruta_particion(mes, self.directorio)), desde, hasta)
+                   for mes in self._meses(desde, hasta)]
+        if not bloques:
+            return pd.DataFrame(columns=COLUMNAS_REGISTRO)
+        return tipar_registro(pd.concat(bloques, ignore_index=True))
+
+    def iterar(self, desde=None, hasta=None):
+        """Recorre las particiones del rango una a una y cada una por bloques, sin cargar las demás."""
+        for mes in self._meses(desde, hasta):
+            for bloque in _iterar_registro_excel(_ruta_particion(mes, self.directorio), desde, hasta):
+                yield tipar_registro(bloque)
+
+    def exportar_xlsx(self):
+        pass # Cada partición ya es un Excel
+
+    def cerrar(self):
+        pass
+
+def _ruta_particion(mes, directorio=''):
+    return os.path.join(directorio, DIRECTORIO_PARTICIONES, f"{mes}.xlsx")
+
+def _meses_particionados(directorio=''):
+    """Meses 'AAAA-MM' con partición en disco, en orden."""
+    carpeta = os.path.join(directorio, DIRECTORIO_PARTICIONES)
+    if not os.path.isdir(carpeta):
+        return []
+    return sorted(nombre[:-len('.xlsx')] for nombre in os.listdir(carpeta)
+                  if nombre.endswith('.xlsx') and not nombre.startswith('~$'))
+
+@instrumentar
+def migrar_a_particiones(origen=None):
+    """Divide un registro monolítico en particiones mensuales. Si una partición ya existe, sus filas
+    prevalecen sobre las del origen para el mismo (id empleado, fecha). El archivo de origen no se modifica.
+    Devuelve {mes: filas escritas}."""
+    origen = origen or ARCHIVO_REGISTRO
+    bitacora.info("Migrando '%s' a particiones mensuales en '%s'...", origen, DIRECTORIO_PARTICIONES)
+    df = _leer_registro_excel(origen).reindex(columns=COLUMNAS_REGISTRO)
+    df['fecha'] = df['fecha'].astype(str).str[:10]
+    os.makedirs(DIRECTORIO_PARTICIONES, exist_ok=True)
+
+    resumen = {}
+    for mes, filas_mes in df.groupby(df['fecha'].str[:7], sort=True):
+        ruta = _ruta_particion(mes)
+        if os.path.exists(ruta):
+            existentes = _leer_registro_excel(ruta).reindex(columns=COLUMNAS_REGISTRO)
+            filas_mes = pd.concat([existentes, filas_mes], ignore_index=True)
+        filas_mes = filas_mes.drop_duplicates(subset=['id empleado', 'fecha'], keep='first')
+        _escribir_excel(filas_mes, ruta)
+        resumen[mes] = len(filas_mes)
+        bitacora.info("Partición '%s': %s registro(s).", ruta, len(filas_mes))
+    bitacora.info("Migración completada: %s registro(s) en %s partición(es).", len(df), len(resumen))
+    return resumen
+
+_TIPOS_SQLITE = {
+    'id empleado': 'TEXT NOT NULL',
+    'nombre completo': 'TEXT',
+    'cargo': 'TEXT',
+    'fecha': 'TEXT NOT NULL',
+    'hora entrada': 'TEXT',
+    'jornada horas': 'REAL',
+    'hora inicio almuerzo': 'TEXT',
+    'hora fin almuerzo': 'TEXT',
+    'hora salida': 'TEXT',
+    'horas trabajadas': 'REAL',
+    'tiempo extra minutos': 'INTEGER',
+    'tiempo almuerzo minutos': 'INTEGER',
+}
+_COLUMNAS_SQL = ", ".join(f'"{col}"' for col in COLUMNAS_REGISTRO)
+_MARCAS_SQL = ", ".join("?" for _ in COLUMNAS_REGISTRO)
+
+class AlmacenDiferido:
+    """Escritura diferida (group commit) sobre cualquier otro almacén.
+    Cada evento actualiza al instante una capa en memoria y se anota en ARCHIVO_PENDIENTES (con fsync);
+    un hilo vacía los pendientes al almacén base con un solo guardar_lote cada
+    intervalo_s segundos o al acumular lote eventos.
+    Si el programa se cae, los eventos anotados se recuperan y se guardan al crear el almacén."""
+
+    def __init__(self, base, intervalo_s, lote, directorio=''):
+        self.base = base
+        self.intervalo_s = intervalo_s
+        self.lote = lote
+        self.ruta_pendientes = os.path.join(directorio, ARCHIVO_PENDIENTES)
+        self._lock = threading.RLock()
+        self._pendientes = []
+        self._capa = {} # (id empleado, fecha) -> registro más reciente aún no guardado
+        self._eventos = 0
+        self._escrituras = 0
+        self._recuperar()
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._vaciar_periodicamente, name="escritura-diferida", daemon=True)
+        self._hilo.start()
+
+    def _recuperar(self):
+        if not os.path.exists(self.ruta_pendientes):
+            return
+        with open(self.ruta_pendientes, 'rb') as f:
+            lineas = [linea for linea in f if linea.endswith(b'\n')]
+        if not lineas:
+            return
+        bitacora.warning("Recuperando %s evento(s) sin guardar de '%s'...", len(lineas), self.ruta_pendientes)
+        for linea in lineas:
+            pendiente = json.loads(linea)
+            self._anotar(pendiente['registro'], pendiente['evento'])
+        try:
+            self.vaciar()
+        except Exception as e:
+            bitacora.error("No se pudieron guardar los eventos recuperados; se reintentará: %s", e)
+
+    def _anotar(self, registro, evento):
+        self._pendientes.append((registro, evento))
+        self._capa[(registro['id empleado'], registro['fecha'])] = registro
+        self._eventos += 1
+
+    def buscar(self, id_empleado, fecha):
+        with self._lock:
+            registro = self._capa.get((id_empleado, fecha))
+            if registro is not None:
+                return dict(registro)
+            return self.base.buscar(id_empleado, fecha)
+
+    def guardar(self, registro, evento):
+        self.guardar_lote([(registro, evento)])
+
+    def guardar_lote(self, eventos):
+        with self._lock:
+            with _fase('fsync_pendientes'), open(self.ruta_pendientes, 'a', encoding='utf-8') as f:
+                for registro, evento in eventos:
+                    f.write(json.dumps({'evento': evento, 'registro': registro},
+                                       ensure_ascii=False, default=_valor_sql) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            _registrar_io(archivos=1)
+            for registro, evento in eventos:
+                self._anotar(dict(registro), evento)
+            if len(self._pendientes) >= self.lote:
+                self.vaciar()
+
+    @instrumentar
+    def vaciar(self):
+        """Guarda en el almacén base todos los eventos pendientes con una sola escritura."""
+        with self._lock:
+            if not self._pendientes:
+                return
+            self.base.guardar_lote(self._pendientes)
+            self._escrituras += 1
+            bitacora.debug("Escritura diferida: %s evento(s) guardados en una escritura.", len(self._pendientes))
+            self._pendientes = []
+            self._capa = {}
+            open(self.ruta_pendientes, 'w').close()
+
+    def _vaciar_periodicamente(self):
+        while not self._detener.wait(self.intervalo_s):
+            try:
+                self.vaciar()
+            except Exception as e:
+                # Los eventos siguen en memoria y en ARCHIVO_PENDIENTES; se reintenta en el siguiente ciclo
+                bitacora.error("Error en escritura diferida: %s", e)
+
+    def estadisticas(self):
+        """Eventos recibidos, escrituras reales al almacén base y escrituras ahorradas."""
+        with self._lock:
+            return {
+                'eventos': self._eventos,
+                'escrituras': self._escrituras,
+                'escrituras_ahorradas': self._eventos - self._escrituras - len(self._pendientes),
+                'pendientes': len(self._pendientes),
+            }
+
+    def leer(self, desde=None, hasta=None):
+        with self._lock:
+            self.vaciar()
+            return self.base.leer(desde, hasta)
+
+    def iterar(self, desde=None, hasta=None):
+        with self._lock:
+            self.vaciar()
+        return self.base.iterar(desde, hasta)
+
+    def exportar_xlsx(self):
+        with self._lock:
+            self.vaciar()
+            self.base.exportar_xlsx()
+
+    def cerrar(self):
+        self._detener.set()
+        self._hilo.join()
+        self.vaciar()
+        bitacora.info("Escritura diferida: %s", self.estadisticas())
+        self.base.cerrar()
+
+_ALMACENES = {'excel': AlmacenExcel, 'diario': AlmacenDiario, 'sqlite': AlmacenSQLite,
+              'particionado': AlmacenParticionado}
@@ -0,0 +1,230 @@
+"""Benchmark de la capa de datos de Registros_base.py con datos sintéticos.
+
+Genera empleados_nuevo.xlsx y registro_personal_nuevo.xlsx a la escala pedida en un directorio
+temporal, mide las funciones de datos y escribe los resultados en JSON. Con --linea-base compara
+contra un resultado guardado y termina con código 1 si alguna operación empeoró más de la tolerancia.
+
+Ejemplos:
+    python benchmark_datos.py --empleados 100 1000 --dias 30 365 --salida resultados.json
+    python benchmark_datos.py --linea-base resultados.json --tolerancia 0.25
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import Registros_base as rb
+import almacenes
+
+CARGOS = ['Operario', 'Analista de datos', 'Diseñadora', 'Ingeniera Mecatrónica', 'Supervisor', 'Auxiliar']
+EVENTOS = ['entrada', 'inicio_almuerzo', 'fin_almuerzo', 'salida']
+
+def _hhmmss(segundos):
+    """Convierte un arreglo de segundos del día en textos 'HH:MM:SS'."""
+    segundos = np.asarray(segundos, dtype=np.int64)
+    return [f"{h:02d}:{m:02d}:{s:02d}" for h, m, s in zip(segundos // 3600, segundos // 60 % 60, segundos % 60)]
+
+def generar_datos(directorio, empleados, dias, asistencia=1.0, semilla=0):
+    """Escribe en directorio un archivo de empleados y un registro con `dias` días de historial
+    anteriores a hoy. Cada día asiste aproximadamente la fracción `asistencia` de los empleados.
+    Retorna el número de filas de registro generadas."""
+    rng = np.random.default_rng(semilla)
+    ids = [f"E{i:06d}" for i in range(empleados)]
+    jornadas = rng.choice([4, 5, 6, 7], size=empleados)
+    df_empleados = pd.DataFrame({
+        'id empleado': ids,
+        'nombre completo': [f"Empleado {i}" for i in range(empleados)],
+        'edad': rng.integers(18, 65, size=empleados),
+        'cargo': rng.choice(CARGOS, size=empleados),
+        'jornada horas': jornadas,
+    })
+    df_empleados.to_excel(os.path.join(directorio, rb.ARCHIVO_EMPLEADOS), index=False)
+
+    hoy = datetime.now().date()
+    fechas = [(hoy - timedelta(days=d)).strftime('%Y-%m-%d') for d in range(dias, 0, -1)]
+    asiste = rng.random((dias, empleados)) < asistencia
+    dia_idx, emp_idx = np.nonzero(asiste)
+    n = len(dia_idx)
+
+    entrada = rng.integers(6 * 3600, 9 * 3600, size=n)
+    inicio_alm = entrada + rng.integers(3 * 3600, 4 * 3600, size=n)
+    almuerzo = rng.integers(30 * 60, 70 * 60, size=n)
+    fin_alm = inicio_alm + almuerzo
+    jornada = jornadas[emp_idx]
+    salida = np.minimum(fin_alm + jornada * 3600 - (inicio_alm - entrada) + rng.integers(-1800, 5400, size=n),
+                        86399)
+    trabajado = (salida - entrada) - almuerzo
+
+    df_registro = pd.DataFrame({
+        'id empleado': np.asarray(ids)[emp_idx],
+        'nombre completo': df_empleados['nombre completo'].to_numpy()[emp_idx],
+        'cargo': df_empleados['cargo'].to_numpy()[emp_idx],
+        'fecha': np.asarray(fechas)[dia_idx],
+        'hora entrada': _hhmmss(entrada),
+        'jornada horas': jornada,
+        'hora inicio almuerzo': _hhmmss(inicio_alm),
+        'hora fin almuerzo': _hhmmss(fin_alm),
+        'hora salida': _hhmmss(salida),
+        'horas trabajadas': np.round(trabajado / 3600, 2),
+        'tiempo extra minutos': np.round(np.maximum(0, trabajado - jornada * 3600) / 60).astype(int),
+        'tiempo almuerzo minutos': np.round(almuerzo / 60).astype(int),
+    }, columns=rb.COLUMNAS_REGISTRO)
+    df_registro.to_excel(os.path.join(directorio, rb.ARCHIVO_REGISTRO), index=False)
+    return n
+
+def _medir(funcion, *args, **kwargs):
+    """Ejecuta funcion sin salida por consola ni avisos y devuelve los segundos que tardó."""
+    with contextlib.redirect_stdout(io.StringIO()), rb.capturar_avisos():
+        inicio = time.perf_counter()
+        funcion(*args, **kwargs)
+        return time.perf_counter() - inicio
+
+def _resumen(muestras):
+    return {
+        'mediana_ms': round(statistics.median(muestras) * 1000, 3),
+        'min_ms': round(min(muestras) * 1000, 3),
+        'max_ms': round(max(muestras) * 1000, 3),
+        'muestras': len(muestras),
+    }
+
+def medir_escenario(empleados, dias, repeticiones, asistencia=1.0, archivo=False):
+    """Genera un escenario en un directorio temporal y mide cada operación `repeticiones` veces.
+    Con archivo=True compara además la carga del xlsx con la del archivo columnar y sus tamaños."""
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench_registro_") as directorio:
+        filas = generar_datos(directorio, empleados, dias, asistencia)
+        os.chdir(directorio)
+        try:
+            rb.cerrar_almacen()
+            rb.invalidar_cache_empleados()
+            tiempos = {}
+
+            tiempos['inicializar_archivos'] = [_medir(rb.inicializar_archivos) for _ in range(repeticiones)]
+
+            ids = [f"E{i:06d}" for i in range(min(repeticiones, empleados))]
+            frio = []
+            for id_empleado in ids:
+                rb.invalidar_cache_empleados()
+                frio.append(_medir(rb.obtener_datos_empleado, id_empleado))
+            tiempos['obtener_datos_empleado (frío)'] = frio
+            tiempos['obtener_datos_empleado'] = [_medir(rb.obtener_datos_empleado, i) for i in ids]
+            tiempos['verificar_registro_hoy'] = [_medir(rb.verificar_registro_hoy, i) for i in ids]
+
+            for evento in EVENTOS:
+                tiempos[f"registrar_evento('{evento}')"] = []
+            tiempos['obtener_registro_actual'] = []
+            for id_empleado in ids:
+                for evento in EVENTOS:
+                    tiempos[f"registrar_evento('{evento}')"].append(
+                        _medir(rb.registrar_evento, id_empleado, evento, jornada_horas=8))
+                    if evento == 'entrada':
+                        tiempos['obtener_registro_actual'].append(_medir(rb.obtener_registro_actual, id_empleado))
+
+            tamanos = None
+            if archivo:
+                _medir(rb.archivar_meses, hasta_mes=datetime.now().strftime('%Y-%m'))
+                ultimo_mes = rb._meses_archivados()[-1]
+                tiempos['cargar xlsx (completo)'] = [_medir(almacenes._leer_registro_excel) for _ in range(repeticiones)]
+                tiempos['cargar_archivo (completo)'] = [_medir(rb.cargar_archivo) for _ in range(repeticiones)]
+                tiempos['cargar_archivo (2 columnas, 1 mes)'] = [
+                    _medir(rb.cargar_archivo, f"{ultimo_mes}-01", rb._ultimo_dia_mes(ultimo_mes),
+                           ['id empleado', 'horas trabajadas'])
+                    for _ in range(repeticiones)]
+                tamanos = {
+                    'xlsx': os.path.getsize(rb.ARCHIVO_REGISTRO),
+                    'archivo': sum(os.path.getsize(rb._ruta_archivo_mes(mes)) for mes in rb._meses_archivados()),
+                }
+            rb.cerrar_almacen()
+        finally:
+            os.chdir(directorio_original)
+
+    resultado = {
+        'empleados': empleados,
+        'dias': dias,
+        'filas': filas,
+        'operaciones': {operacion: _resumen(muestras) for operacion, muestras in tiempos.items()},
+    }
+    if tamanos is not None:
+        resultado['tamano_bytes'] = tamanos
+    return resultado
+
+def comparar(actual, linea_base, tolerancia):
+    """Compara la mediana de cada operación con la línea base. Retorna la lista de regresiones."""
+    base = {(e['empleados'], e['dias']): e['operaciones'] for e in linea_base['escenarios']}
+    regresiones = []
+    print(f"\n{'escenario':<16} {'operación':<36} {'base ms':>10} {'actual ms':>10} {'cambio':>8}")
+    for escenario in actual['escenarios']:
+        clave = (escenario['empleados'], escenario['dias'])
+        if clave not in base:
+            continue
+        for operacion, medida in escenario['operaciones'].items():
+            anterior = base[clave].get(operacion)
+            if anterior is None or anterior['mediana_ms'] <= 0:
+                continue
+            cambio = medida['mediana_ms'] / anterior['mediana_ms'] - 1
+            marca = " <-- regresión" if cambio > tolerancia else ""
+            print(f"{f'{clave[0]}x{clave[1]}':<16} {operacion:<36} {anterior['mediana_ms']:>10.2f} "
+                  f"{medida['mediana_ms']:>10.2f} {cambio:>+8.0%}{marca}")
+            if marca:
+                regresiones.append((clave, operacion, cambio))
+    return regresiones
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de la capa de datos con datos sintéticos")
+    parser.add_argument('--empleados', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--dias', type=int, nargs='+', default=[30])
+    parser.add_argument('--asistencia', type=float, default=1.0,
+                        help="Fracción de empleados que marca cada día (por defecto 1.0)")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--almacenamiento', choices=['excel', 'diario', 'sqlite', 'particionado'], default=rb.ALMACENAMIENTO)
+    parser.add_argument('--archivo', action='store_true',
+                        help="Compara además la carga y el tamaño del xlsx contra el archivo columnar")
+    parser.add_argument('--salida', help="Archivo JSON donde guardar los resultados")
+    parser.add_argument('--linea-base', help="Resultados JSON previos contra los que comparar")
+    parser.add_argument('--tolerancia', type=float, default=0.2,
+                        help="Empeoramiento relativo de la mediana que se considera regresión (por defecto 0.2)")
+    args = parser.parse_args(argv)
+
+    rb.ALMACENAMIENTO = args.almacenamiento
+    resultados = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'almacenamiento': args.almacenamiento,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'escenarios': [],
+    }
+    for empleados in args.empleados:
+        for dias in args.dias:
+            print(f"Escenario {empleados} empleados x {dias} días...", file=sys.stderr)
+            resultados['escenarios'].append(
+                medir_escenario(empleados, dias, args.repeticiones, args.asistencia, args.archivo))
+
+    texto = json.dumps(resultados, ensure_ascii=False, indent=2)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+        print(f"Resultados guardados en '{args.salida}'.", file=sys.stderr)
+    else:
+        print(texto)
+
+    if args.linea_base:
+        with open(args.linea_base, encoding='utf-8') as f:
+            regresiones = comparar(resultados, json.load(f), args.tolerancia)
+        if regresiones:
+            print(f"\n{len(regresiones)} regresión(es) por encima de {args.tolerancia:.0%}.")
+            return 1
+        print("\nSin regresiones.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
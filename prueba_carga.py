@@ -0,0 +1,395 @@
+"""Prueba de carga de la capa de datos de Registros_base.py: varios kioscos marcando a la vez en un cambio de turno.
+
+Cada kiosco es un proceso (o un hilo con --modo hilos) que repite lo que hace la interfaz sin ventana:
+consultar_login antes de cada marca, registrar_entrada y registrar_evento para el almuerzo y la salida.
+Los empleados se reparten entre los kioscos y sus marcas siguen dos turnos (06:00-14:00 y 14:00-22:00)
+con un reloj simulado, de modo que la salida del primer turno coincide con la entrada del segundo.
+Una fracción de las entradas se escanea además en otro kiosco al mismo tiempo (doble escaneo).
+
+Al terminar compara lo que cada kiosco recibió como guardado con lo que quedó en el almacenamiento
+(actualizaciones perdidas y filas duplicadas) y revisa que los archivos de datos sigan siendo legibles.
+Informa rendimiento y percentiles de latencia por operación, y termina con código 1 si hubo pérdidas,
+duplicados, archivos dañados, excepciones u operaciones que terminaron en aviso de error.
+
+Ejemplos:
+    python prueba_carga.py --kioscos 4 --empleados 200 --almacenamiento sqlite
+    python prueba_carga.py --kioscos 8 --modo hilos --escala 2 --salida carga.json
+    python prueba_carga.py --servidor 127.0.0.1:8765 --kioscos 8
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import Registros_base as rb
+import almacenes
+import benchmark_datos
+
+# Turnos simulados: (hora de entrada, hora de inicio de almuerzo, hora de salida) en horas del día
+TURNOS = [(6, 10, 14), (14, 18, 22)]
+DISPERSION_MINUTOS = 10 # Desviación típica de cada marca alrededor de su hora
+PROBABILIDAD_SIN_ALMUERZO = 0.1
+PROBABILIDAD_ID_DESCONOCIDO = 0.02 # Escaneos de un ID que no existe (solo consultar_login)
+
+# --- RELOJ SIMULADO ---
+_reloj = threading.local()
+
+class RelojSimulado(datetime):
+    """Sustituye a datetime en Registros_base: now() devuelve la hora simulada del hilo, si la hay."""
+
+    @classmethod
+    def now(cls, tz=None):
+        ahora = getattr(_reloj, 'ahora', None)
+        return ahora if ahora is not None else datetime.now(tz)
+
+def _fijar_reloj(segundo_del_dia):
+    _reloj.ahora = datetime.combine(datetime.now().date(), datetime.min.time()) + timedelta(seconds=segundo_del_dia)
+
+# --- PLAN DE MARCAS ---
+
+def planificar_turnos(ids, kioscos, duplicados=0.02, semilla=0):
+    """Reparte las marcas de los dos turnos entre los kioscos. Cada empleado marca siempre en el mismo
+    kiosco, así sus eventos se aplican en orden; los dobles escaneos de entrada van a otro kiosco.
+    Retorna una lista por kiosco de (segundo del día, operación, id empleado, jornada horas) ordenada."""
+    rng = random.Random(semilla)
+    planes = [[] for _ in range(kioscos)]
+
+    def hora(base_horas):
+        segundo = base_horas * 3600 + rng.gauss(0, DISPERSION_MINUTOS * 60)
+        return int(min(max(segundo, 0), 86399))
+
+    for posicion, id_empleado in enumerate(ids):
+        kiosco = rng.randrange(kioscos)
+        entrada_h, almuerzo_h, salida_h = TURNOS[posicion % len(TURNOS)]
+        jornada = salida_h - entrada_h - 1
+        entrada = hora(entrada_h)
+        planes[kiosco].append((entrada, 'entrada', id_empleado, jornada))
+        if kioscos > 1 and rng.random() < duplicados:
+            otro = (kiosco + rng.randrange(1, kioscos)) % kioscos
+            planes[otro].append((entrada, 'entrada', id_empleado, jornada))
+        if rng.random() >= PROBABILIDAD_SIN_ALMUERZO:
+            inicio_almuerzo = max(hora(almuerzo_h), entrada + 60)
+            planes[kiosco].append((inicio_almuerzo, 'inicio_almuerzo', id_empleado, jornada))
+            planes[kiosco].append((inicio_almuerzo + rng.randint(30 * 60, 70 * 60), 'fin_almuerzo', id_empleado, jornada))
+        planes[kiosco].append((max(hora(salida_h), entrada + 3600), 'salida', id_empleado, jornada))
+        if rng.random() < PROBABILIDAD_ID_DESCONOCIDO:
+            planes[rng.randrange(kioscos)].append((entrada, 'login', f"X{posicion:06d}", jornada))
+
+    for plan in planes:
+        plan.sort(key=lambda marca: marca[0])
+    return planes
+
+# --- KIOSCOS ---
+
+def _configurar(config):
+    """Deja Registros_base (y sus almacenes) como lo tendría un kiosco: directorio, almacenamiento y reloj simulado."""
+    os.chdir(config['directorio'])
+    rb.ALMACENAMIENTO = config['almacenamiento']
+    rb.ESCRITURA_DIFERIDA = config['escritura_diferida']
+    rb.datetime = RelojSimulado
+    almacenes.datetime = RelojSimulado # compactar_diario decide qué días están cerrados
+
+def _operaciones(config):
+    """Funciones que llama el kiosco: las del módulo o las del servidor de datos."""
+    if config['servidor']:
+        cliente = rb.ClienteDatos(config['servidor'])
+        return {nombre: (lambda *args, _nombre=nombre, **kwargs: cliente.llamar(_nombre, *args, **kwargs))
+                for nombre in ('consultar_login', 'registrar_entrada', 'registrar_evento')}
+    return {'consultar_login': rb.consultar_login, 'registrar_entrada': rb.registrar_entrada,
+            'registrar_evento': rb.registrar_evento}
+
+def ejecutar_kiosco(plan, config, barrera, inicio_simulado):
+    """Ejecuta el plan de un kiosco y retorna latencias, confirmaciones, excepciones y avisos de error."""
+    operaciones = _operaciones(config)
+    latencias = defaultdict(list)
+    confirmadas = [] # (id empleado, columna, valor) que el almacenamiento devolvió como guardados
+    excepciones = Counter()
+    avisos_error = Counter()
+    mensajes_error = [] # Primeros mensajes de error, para saber qué falló
+    barrera.wait()
+    inicio = time.time()
+
+    for segundo, evento, id_empleado, jornada in plan:
+        if config['escala']:
+            espera = inicio + (segundo - inicio_simulado) / 3600 * config['escala'] - time.time()
+            if espera > 0:
+                time.sleep(espera)
+        _fijar_reloj(segundo)
+        with rb.capturar_avisos() as avisos:
+            try:
+                t0 = time.perf_counter()
+                operaciones['consultar_login'](id_empleado)
+                latencias['consultar_login'].append(time.perf_counter() - t0)
+                if evento == 'login':
+                    continue
+                t0 = time.perf_counter()
+                if evento == 'entrada':
+                    _, registro = operaciones['registrar_entrada'](id_empleado, jornada)
+                else:
+                    registro = operaciones['registrar_evento'](id_empleado, evento)
+                latencias[evento].append(time.perf_counter() - t0)
+            except Exception as e:
+                excepciones[type(e).__name__] += 1
+                continue
+        for tipo, titulo, mensaje in avisos:
+            if tipo == 'error':
+                avisos_error[titulo] += 1
+                if len(mensajes_error) < 5:
+                    mensajes_error.append(mensaje)
+        if registro:
+            columna = 'hora entrada' if evento == 'entrada' else rb.COLUMNAS_POR_EVENTO[evento][0]
+            confirmadas.append((registro['id empleado'], columna, str(registro[columna])))
+
+    fin = time.time()
+    if not config['servidor']:
+        rb.cerrar_almacen()
+    return {'inicio': inicio, 'fin': fin, 'latencias': dict(latencias), 'confirmadas': confirmadas,
+            'excepciones': dict(excepciones), 'avisos_error': dict(avisos_error), 'mensajes_error': mensajes_error}
+
+def _proceso_kiosco(plan, config, barrera, inicio_simulado, resultados):
+    """Punto de entrada de cada proceso kiosco: prepara el módulo como un kiosco recién arrancado."""
+    sys.stdout = open(os.devnull, 'w', encoding='utf-8') # Registros_base imprime cada paso
+    _configurar(config)
+    if not config['servidor']:
+        rb.precargar_datos()
+    resultados.put(ejecutar_kiosco(plan, config, barrera, inicio_simulado))
+
+def lanzar_kioscos(planes, config, modo):
+    """Arranca un kiosco por plan, los libera a la vez y retorna sus resultados."""
+    inicio_simulado = min((plan[0][0] for plan in planes if plan), default=0)
+    if modo == 'hilos':
+        barrera = threading.Barrier(len(planes))
+        resultados = queue.Queue()
+        hilos = [threading.Thread(target=lambda plan=plan: resultados.put(
+                     ejecutar_kiosco(plan, config, barrera, inicio_simulado))) for plan in planes]
+        with contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+            _configurar(config)
+            if not config['servidor']:
+                rb.precargar_datos()
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+        return [resultados.get() for _ in hilos]
+
+    contexto = multiprocessing.get_context('spawn')
+    barrera = contexto.Barrier(len(planes))
+    resultados = contexto.Queue()
+    procesos = [contexto.Process(target=_proceso_kiosco, args=(plan, config, barrera, inicio_simulado, resultados))
+                for plan in planes]
+    for proceso in procesos:
+        proceso.start()
+    salida = [resultados.get() for _ in procesos]
+    for proceso in procesos:
+        proceso.join()
+    return salida
+
+# --- VERIFICACIÓN ---
+
+def revisar_archivos(directorio):
+    """Comprueba que los archivos de datos sigan siendo legibles. Retorna la lista de incidentes."""
+    incidentes = []
+    for carpeta, _, archivos in os.walk(directorio):
+        for nombre in archivos:
+            ruta = os.path.join(carpeta, nombre)
+            relativa = os.path.relpath(ruta, directorio)
+            try:
+                if nombre.endswith('.xlsx'):
+                    with zipfile.ZipFile(ruta) as libro:
+                        danado = libro.testzip()
+                    if danado:
+                        incidentes.append(f"{relativa}: miembro dañado '{danado}'")
+                elif nombre.endswith('.db'):
+                    with contextlib.closing(sqlite3.connect(ruta)) as conexion:
+                        estado = conexion.execute("PRAGMA integrity_check").fetchone()[0]
+                    if estado != 'ok':
+                        incidentes.append(f"{relativa}: {estado}")
+                elif nombre.endswith('.jsonl'):
+                    with open(ruta, encoding='utf-8') as f:
+                        for linea in f:
+                            if linea.strip():
+                                json.loads(linea)
+            except Exception as e:
+                incidentes.append(f"{relativa}: {type(e).__name__}: {e}")
+    return incidentes
+
+def leer_registros_hoy(config, ids):
+    """Filas de hoy tal como quedaron guardadas: {id empleado: [filas]}."""
+    por_id = defaultdict(list)
+    if config['servidor']:
+        cliente = rb.ClienteDatos(config['servidor'])
+        with rb.capturar_avisos():
+            for id_empleado in ids:
+                registro = cliente.llamar('obtener_registro_actual', id_empleado)
+                if registro:
+                    por_id[registro['id empleado']].append(registro)
+        return por_id
+    hoy = datetime.now().strftime('%Y-%m-%d')
+    with contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+        rb.cerrar_almacen()
+        df = rb.registro_como_texto(rb.obtener_almacen().leer(hoy, hoy))
+        rb.cerrar_almacen()
+    for registro in df.to_dict('records'):
+        por_id[str(registro['id empleado']).upper().strip()].append(registro)
+    return por_id
+
+def contar_perdidas(confirmadas, por_id):
+    """Una actualización se pierde si el almacenamiento confirmó un valor que ya no está guardado.
+    Retorna (perdidas, ejemplos)."""
+    aceptados = defaultdict(set) # Con doble escaneo ambos kioscos pueden confirmar una entrada
+    for id_empleado, columna, valor in confirmadas:
+        aceptados[(id_empleado, columna)].add(valor)
+    perdidas = []
+    for (id_empleado, columna), valores in aceptados.items():
+        filas = por_id.get(id_empleado, [])
+        if not any(str(fila.get(columna)) in valores for fila in filas):
+            guardado = str(filas[0].get(columna)) if filas else 'sin fila'
+            perdidas.append(f"{id_empleado} '{columna}': confirmado {sorted(valores)}, guardado {guardado}")
+    return len(perdidas), perdidas[:10]
+
+def resumir(resultados, planes, por_id, incidentes, config, args):
+    latencias = defaultdict(list)
+    excepciones = Counter()
+    avisos_error = Counter()
+    mensajes_error = []
+    confirmadas = []
+    for resultado in resultados:
+        for operacion, valores in resultado['latencias'].items():
+            latencias[operacion].extend(valores)
+        excepciones.update(resultado['excepciones'])
+        avisos_error.update(resultado['avisos_error'])
+        mensajes_error.extend(resultado['mensajes_error'][:5 - len(mensajes_error)])
+        confirmadas.extend(resultado['confirmadas'])
+    duracion = max(r['fin'] for r in resultados) - min(r['inicio'] for r in resultados)
+    total = sum(len(valores) for valores in latencias.values())
+    perdidas, ejemplos = contar_perdidas(confirmadas, por_id)
+
+    operaciones = {}
+    for operacion, valores in latencias.items():
+        percentiles = rb.calcular_percentiles(valores, (50, 95, 99))
+        operaciones[operacion] = {
+            'n': len(valores),
+            'p50_ms': round(percentiles[50] * 1000, 3),
+            'p95_ms': round(percentiles[95] * 1000, 3),
+            'p99_ms': round(percentiles[99] * 1000, 3),
+            'max_ms': round(max(valores) * 1000, 3),
+        }
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'almacenamiento': None if config['servidor'] else config['almacenamiento'],
+        'servidor': config['servidor'],
+        'escritura_diferida': config['escritura_diferida'],
+        'modo': args.modo,
+        'kioscos': len(planes),
+        'empleados': args.empleados,
+        'dias': args.dias,
+        'python': platform.python_version(),
+        'marcas_planificadas': sum(len(plan) for plan in planes),
+        'operaciones_totales': total,
+        'duracion_s': round(duracion, 3),
+        'operaciones_por_s': round(total / duracion, 1) if duracion else None,
+        'operaciones': operaciones,
+        'actualizaciones_confirmadas': len({(i, c) for i, c, _ in confirmadas}),
+        'actualizaciones_perdidas': perdidas,
+        'ejemplos_perdidas': ejemplos,
+        'filas_duplicadas': sum(len(filas) - 1 for filas in por_id.values() if len(filas) > 1),
+        'excepciones': dict(excepciones),
+        'avisos_error': dict(avisos_error),
+        'ejemplos_errores': mensajes_error,
+        'incidentes_archivo': incidentes,
+    }
+
+def imprimir_resumen(r):
+    destino = f"servidor {r['servidor']}" if r['servidor'] else f"almacenamiento '{r['almacenamiento']}'"
+    print(f"\n{r['kioscos']} kioscos ({r['modo']}) contra {destino}: {r['operaciones_totales']} operaciones "
+          f"en {r['duracion_s']:.2f} s ({r['operaciones_por_s']} op/s)", file=sys.stderr)
+    print(f"{'operación':<18} {'n':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'máx ms':>9}", file=sys.stderr)
+    for operacion, m in r['operaciones'].items():
+        print(f"{operacion:<18} {m['n']:>7} {m['p50_ms']:>9.2f} {m['p95_ms']:>9.2f} {m['p99_ms']:>9.2f} "
+              f"{m['max_ms']:>9.2f}", file=sys.stderr)
+    print(f"Actualizaciones perdidas: {r['actualizaciones_perdidas']} de {r['actualizaciones_confirmadas']} confirmadas; "
+          f"filas duplicadas: {r['filas_duplicadas']}", file=sys.stderr)
+    for ejemplo in r['ejemplos_perdidas']:
+        print(f"  {ejemplo}", file=sys.stderr)
+    if r['excepciones'] or r['avisos_error']:
+        print(f"Excepciones: {r['excepciones']}; avisos de error: {r['avisos_error']}", file=sys.stderr)
+        for mensaje in r['ejemplos_errores']:
+            print(f"  {mensaje}", file=sys.stderr)
+    if r['incidentes_archivo'] is not None:
+        print(f"Archivos dañados: {len(r['incidentes_archivo'])}", file=sys.stderr)
+        for incidente in r['incidentes_archivo']:
+            print(f"  {incidente}", file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga con varios kioscos marcando a la vez")
+    parser.add_argument('--kioscos', type=int, default=4)
+    parser.add_argument('--modo', choices=['procesos', 'hilos'], default='procesos',
+                        help="Cada kiosco en su propio proceso (como en planta) o en un hilo del mismo proceso")
+    parser.add_argument('--empleados', type=int, default=200)
+    parser.add_argument('--dias', type=int, default=30, help="Días de historial previo en el registro")
+    parser.add_argument('--almacenamiento', choices=['excel', 'diario', 'sqlite', 'particionado'], default=rb.ALMACENAMIENTO)
+    parser.add_argument('--escritura-diferida', action='store_true', default=rb.ESCRITURA_DIFERIDA)
+    parser.add_argument('--duplicados', type=float, default=0.02,
+                        help="Fracción de entradas escaneadas a la vez en otro kiosco (por defecto 0.02)")
+    parser.add_argument('--escala', type=float, default=0,
+                        help="Segundos reales por hora simulada; 0 = sin pausas, cada kiosco marca lo más rápido posible")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--directorio', help="Directorio donde generar los datos (por defecto uno temporal que se borra)")
+    parser.add_argument('--servidor', help="Carga contra un servidor de datos 'host:puerto' en lugar de los archivos")
+    parser.add_argument('--salida', help="Archivo JSON donde guardar los resultados")
+    args = parser.parse_args(argv)
+
+    config = {'almacenamiento': args.almacenamiento, 'escritura_diferida': args.escritura_diferida,
+              'servidor': args.servidor, 'escala': args.escala}
+    directorio_original = os.getcwd()
+    with contextlib.ExitStack() as pila:
+        if args.servidor:
+            # El servidor usa su propio reloj y sus propios archivos: los empleados se piden al servidor
+            config['directorio'] = directorio_original
+            with rb.capturar_avisos():
+                ids = sorted(rb.ClienteDatos(args.servidor).llamar('cargar_estado_turno')['empleados'])[:args.empleados]
+        else:
+            directorio = args.directorio or pila.enter_context(tempfile.TemporaryDirectory(prefix="carga_registro_"))
+            os.makedirs(directorio, exist_ok=True)
+            config['directorio'] = os.path.abspath(directorio)
+            print(f"Generando {args.empleados} empleados x {args.dias} días en '{config['directorio']}'...", file=sys.stderr)
+            benchmark_datos.generar_datos(config['directorio'], args.empleados, args.dias)
+            ids = [f"E{i:06d}" for i in range(args.empleados)]
+            _configurar(config)
+            with contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+                rb.inicializar_archivos()
+                rb.cerrar_almacen()
+        try:
+            planes = [plan for plan in planificar_turnos(ids, args.kioscos, args.duplicados, args.semilla) if plan]
+            print(f"Lanzando {len(planes)} kioscos con {sum(map(len, planes))} marcas...", file=sys.stderr)
+            resultados = lanzar_kioscos(planes, config, args.modo)
+            por_id = leer_registros_hoy(config, ids)
+            incidentes = None if args.servidor else revisar_archivos(config['directorio'])
+        finally:
+            os.chdir(directorio_original)
+
+    resumen = resumir(resultados, planes, por_id, incidentes, config, args)
+    imprimir_resumen(resumen)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(resumen, ensure_ascii=False, indent=2) + '\n')
+        print(f"Resultados guardados en '{args.salida}'.", file=sys.stderr)
+
+    fallos = (resumen['actualizaciones_perdidas'] or resumen['filas_duplicadas'] or resumen['excepciones']
+              or resumen['avisos_error'] or resumen['incidentes_archivo'])
+    return 1 if fallos else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
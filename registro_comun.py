@@ -0,0 +1,495 @@
+"""Piezas compartidas por Registros_base y sus módulos de datos (almacenes, replicación, servidor):
+importación diferida de pandas, columnas del registro, avisos, bitácora, métricas, cálculo de eventos y
+esquema de tipos del registro."""
+import time
+import os
+import json
+import bisect
+import functools
+import inspect
+import threading
+import logging
+import importlib
+from tkinter import messagebox
+from datetime import datetime, timedelta, date
+from contextlib import contextmanager
+
+class _ModuloDiferido:
+    """Importa el módulo la primera vez que se usa uno de sus atributos.
+    Así pandas no se carga al arrancar y la ventana de login aparece antes."""
+
+    def __init__(self, nombre):
+        self._nombre = nombre
+        self._modulo = None
+
+    def __getattr__(self, atributo):
+        if self._modulo is None:
+            inicio = time.perf_counter()
+            self._modulo = importlib.import_module(self._nombre)
+            TIEMPOS_ARRANQUE[f"importar {self._nombre}"] = time.perf_counter() - inicio
+        return getattr(self._modulo, atributo)
+
+pd = _ModuloDiferido('pandas')
+np = _ModuloDiferido('numpy')
+
+# Tiempos de arranque en segundos (se imprimen al quedar lista la ventana y al precargar los datos)
+TIEMPOS_ARRANQUE = {}
+
+# --- ARCHIVOS Y COLUMNAS DEL REGISTRO ---
+# Historial en Excel: el almacén 'excel' lo usa directamente y los demás importan y exportan desde él
+ARCHIVO_REGISTRO = 'registro_personal_nuevo.xlsx'
+
+# Columnas esperadas para registro_personal.xlsx
+COLUMNAS_REGISTRO = ['id empleado', 'nombre completo', 'cargo', 'fecha', 'hora entrada', 
+                     'jornada horas', 'hora inicio almuerzo', 'hora fin almuerzo', 
+                     'hora salida', 'horas trabajadas', 'tiempo extra minutos', 
+                     'tiempo almuerzo minutos']
+
+# Columnas que modifica cada evento posterior a la entrada. 'correccion_entrada' solo lo emite la
+# replicación, cuando otro nodo tiene una entrada más temprana para una fila que ya existe.
+COLUMNAS_POR_EVENTO = {
+    'correccion_entrada': ['hora entrada', 'jornada horas', 'nombre completo', 'cargo'],
+    'inicio_almuerzo': ['hora inicio almuerzo'],
+    'fin_almuerzo': ['hora fin almuerzo', 'tiempo almuerzo minutos'],
+    'salida': ['hora salida', 'horas trabajadas', 'tiempo extra minutos'],
+}
+
+# Eventos de una fila en el orden en que ocurren en el día
+EVENTOS_REGISTRO = ('entrada', 'inicio_almuerzo', 'fin_almuerzo', 'salida')
+
+# --- AVISOS AL USUARIO ---
+# Tk no es seguro entre hilos: los avisos que emite la capa de datos fuera del hilo principal
+# se acumulan y la interfaz los muestra cuando recibe el resultado de la operación.
+_avisos_hilo = threading.local()
+_FUNCIONES_AVISO = {'info': 'showinfo', 'error': 'showerror', 'advertencia': 'showwarning'}
+
+def _avisar(tipo, titulo, mensaje):
+    """Muestra un aviso ('info', 'error' o 'advertencia') o lo acumula si se está en un hilo de E/S."""
+    pendientes = getattr(_avisos_hilo, 'pendientes', None)
+    if pendientes is None:
+        getattr(messagebox, _FUNCIONES_AVISO[tipo])(titulo, mensaje)
+    else:
+        pendientes.append((tipo, titulo, mensaje))
+
+@contextmanager
+def capturar_avisos():
+    """Acumula en una lista los avisos del hilo actual en lugar de mostrarlos (uso sin interfaz)."""
+    anteriores = getattr(_avisos_hilo, 'pendientes', None)
+    avisos = []
+    _avisos_hilo.pendientes = avisos
+    try:
+        yield avisos
+    finally:
+        _avisos_hilo.pendientes = anteriores
+
+def mostrar_avisos(avisos):
+    """Muestra en el hilo principal los avisos acumulados por una operación en segundo plano."""
+    for tipo, titulo, mensaje in avisos:
+        getattr(messagebox, _FUNCIONES_AVISO[tipo])(titulo, mensaje)
+
+# --- BITÁCORA ---
+# Todos los módulos escriben en el logger 'registros'; Registros_base.configurar_bitacora() le agrega la salida.
+bitacora = logging.getLogger('registros')
+bitacora.addHandler(logging.NullHandler())
+
+# --- INSTRUMENTACIÓN ---
+# Cada función de datos decorada con @instrumentar acumula, por operación (y por tipo de evento en
+# registrar_evento): duración en un histograma, bytes leídos/escritos, filas recorridas, archivos
+# abiertos y el tiempo pasado en cada fase de E/S (read_excel, to_excel, fsync, sqlite...).
+LIMITES_HISTOGRAMA_S = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ARCHIVO_METRICAS = 'metricas_registro.json' # Con extensión .prom se exporta en formato de texto de Prometheus
+
+_metricas = {}
+_metricas_lock = threading.Lock()
+_mediciones_hilo = threading.local()
+
+def _nueva_metrica():
+    return {
+        'conteo': 0,
+        'suma_s': 0.0,
+        'max_s': 0.0,
+        'cubetas': [0] * (len(LIMITES_HISTOGRAMA_S) + 1),
+        'bytes_leidos': 0,
+        'bytes_escritos': 0,
+        'filas_recorridas': 0,
+        'archivos_abiertos': 0,
+        'fases_s': {},
+    }
+
+def _mediciones_activas():
+    pila = getattr(_mediciones_hilo, 'pila', None)
+    if pila is None:
+        pila = _mediciones_hilo.pila = []
+    return pila
+
+def _registrar_io(bytes_leidos=0, bytes_escritos=0, filas=0, archivos=0):
+    """Suma E/S a todas las operaciones instrumentadas en curso en este hilo."""
+    for medicion in _mediciones_activas():
+        medicion['bytes_leidos'] += bytes_leidos
+        medicion['bytes_escritos'] += bytes_escritos
+        medicion['filas_recorridas'] += filas
+        medicion['archivos_abiertos'] += archivos
+
+@contextmanager
+def _fase(nombre):
+    """Mide el tiempo de una fase de E/S dentro de las operaciones instrumentadas en curso."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - inicio
+        for medicion in _mediciones_activas():
+            medicion['fases_s'][nombre] = medicion['fases_s'].get(nombre, 0.0) + duracion
+
+def instrumentar(funcion=None, *, argumento_evento=None):
+    """Decorador que registra cada llamada en las métricas de operaciones.
+    Con argumento_evento, la métrica se separa según el valor de ese argumento (p. ej. 'evento')."""
+    if funcion is None:
+        return lambda f: instrumentar(f, argumento_evento=argumento_evento)
+    firma = inspect.signature(funcion)
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        evento = ''
+        if argumento_evento is not None:
+            evento = str(firma.bind_partial(*args, **kwargs).arguments.get(argumento_evento, ''))
+        medicion = _nueva_metrica()
+        pila = _mediciones_activas()
+        pila.append(medicion)
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            duracion = time.perf_counter() - inicio
+            pila.pop()
+            _acumular_metrica((funcion.__qualname__, evento), duracion, medicion)
+    return envoltura
+
+def _acumular_metrica(clave, duracion, medicion):
+    with _metricas_lock:
+        metrica = _metricas.setdefault(clave, _nueva_metrica())
+        metrica['conteo'] += 1
+        metrica['suma_s'] += duracion
+        metrica['max_s'] = max(metrica['max_s'], duracion)
+        metrica['cubetas'][bisect.bisect_left(LIMITES_HISTOGRAMA_S, duracion)] += 1
+        for campo in ('bytes_leidos', 'bytes_escritos', 'filas_recorridas', 'archivos_abiertos'):
+            metrica[campo] += medicion[campo]
+        for fase, segundos in medicion['fases_s'].items():
+            metrica['fases_s'][fase] = metrica['fases_s'].get(fase, 0.0) + segundos
+
+def _percentil_histograma(metrica, p):
+    """Cota superior (en segundos) del percentil p según el histograma; max_s si cae en la última cubeta."""
+    objetivo = p / 100 * metrica['conteo']
+    acumulado = 0
+    for limite, cantidad in zip(LIMITES_HISTOGRAMA_S, metrica['cubetas']):
+        acumulado += cantidad
+        if acumulado >= objetivo:
+            return limite
+    return metrica['max_s']
+
+def metricas():
+    """Copia de las métricas acumuladas: {(operación, evento): métrica}."""
+    with _metricas_lock:
+        return {clave: {**m, 'cubetas': list(m['cubetas']), 'fases_s': dict(m['fases_s'])}
+                for clave, m in _metricas.items()}
+
+def reiniciar_metricas():
+    with _metricas_lock:
+        _metricas.clear()
+
+def resumen_metricas():
+    """Tabla de texto con conteo, tiempos, E/S y la fase dominante de cada operación."""
+    lineas = [f"{'operación':<38}{'n':>6}{'media ms':>10}{'p95≤ ms':>10}{'max ms':>10}"
+              f"{'KB leídos':>11}{'KB escritos':>12}{'filas':>10}{'arch.':>7}  fase principal"]
+    for (operacion, evento), m in sorted(metricas().items()):
+        nombre = f"{operacion}('{evento}')" if evento else operacion
+        fase_principal = ''
+        if m['fases_s'] and m['suma_s'] > 0:
+            fase, segundos = max(m['fases_s'].items(), key=lambda item: item[1])
+            fase_principal = f"{fase} {segundos / m['suma_s']:.0%}"
+        lineas.append(f"{nombre:<38}{m['conteo']:>6}{m['suma_s'] / m['conteo'] * 1000:>10.1f}"
+                      f"{_percentil_histograma(m, 95) * 1000:>10.1f}{m['max_s'] * 1000:>10.1f}"
+                      f"{m['bytes_leidos'] / 1024:>11.0f}{m['bytes_escritos'] / 1024:>12.0f}"
+                      f"{m['filas_recorridas']:>10}{m['archivos_abiertos']:>7}  {fase_principal}")
+    return "\n".join(lineas)
+
+def _texto_prometheus(datos):
+    lineas = [
+        "# HELP registro_operacion_segundos Duración de las operaciones de datos.",
+        "# TYPE registro_operacion_segundos histogram",
+    ]
+    for (operacion, evento), m in sorted(datos.items()):
+        etiquetas = f'operacion="{operacion}",evento="{evento}"'
+        acumulado = 0
+        for limite, cantidad in zip(LIMITES_HISTOGRAMA_S, m['cubetas']):
+            acumulado += cantidad
+            lineas.append(f'registro_operacion_segundos_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+        lineas.append(f'registro_operacion_segundos_bucket{{{etiquetas},le="+Inf"}} {m["conteo"]}')
+        lineas.append(f'registro_operacion_segundos_sum{{{etiquetas}}} {m["suma_s"]}')
+        lineas.append(f'registro_operacion_segundos_count{{{etiquetas}}} {m["conteo"]}')
+    for campo in ('bytes_leidos', 'bytes_escritos', 'filas_recorridas', 'archivos_abiertos'):
+        lineas.append(f"# TYPE registro_{campo}_total counter")
+        for (operacion, evento), m in sorted(datos.items()):
+            lineas.append(f'registro_{campo}_total{{operacion="{operacion}",evento="{evento}"}} {m[campo]}')
+    lineas.append("# TYPE registro_fase_segundos_total counter")
+    for (operacion, evento), m in sorted(datos.items()):
+        for fase, segundos in sorted(m['fases_s'].items()):
+            lineas.append(f'registro_fase_segundos_total{{operacion="{operacion}",evento="{evento}",fase="{fase}"}} {segundos}')
+    return "\n".join(lineas) + "\n"
+
+def exportar_metricas(ruta=None):
+    """Escribe las métricas en JSON o, si la ruta termina en .prom, en formato de texto de Prometheus."""
+    ruta = ruta or ARCHIVO_METRICAS
+    datos = metricas()
+    with open(ruta, 'w', encoding='utf-8') as f:
+        if ruta.endswith('.prom'):
+            f.write(_texto_prometheus(datos))
+        else:
+            json.dump([{'operacion': operacion, 'evento': evento, **m,
+                        'limites_histograma_s': list(LIMITES_HISTOGRAMA_S)}
+                       for (operacion, evento), m in sorted(datos.items())], f, ensure_ascii=False, indent=2)
+    bitacora.info("Métricas exportadas a '%s'.", ruta)
+    return ruta
+
+# --- ARCHIVOS ---
+# Lectura y escritura con su E/S anotada en las métricas; los JSON de estado se reemplazan de forma atómica.
+
+def _leer_excel(ruta):
+    """pd.read_excel con registro de la fase y de la E/S en las métricas."""
+    with _fase('read_excel'):
+        df = pd.read_excel(ruta)
+    _registrar_io(bytes_leidos=os.path.getsize(ruta), filas=len(df), archivos=1)
+    return df
+
+def _escribir_excel(df, ruta):
+    """df.to_excel con registro de la fase y de la E/S en las métricas."""
+    with _fase('to_excel'):
+        df.to_excel(ruta, index=False)
+    _registrar_io(bytes_escritos=os.path.getsize(ruta), filas=len(df), archivos=1)
+
+def _crear_excel_vacio(ruta, columnas):
+    """Crea un Excel con solo la fila de encabezados."""
+    from openpyxl import Workbook
+    libro = Workbook()
+    libro.active.append(columnas)
+    libro.save(ruta)
+    _registrar_io(bytes_escritos=os.path.getsize(ruta), archivos=1)
+
+def _firma_archivo(ruta):
+    """Devuelve (mtime_ns, tamaño) del archivo, o None si no existe."""
+    try:
+        st = os.stat(ruta)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _valor_sql(valor):
+    """Convierte NA/NaN a None y los escalares de NumPy a tipos nativos para sqlite3."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    return valor.item() if hasattr(valor, 'item') else valor
+
+def _leer_json(ruta, defecto=None):
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return defecto
+
+def _guardar_json_atomico(ruta, datos):
+    """Reemplaza el archivo de forma atómica para que una caída no lo deje a medias."""
+    with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(ruta + '.tmp', ruta)
+
+# --- CÁLCULO DE EVENTOS ---
+# Una fila del día por empleado: la entrada la crea y cada evento posterior completa sus columnas.
+
+def _nuevo_registro(id_empleado_normalizado, nombre, cargo, fecha, hora_entrada, jornada_horas):
+    """Construye la fila de registro que crea el evento de entrada."""
+    return {
+        'id empleado': id_empleado_normalizado,
+        'nombre completo': nombre,
+        'cargo': cargo,
+        'fecha': fecha,
+        'hora entrada': hora_entrada,
+        'jornada horas': jornada_horas,
+        'hora inicio almuerzo': pd.NA,
+        'hora fin almuerzo': pd.NA,
+        'hora salida': pd.NA,
+        'horas trabajadas': pd.NA,
+        'tiempo extra minutos': pd.NA,
+        'tiempo almuerzo minutos': pd.NA
+    }
+
+def _calcular_almuerzo(registro):
+    """Calcula 'tiempo almuerzo minutos' a partir de las horas de inicio y fin de almuerzo."""
+    inicio_alm = datetime.strptime(str(registro['hora inicio almuerzo']), '%H:%M:%S')
+    fin_alm = datetime.strptime(str(registro['hora fin almuerzo']), '%H:%M:%S')
+    
+    tiempo_almuerzo = fin_alm - inicio_alm
+    registro['tiempo almuerzo minutos'] = round(tiempo_almuerzo.total_seconds() / 60)
+
+def _calcular_salida(registro):
+    """Calcula 'horas trabajadas' y 'tiempo extra minutos' al marcar la salida."""
+    jornada_horas = float(registro['jornada horas']) 
+    
+    entrada = datetime.strptime(str(registro['hora entrada']), '%H:%M:%S')
+    salida = datetime.strptime(str(registro['hora salida']), '%H:%M:%S')
+    
+    tiempo_almuerzo = timedelta(0)
+    inicio_alm_str = registro.get('hora inicio almuerzo')
+    fin_alm_str = registro.get('hora fin almuerzo')
+
+    if pd.notna(inicio_alm_str) and pd.notna(fin_alm_str):
+        inicio_alm = datetime.strptime(str(inicio_alm_str), '%H:%M:%S')
+        fin_alm = datetime.strptime(str(fin_alm_str), '%H:%M:%S')
+        tiempo_almuerzo = fin_alm - inicio_alm
+
+    tiempo_trabajado = (salida - entrada) - tiempo_almuerzo
+    registro['horas trabajadas'] = round(tiempo_trabajado.total_seconds() / 3600, 2)
+    
+    tiempo_extra_segundos = max(0, tiempo_trabajado.total_seconds() - (jornada_horas * 3600))
+    registro['tiempo extra minutos'] = round(tiempo_extra_segundos / 60)
+
+def _aplicar_evento(registro, evento, hora_actual):
+    """Aplica un evento posterior a la entrada sobre la fila (dict) del día.
+    La hora del evento siempre queda asignada; si el cálculo derivado falla, la excepción se propaga."""
+    if evento == "inicio_almuerzo":
+        registro['hora inicio almuerzo'] = hora_actual
+    elif evento == "fin_almuerzo":
+        registro['hora fin almuerzo'] = hora_actual
+        _calcular_almuerzo(registro)
+    elif evento == "salida":
+        registro['hora salida'] = hora_actual
+        _calcular_salida(registro)
+
+# --- ESQUEMA DEL REGISTRO ---
+# Plan de tipos del registro en memoria. Los almacenes lo aplican una sola vez al entregar filas
+# (leer/iterar) y la caché de AlmacenExcel lo conserva aplicado:
+#   - los textos repetidos pasan a category;
+#   - la fecha pasa a datetime64 (solo el día);
+#   - las horas pasan a segundos desde medianoche (Int32 con nulos);
+#   - los minutos pasan a Int32 con nulos y los decimales a float64 (NaN como vacío).
+# En los archivos y en las filas (dict) que se buscan y guardan, fecha y horas siguen en texto:
+# registro_como_texto() hace la conversión inversa. Una columna con valores que no se pueden convertir
+# sin pérdida se deja como está.
+COLUMNAS_CATEGORICAS = ['id empleado', 'nombre completo', 'cargo']
+COLUMNAS_HORA = ['hora entrada', 'hora inicio almuerzo', 'hora fin almuerzo', 'hora salida']
+ESQUEMA_REGISTRO = {
+    'id empleado': 'category',
+    'nombre completo': 'category',
+    'cargo': 'category',
+    'fecha': 'datetime64[s]',
+    'hora entrada': 'Int32',
+    'jornada horas': 'float64',
+    'hora inicio almuerzo': 'Int32',
+    'hora fin almuerzo': 'Int32',
+    'hora salida': 'Int32',
+    'horas trabajadas': 'float64',
+    'tiempo extra minutos': 'Int32',
+    'tiempo almuerzo minutos': 'Int32',
+}
+
+def _segundos_del_dia(valores):
+    """Segundos desde medianoche de los textos que acepta strptime('%H:%M:%S'); NaN si no son válidos.
+    Una columna ya convertida por ESQUEMA_REGISTRO (segundos) se devuelve tal cual."""
+    if pd.api.types.is_numeric_dtype(valores):
+        return pd.to_numeric(valores).to_numpy(dtype=float)
+    partes = valores.astype(str).str.extract(r'^(\d{1,2}):(\d{1,2}):(\d{1,2})$').astype(float)
+    h, m, s = (partes[i].to_numpy() for i in range(3))
+    validos = (h <= 23) & (m <= 59) & (s <= 59)
+    return np.where(validos, h * 3600 + m * 60 + s, np.nan)
+
+def _segundos_hora(valor):
+    """Segundos desde medianoche de un texto 'HH:MM:SS'; None si está vacío o no se puede leer."""
+    if pd.isna(valor):
+        return None
+    try:
+        h, m, s = (int(parte) for parte in str(valor).split(':'))
+    except ValueError:
+        return None
+    return h * 3600 + m * 60 + s
+
+def _hhmmss_vectorizado(segundos):
+    """Serie de enteros (segundos desde medianoche) a textos 'HH:MM:SS'."""
+    return ((segundos // 3600).astype(str).str.zfill(2) + ':' + (segundos // 60 % 60).astype(str).str.zfill(2)
+            + ':' + (segundos % 60).astype(str).str.zfill(2))
+
+def _columna_tipada(serie, col):
+    """serie convertida al tipo de ESQUEMA_REGISTRO, o None si la conversión perdería valores."""
+    tipo = ESQUEMA_REGISTRO[col]
+    presentes = serie.notna().to_numpy()
+    if tipo == 'category':
+        return serie.astype('category')
+    if col == 'fecha':
+        fechas = pd.to_datetime(serie.astype(str).str[:10], format='%Y-%m-%d', errors='coerce')
+        convertida = fechas.astype(tipo)
+    elif col in COLUMNAS_HORA:
+        convertida = pd.Series(_segundos_del_dia(serie), index=serie.index).astype(tipo)
+    else:
+        numeros = pd.to_numeric(serie, errors='coerce')
+        if tipo == 'Int32' and not np.array_equal(numeros[presentes], np.round(numeros[presentes])):
+            tipo = 'float64' # Minutos con decimales: se conservan como están
+        convertida = numeros.astype(tipo)
+    return convertida if not (presentes & convertida.isna().to_numpy()).any() else None
+
+def tipar_registro(df):
+    """Aplica ESQUEMA_REGISTRO a las columnas presentes de df. Las que ya tienen su tipo no se tocan."""
+    columnas = {}
+    for col in ESQUEMA_REGISTRO:
+        if col not in df.columns or str(df[col].dtype) == ESQUEMA_REGISTRO[col]:
+            continue
+        convertida = _columna_tipada(df[col], col)
+        if convertida is None:
+            bitacora.warning("Columna '%s' con valores no válidos; se deja sin convertir.", col)
+        else:
+            columnas[col] = convertida
+    return df.assign(**columnas) if columnas else df
+
+def registro_como_texto(df):
+    """Inverso de tipar_registro: fecha 'AAAA-MM-DD', horas 'HH:MM:SS', textos y enteros como objetos
+    de Python y vacíos como NaN, el formato de los archivos y de las filas que se guardan."""
+    columnas = {}
+    for col in df.columns:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            columnas[col] = serie.astype(object)
+        elif col == 'fecha' and pd.api.types.is_datetime64_any_dtype(serie):
+            columnas[col] = serie.dt.strftime('%Y-%m-%d').astype(object).where(serie.notna(), np.nan)
+        elif col in COLUMNAS_HORA and pd.api.types.is_integer_dtype(serie):
+            columnas[col] = _hhmmss_vectorizado(serie.fillna(0).astype(np.int64)).astype(object).where(serie.notna(), np.nan)
+        elif isinstance(serie.dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_integer_dtype(serie):
+            columnas[col] = serie.astype(object).where(serie.notna(), np.nan)
+        elif isinstance(serie.dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_float_dtype(serie):
+            columnas[col] = serie.astype(np.float64)
+    return df.assign(**columnas) if columnas else df
+
+def _valor_como_texto(col, valor):
+    """registro_como_texto para un solo valor (las filas que devuelve buscar)."""
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return np.nan
+    if col == 'fecha' and isinstance(valor, date):
+        return valor.strftime('%Y-%m-%d')
+    if col in COLUMNAS_HORA and not isinstance(valor, str):
+        segundos = int(valor)
+        return f"{segundos // 3600:02d}:{segundos // 60 % 60:02d}:{segundos % 60:02d}"
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+def _valor_tipado(serie, col, valor):
+    """El valor de una fila (dict) convertido al tipo de la columna serie, para asignarlo en su lugar."""
+    if not isinstance(valor, str) and pd.isna(valor):
+        return None
+    if str(serie.dtype) != ESQUEMA_REGISTRO.get(col):
+        return valor # Columna sin convertir
+    if col == 'fecha':
+        return pd.Timestamp(valor)
+    if col in COLUMNAS_HORA:
+        return _segundos_hora(valor)
+    if ESQUEMA_REGISTRO[col] == 'Int32':
+        return int(round(float(valor)))
+    if ESQUEMA_REGISTRO[col] == 'float64':
+        return float(valor)
+    return valor
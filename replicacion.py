@@ -0,0 +1,202 @@
+"""Replicación de eventos entre nodos (carpetas de kiosco que se sincronizan con una central)."""
+import os
+import json
+
+from registro_comun import (
+    pd, COLUMNAS_POR_EVENTO, EVENTOS_REGISTRO, bitacora, _fase, _registrar_io, _leer_json, _guardar_json_atomico,
+    _valor_sql, _nuevo_registro, _aplicar_evento,
+)
+from almacenes import _linea_diario
+
+# --- REPLICACIÓN ENTRE NODOS ---
+# Kioscos sin conexión permanente que se sincronizan con una máquina central. Cada nodo es una carpeta
+# con DIRECTORIO_REPLICACION/nodo.json (ver _marcar_nodo) y anota en eventos.jsonl, con fsync, cada
+# evento que guarda, numerado por nodo de origen. Los eventos recibidos de otros nodos también se anotan,
+# así un nodo reenvía lo que recibió. sincronizar(carpeta) intercambia con otro nodo solo los eventos que
+# le faltan a cada uno: el vector {nodo de origen: último número visto} descarta los ya conocidos y el
+# offset guardado por par evita releer el historial, de modo que el costo depende de los eventos nuevos.
+# Las filas se fusionan por (id empleado, fecha) con reglas que no dependen del orden de llegada: la
+# entrada y el inicio de almuerzo más tempranos, el fin de almuerzo y la salida más tardíos; las columnas
+# calculadas se rehacen con los cálculos de cada evento. Cada carpeta debe tener un solo proceso escritor.
+# Un nodo abierto es un dict {'directorio', 'almacen', 'guardar', 'replicacion'}: 'guardar'(eventos, filas)
+# guarda en su almacén las filas fusionadas (Registros_base arma los nodos en _nodo_local y _abrir_nodo).
+DIRECTORIO_REPLICACION = 'replicacion'
+REGLAS_REPLICACION = {'hora inicio almuerzo': min, 'hora fin almuerzo': max, 'hora salida': max}
+COLUMNAS_MARCADAS = ['hora entrada', 'jornada horas', 'hora inicio almuerzo', 'hora fin almuerzo', 'hora salida']
+_replicacion = {'directorio': None, 'nodo': None, 'vector': {}, 'offset': 0}
+
+def _ruta_replicacion(nombre, directorio=''):
+    return os.path.join(directorio, DIRECTORIO_REPLICACION, nombre)
+
+def _nombre_nodo(directorio=''):
+    nodo = _leer_json(_ruta_replicacion('nodo.json', directorio))
+    return nodo['nodo'] if nodo else None
+
+def _eventos_replicacion_desde(ruta, offset):
+    """Eventos anotados en ruta desde offset y el offset tras la última línea completa."""
+    eventos = []
+    if not os.path.exists(ruta):
+        return eventos, offset
+    if offset > os.path.getsize(ruta):
+        offset = 0 # El archivo se reemplazó: el vector descarta lo que ya se conocía
+    inicio = offset
+    with open(ruta, 'rb') as f:
+        f.seek(offset)
+        for linea in f:
+            if not linea.endswith(b'\n'):
+                break # Escritura a medias: queda para la próxima sincronización
+            offset += len(linea)
+            eventos.append(json.loads(linea))
+    _registrar_io(bytes_leidos=offset - inicio, filas=len(eventos), archivos=1)
+    return eventos, offset
+
+def _cargar_estado_replicacion(directorio):
+    """Nodo, vector y offset del registro de eventos del nodo en directorio (nodo None si no es un nodo).
+    Se parte del vector guardado en la última sincronización y solo se leen las líneas posteriores."""
+    guardado = _leer_json(_ruta_replicacion('vector.json', directorio), {'offset': 0, 'vector': {}})
+    estado = {'directorio': directorio, 'nodo': _nombre_nodo(directorio), 'vector': dict(guardado['vector']),
+              'offset': guardado['offset']}
+    if estado['nodo'] is not None:
+        eventos, estado['offset'] = _eventos_replicacion_desde(_ruta_replicacion('eventos.jsonl', directorio),
+                                                               estado['offset'])
+        for ev in eventos:
+            estado['vector'][ev['origen']] = max(estado['vector'].get(ev['origen'], 0), ev['seq'])
+    return estado
+
+def _estado_replicacion():
+    """Estado de replicación de la carpeta de trabajo, que se conserva en memoria entre eventos."""
+    directorio = os.getcwd()
+    if _replicacion['directorio'] != directorio:
+        _replicacion.update(_cargar_estado_replicacion(directorio))
+    return _replicacion
+
+def _anexar_replicacion(eventos, estado):
+    texto = ''.join(json.dumps(ev, ensure_ascii=False, default=_valor_sql) + '\n' for ev in eventos)
+    ruta = _ruta_replicacion('eventos.jsonl', estado['directorio'])
+    with _fase('fsync_replicacion'), open(ruta, 'a', encoding='utf-8') as f:
+        f.write(texto)
+        f.flush()
+        os.fsync(f.fileno())
+    _registrar_io(bytes_escritos=len(texto.encode('utf-8')), filas=len(eventos), archivos=1)
+    for ev in eventos:
+        estado['vector'][ev['origen']] = max(estado['vector'].get(ev['origen'], 0), ev['seq'])
+    estado['offset'] += len(texto.encode('utf-8'))
+
+def _anotar_replicacion(eventos):
+    """Anota los eventos (registro, evento) recién guardados si la carpeta actual es un nodo."""
+    estado = _estado_replicacion()
+    if estado['nodo'] is None:
+        return
+    ultimo = estado['vector'].get(estado['nodo'], 0)
+    _anexar_replicacion([dict(_linea_diario(registro, evento), origen=estado['nodo'], seq=ultimo + i)
+                         for i, (registro, evento) in enumerate(eventos, 1)], estado)
+
+def _guardar_estado_replicacion(estado):
+    _guardar_json_atomico(_ruta_replicacion('vector.json', estado['directorio']),
+                          {'offset': estado['offset'], 'vector': estado['vector']})
+
+def _valores_distintos(a, b):
+    if pd.isna(a) or pd.isna(b):
+        return pd.isna(a) != pd.isna(b)
+    try:
+        return float(a) != float(b)
+    except (TypeError, ValueError):
+        return str(a) != str(b)
+
+def _fusionar_evento(registro, ev):
+    """Aplica un evento replicado sobre la fila del día (None si aún no existe) y la devuelve."""
+    if ev['evento'] == 'entrada':
+        if registro is None:
+            return _nuevo_registro(ev['id empleado'], ev['nombre completo'], ev['cargo'], ev['fecha'],
+                                   ev['hora'], ev['jornada horas'])
+        # Con la misma hora decide la jornada, para que todos los nodos elijan la misma entrada
+        if (ev['hora'], float(ev['jornada horas'])) < (str(registro['hora entrada']), float(registro['jornada horas'])):
+            registro.update({'hora entrada': ev['hora'], 'jornada horas': ev['jornada horas'],
+                             'nombre completo': ev['nombre completo'], 'cargo': ev['cargo']})
+        return registro
+    if registro is not None:
+        columna = COLUMNAS_POR_EVENTO[ev['evento']][0]
+        actual = registro.get(columna)
+        if pd.isna(actual) or REGLAS_REPLICACION[columna](ev['hora'], str(actual)) != str(actual):
+            registro[columna] = ev['hora']
+    return registro
+
+def _eventos_de_fila(registro):
+    """Eventos de replicación equivalentes a una fila ya guardada (para la instantánea)."""
+    return [_linea_diario(registro, evento) for evento in EVENTOS_REGISTRO
+            if pd.notna(registro.get('hora entrada' if evento == 'entrada' else COLUMNAS_POR_EVENTO[evento][0]))]
+
+def _eventos_a_guardar(anterior, registro):
+    """Eventos con los que el almacén guarda la fila fusionada: solo los que cambian alguna columna."""
+    if anterior is None:
+        return ['entrada'] + [evento for evento in EVENTOS_REGISTRO[1:]
+                              if pd.notna(registro.get(COLUMNAS_POR_EVENTO[evento][0]))]
+    return [evento for evento, columnas in COLUMNAS_POR_EVENTO.items()
+            if any(_valores_distintos(anterior.get(col), registro.get(col)) for col in columnas)]
+
+def _fusionar_en_almacen(eventos, nodo):
+    """Fusiona los eventos en el almacén del nodo con una sola escritura. Retorna las filas cambiadas."""
+    por_clave = {}
+    for ev in eventos:
+        por_clave.setdefault((ev['id empleado'], ev['fecha']), []).append(ev)
+    almacen = nodo['almacen']
+    a_guardar = []
+    finales = []
+    for clave, eventos_clave in por_clave.items():
+        anterior = almacen.buscar(*clave)
+        registro = dict(anterior) if anterior is not None else None
+        for ev in sorted(eventos_clave, key=lambda ev: ev['evento'] != 'entrada'):
+            registro = _fusionar_evento(registro, ev)
+        if registro is None:
+            bitacora.warning("Replicación: eventos de %s del %s sin entrada; se omiten.", clave[0], clave[1])
+            continue
+        if anterior is not None and not any(_valores_distintos(anterior.get(col), registro.get(col))
+                                            for col in COLUMNAS_MARCADAS):
+            continue # Nada nuevo: las columnas calculadas se dejan como están
+        for evento in ('fin_almuerzo', 'salida'):
+            hora = registro.get(COLUMNAS_POR_EVENTO[evento][0])
+            if pd.notna(hora) and (evento == 'salida' or pd.notna(registro.get('hora inicio almuerzo'))):
+                try:
+                    _aplicar_evento(registro, evento, hora)
+                except Exception as e:
+                    bitacora.error("Error de cálculo al fusionar '%s' de %s: %s", evento, clave[0], e)
+        cambios = _eventos_a_guardar(anterior, registro)
+        if cambios:
+            a_guardar.extend((registro, evento) for evento in cambios)
+            finales.append(registro)
+    if a_guardar:
+        nodo['guardar'](a_guardar, finales)
+    return finales
+
+def _recibir_de(nodo, directorio_origen):
+    """Trae al nodo los eventos del nodo en directorio_origen que aún no conoce."""
+    estado = nodo['replicacion']
+    origen = _nombre_nodo(directorio_origen)
+    if estado['nodo'] is None or origen is None:
+        raise ValueError("Las dos carpetas deben ser nodos de replicación (python Registros_base.py iniciar-nodo NOMBRE).")
+    ruta_pares = _ruta_replicacion('pares.json', nodo['directorio'])
+    pares = _leer_json(ruta_pares, {})
+    eventos, offset = _eventos_replicacion_desde(_ruta_replicacion('eventos.jsonl', directorio_origen),
+                                                 pares.get(origen, 0))
+    nuevos = [ev for ev in eventos if ev['seq'] > estado['vector'].get(ev['origen'], 0)]
+    filas = []
+    if nuevos:
+        # Primero el almacén y después el registro de eventos: si se corta aquí, se vuelven a traer y
+        # la fusión da el mismo resultado
+        filas = _fusionar_en_almacen(nuevos, nodo)
+        _anexar_replicacion(nuevos, estado)
+    pares[origen] = offset
+    _guardar_json_atomico(ruta_pares, pares)
+    _guardar_estado_replicacion(estado)
+    bitacora.info("Nodo '%s': %s evento(s) nuevo(s) de '%s' (%s leído(s)), %s fila(s) actualizada(s).",
+                  estado['nodo'], len(nuevos), origen, len(eventos), len(filas))
+    return len(nuevos)
+
+def _marcar_nodo(nombre):
+    """Marca la carpeta actual como el nodo `nombre`; desde ese momento se anotan sus eventos."""
+    actual = _nombre_nodo()
+    if actual is not None and actual != nombre:
+        raise ValueError(f"Esta carpeta ya es el nodo '{actual}'.")
+    os.makedirs(DIRECTORIO_REPLICACION, exist_ok=True)
+    _guardar_json_atomico(_ruta_replicacion('nodo.json'), {'nodo': nombre})
+    _replicacion['directorio'] = None
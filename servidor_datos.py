@@ -0,0 +1,140 @@
+"""Servidor de datos por HTTP y su cliente, para varios kioscos sobre la misma carpeta."""
+import json
+import socket
+import threading
+import uuid
+import http.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import OrderedDict
+
+from registro_comun import bitacora, capturar_avisos, _avisar, _valor_sql
+
+# --- SERVIDOR LOCAL ---
+# Con varios kioscos sobre la misma carpeta, cada uno leía y reescribía el registro por su cuenta y se
+# pisaban los eventos. `python Registros_base.py servidor` levanta un proceso que es el único dueño de los
+# datos: mantiene el almacén (y sus cachés del día) en memoria y ejecuta las operaciones de una en una.
+# Con SERVIDOR_DATOS = 'host:puerto' (o --servidor), la interfaz envía cada operación a ese proceso por
+# HTTP con una conexión persistente, en lugar de tocar los archivos.
+PUERTO_SERVIDOR = 8765
+TIEMPO_ESPERA_SERVIDOR_S = 10
+# Respuestas que el servidor recuerda por Id-Operacion para contestar un reintento sin volver a aplicarlo
+RESPUESTAS_RECORDADAS = 1000
+
+def _valor_json(valor):
+    """Tipos que json no sabe escribir: conjuntos marcados para reconstruirlos y NA/NumPy como en SQLite."""
+    if isinstance(valor, (set, frozenset)):
+        return {'__conjunto__': sorted(valor, key=str)}
+    return _valor_sql(valor)
+
+def _objeto_json(objeto):
+    return set(objeto['__conjunto__']) if set(objeto) == {'__conjunto__'} else objeto
+
+def _a_json(valor):
+    return json.dumps(valor, ensure_ascii=False, default=_valor_json).encode('utf-8')
+
+def _desde_json(datos):
+    return json.loads(datos, object_hook=_objeto_json)
+
+class _ManejadorServidor(BaseHTTPRequestHandler):
+    """POST /operacion/<nombre> con {'args': [...], 'kwargs': {...}} -> {'resultado', 'avisos', 'error'}.
+    Si el encabezado Id-Operacion ya se atendió, devuelve la misma respuesta sin volver a ejecutarla."""
+    protocol_version = 'HTTP/1.1' # Mantiene la conexión abierta entre operaciones del mismo kiosco
+    disable_nagle_algorithm = True # Encabezados y cuerpo salen en envíos separados; sin esto cada respuesta espera ~40 ms
+
+    def do_GET(self):
+        if self.path == '/salud':
+            self._responder(200, dict(self.server.salud, ok=True))
+        else:
+            self._responder(404, {'error': f"Ruta desconocida: {self.path}"})
+
+    def do_POST(self):
+        cuerpo = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        nombre = self.path.rpartition('/operacion/')[2]
+        funcion = self.server.operaciones.get(nombre)
+        if funcion is None:
+            self._responder(404, {'error': f"Operación desconocida: '{nombre}'"})
+            return
+        peticion = _desde_json(cuerpo or b'{}')
+        id_operacion = self.headers.get('Id-Operacion')
+        # Un solo lock: los eventos de todos los kioscos se aplican en orden sobre el mismo estado
+        with self.server.lock:
+            datos = self.server.respuestas.get(id_operacion) if id_operacion else None
+            if datos is not None:
+                bitacora.info("Operación '%s' repetida (%s): se devuelve la respuesta ya dada.", nombre, id_operacion)
+            else:
+                resultado = error = None
+                with capturar_avisos() as avisos:
+                    try:
+                        resultado = funcion(*peticion.get('args', []), **peticion.get('kwargs', {}))
+                    except Exception as e:
+                        error = f"{type(e).__name__}: {e}"
+                        bitacora.error("Error en operación remota '%s': %s", nombre, error, exc_info=True)
+                datos = {'resultado': resultado, 'avisos': avisos, 'error': error}
+                if id_operacion:
+                    self.server.respuestas[id_operacion] = datos
+                    if len(self.server.respuestas) > RESPUESTAS_RECORDADAS:
+                        self.server.respuestas.popitem(last=False)
+        self._responder(200, datos)
+
+    def _responder(self, estado, datos):
+        cuerpo = _a_json(datos)
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass # Cada operación ya deja su propia traza en consola
+
+def _crear_servidor(host, puerto, operaciones, salud=None):
+    """Servidor que atiende las funciones de operaciones ({nombre: función}); salud se agrega a GET /salud."""
+    servidor = ThreadingHTTPServer((host, puerto), _ManejadorServidor)
+    servidor.operaciones = operaciones
+    servidor.salud = salud or {}
+    servidor.lock = threading.Lock()
+    servidor.respuestas = OrderedDict() # Id-Operacion -> respuesta, las más viejas se descartan primero
+    servidor.daemon_threads = True
+    return servidor
+
+class ClienteDatos:
+    """Cliente del servidor de datos. Cada hilo usa su propia conexión HTTP persistente."""
+
+    def __init__(self, direccion):
+        host, _, puerto = direccion.rpartition(':')
+        self.host = host or '127.0.0.1'
+        self.puerto = int(puerto)
+        self._local = threading.local()
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = http.client.HTTPConnection(self.host, self.puerto, timeout=TIEMPO_ESPERA_SERVIDOR_S)
+            conexion.connect()
+            conexion.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) # Igual que en el servidor
+            self._local.conexion = conexion
+        return conexion
+
+    def llamar(self, nombre, *args, **kwargs):
+        """Ejecuta la operación en el servidor. Los avisos que emitió se vuelven a emitir aquí y los
+        errores se lanzan como RuntimeError."""
+        cuerpo = _a_json({'args': args, 'kwargs': kwargs})
+        # El mismo id en el reintento: si el servidor ya la había aplicado, contesta sin repetirla
+        encabezados = {'Content-Type': 'application/json', 'Id-Operacion': uuid.uuid4().hex}
+        for intento in range(2):
+            conexion = self._conexion()
+            try:
+                conexion.request('POST', f"/operacion/{nombre}", body=cuerpo, headers=encabezados)
+                respuesta = _desde_json(conexion.getresponse().read())
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # La conexión se cortó antes de la respuesta: se reintenta una vez con una nueva
+                conexion.close()
+                self._local.conexion = None
+                if intento:
+                    raise
+        for aviso in respuesta.get('avisos', []):
+            _avisar(*aviso)
+        if respuesta.get('error'):
+            raise RuntimeError(respuesta['error'])
+        return respuesta.get('resultado')
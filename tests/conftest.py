@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Registros_base as rb
+
+FECHAS = ['2026-02-27', '2026-02-28', '2026-03-01', '2026-09-29', '2026-09-30', '2026-10-01']
+
+
+@pytest.fixture
+def carpeta(tmp_path, monkeypatch):
+    """Carpeta de trabajo vacía con el almacén excel y sin estado de otras pruebas."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(rb, 'ALMACENAMIENTO', 'excel')
+    monkeypatch.setattr(rb, 'ESCRITURA_DIFERIDA', False)
+    rb.cerrar_almacen()
+    rb.invalidar_cache_empleados()
+    yield tmp_path
+    rb.cerrar_almacen()
+    rb.invalidar_cache_empleados()
+
+
+@pytest.fixture
+def registro(carpeta):
+    """Registro en Excel con una fila completa por fecha de FECHAS, alrededor de fines de mes cortos."""
+    filas = [{'id empleado': f"E{i:03d}", 'nombre completo': f"Empleado {i}", 'cargo': 'Operario',
+              'fecha': fecha, 'hora entrada': '08:00:00', 'jornada horas': 7,
+              'hora inicio almuerzo': '12:00:00', 'hora fin almuerzo': '12:45:00', 'hora salida': '16:00:00',
+              'horas trabajadas': 7.25, 'tiempo extra minutos': 15, 'tiempo almuerzo minutos': 45}
+             for i, fecha in enumerate(FECHAS)]
+    pd.DataFrame(filas, columns=rb.COLUMNAS_REGISTRO).to_excel(rb.ARCHIVO_REGISTRO, index=False)
+    return carpeta
@@ -0,0 +1,25 @@
+import pandas as pd
+import pytest
+
+import Registros_base as rb
+import almacenes
+from conftest import FECHAS
+
+
+def _como_texto(bloques):
+    return rb.registro_como_texto(pd.concat(list(bloques), ignore_index=True))
+
+
+@pytest.mark.parametrize('desde, hasta, esperadas', [
+    (None, '2026-09-31', FECHAS[:5]),
+    ('2026-02-01', '2026-02-31', FECHAS[:2]),
+    ('2026-02-31', '2026-09-29', FECHAS[2:4]),
+    ('2026-09-30', None, FECHAS[4:]),
+])
+def test_iterar_igual_con_cache_fria_y_caliente(registro, desde, hasta, esperadas):
+    almacen = almacenes.AlmacenExcel()
+    fria = _como_texto(almacen.iterar(desde, hasta))
+    almacen.leer() # Deja el registro tipado en memoria
+    caliente = _como_texto(almacen.iterar(desde, hasta))
+    assert fria['fecha'].tolist() == esperadas
+    pd.testing.assert_frame_equal(fria, caliente, check_dtype=False, check_categorical=False)
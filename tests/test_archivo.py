@@ -0,0 +1,31 @@
+import pytest
+
+import Registros_base as rb
+import almacenes
+from conftest import FECHAS
+
+
+@pytest.mark.parametrize('mes, dia', [('2026-02', '2026-02-28'), ('2026-09', '2026-09-30'), ('2026-10', '2026-10-31')])
+def test_ultimo_dia_mes(mes, dia):
+    assert rb._ultimo_dia_mes(mes) == dia
+
+
+def test_archivar_y_cargar_meses_cortos_con_cache_caliente(registro):
+    rb.obtener_almacen().leer() # El almacén excel queda con el registro tipado en memoria
+    assert rb.archivar_meses('2026-09') == {'2026-02': 2, '2026-03': 1, '2026-09': 2}
+    for mes in ('2026-02', '2026-09'):
+        df = rb.cargar_archivo(f"{mes}-01", rb._ultimo_dia_mes(mes), ['id empleado', 'fecha'])
+        assert df['fecha'].tolist() == [fecha for fecha in FECHAS if fecha.startswith(mes)]
+
+
+def test_archivo_conserva_nombre_y_cargo_vacios(registro):
+    df = almacenes._leer_registro_excel()
+    df.loc[0, 'nombre completo'] = None
+    df['cargo'] = None
+    df.to_excel(rb.ARCHIVO_REGISTRO, index=False)
+    rb.cerrar_almacen()
+    rb.archivar_meses('2026-02')
+    cargado = rb.cargar_archivo('2026-02-01', '2026-02-28')
+    assert cargado['nombre completo'].isna().tolist() == [True, False]
+    assert cargado['cargo'].isna().all()
+    assert cargado['id empleado'].tolist() == ['E000', 'E001']
@@ -0,0 +1,37 @@
+import os
+
+import pandas as pd
+import pytest
+
+import Registros_base as rb
+
+
+@pytest.fixture
+def kiosco(carpeta):
+    pd.DataFrame({'id empleado': ['E001'], 'nombre completo': ['Ana'], 'edad': [30], 'cargo': ['Operario'],
+                  'jornada horas': [7]}, columns=rb.COLUMNAS_EMPLEADOS).to_excel(rb.ARCHIVO_EMPLEADOS, index=False)
+    pd.DataFrame(columns=rb.COLUMNAS_REGISTRO).to_excel(rb.ARCHIVO_REGISTRO, index=False)
+    return carpeta
+
+
+def test_sin_registro_de_cambios_no_se_anota_nada(kiosco):
+    with rb.capturar_avisos():
+        assert rb.registrar_evento('E001', 'entrada', jornada_horas=7) is not None
+    assert not os.path.exists(rb.ARCHIVO_CAMBIOS)
+    with pytest.raises(RuntimeError):
+        rb.exportar_incremental()
+    cambios = rb.cambios_tablero(rb.datetime.now().strftime('%Y-%m-%d'), 0)
+    assert cambios['completo'] and list(cambios['filas']) == ['E001']
+
+
+def test_con_registro_de_cambios_la_exportacion_es_incremental(kiosco, monkeypatch):
+    monkeypatch.setattr(rb, 'REGISTRO_CAMBIOS', True)
+    with rb.capturar_avisos():
+        rb.registrar_evento('E001', 'entrada', jornada_horas=7)
+    assert os.path.getsize(rb.ARCHIVO_CAMBIOS) > 0
+    assert rb.exportar_incremental() is not None # Primera exportación: el registro completo
+    assert rb.exportar_incremental() is None # Sin cambios nuevos
+    with rb.capturar_avisos():
+        rb.registrar_evento('E001', 'inicio_almuerzo')
+    ruta = rb.exportar_incremental()
+    assert pd.read_csv(ruta)['hora inicio almuerzo'].notna().tolist() == [True]
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+import Registros_base as rb
+import almacenes
+
+
+def _eventos_del_dia():
+    registro = rb._nuevo_registro('E001', 'Ana', 'Operario', '2026-09-15', '08:00:00', 7.0)
+    eventos = [(dict(registro), 'entrada')]
+    for evento, hora in (('inicio_almuerzo', '12:00:00'), ('fin_almuerzo', '12:45:00'), ('salida', '16:00:00')):
+        rb._aplicar_evento(registro, evento, hora)
+        eventos.append((dict(registro), evento))
+    return eventos
+
+
+@pytest.mark.parametrize('almacenamiento', ['excel', 'diario', 'sqlite', 'particionado'])
+def test_recuperar_pendientes_ya_guardados(carpeta, almacenamiento):
+    """Caída entre el guardado en el almacén base y el vaciado de ARCHIVO_PENDIENTES: al reiniciar se
+    vuelven a aplicar eventos que ya estaban guardados, y el resultado debe ser el mismo."""
+    rb._escribir_excel(rb.pd.DataFrame(columns=rb.COLUMNAS_REGISTRO), rb.ARCHIVO_REGISTRO)
+    almacen = almacenes.AlmacenDiferido(almacenes._ALMACENES[almacenamiento](), intervalo_s=60, lote=20)
+    almacen.guardar_lote(_eventos_del_dia())
+    with open(almacenes.ARCHIVO_PENDIENTES, 'rb') as f:
+        pendientes = f.read()
+    almacen.cerrar() # Guarda en el almacén base y vacía el archivo de pendientes
+    with open(almacenes.ARCHIVO_PENDIENTES, 'wb') as f:
+        f.write(pendientes)
+
+    almacen = almacenes.AlmacenDiferido(almacenes._ALMACENES[almacenamiento](), intervalo_s=60, lote=20)
+    try:
+        assert almacen.estadisticas()['pendientes'] == 0
+        assert os.path.getsize(almacenes.ARCHIVO_PENDIENTES) == 0
+        filas = rb.registro_como_texto(almacen.leer())
+        assert len(filas) == 1
+        fila = filas.iloc[0]
+        assert (fila['hora entrada'], fila['hora salida']) == ('08:00:00', '16:00:00')
+        assert int(fila['tiempo almuerzo minutos']) == 45
+    finally:
+        almacen.cerrar()
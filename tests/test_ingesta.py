@@ -0,0 +1,50 @@
+import json
+
+import pandas as pd
+import pytest
+
+import Registros_base as rb
+import almacenes
+
+MARCAS = [
+    ('E001', '2026-09-15 08:00:00', 'entrada', ''),
+    ('E001', '2026-09-15 12:00:00', 'inicio_almuerzo', ''),
+    ('E001', '2026-09-15 12:45:00', 'fin_almuerzo', ''),
+    ('E001', '2026-09-15 16:00:00', 'salida', ''),
+    ('E002', '2026-09-15 08:10:00', 'entrada', 'siete'),
+    ('E002', '2026-09-15 16:10:00', 'salida', ''),
+]
+
+
+@pytest.fixture
+def marcas(carpeta):
+    pd.DataFrame({'id empleado': ['E001', 'E002'], 'nombre completo': ['Ana', 'Luis'], 'edad': [30, 40],
+                  'cargo': ['Operario', 'Operario'], 'jornada horas': [7, 7]},
+                 columns=rb.COLUMNAS_EMPLEADOS).to_excel(rb.ARCHIVO_EMPLEADOS, index=False)
+    pd.DataFrame(columns=rb.COLUMNAS_REGISTRO).to_excel(rb.ARCHIVO_REGISTRO, index=False)
+    ruta = str(carpeta / 'marcas.csv')
+    pd.DataFrame(MARCAS, columns=['id empleado', 'fecha hora', 'evento', 'jornada horas']).to_csv(ruta, index=False)
+    return ruta
+
+
+@pytest.mark.parametrize('almacenamiento', ['excel', 'diario', 'sqlite'])
+def test_ingesta_calcula_almuerzo_en_todos_los_almacenes(marcas, monkeypatch, almacenamiento):
+    monkeypatch.setattr(rb, 'ALMACENAMIENTO', almacenamiento)
+    resultado = rb.ingerir_marcas(marcas)
+    assert (resultado['aceptadas'], resultado['rechazadas'], resultado['filas']) == (4, 2, 1)
+    fila = rb.registro_como_texto(rb.obtener_almacen().leer()).set_index('id empleado').loc['E001']
+    assert fila['hora fin almuerzo'] == '12:45:00'
+    assert int(fila['tiempo almuerzo minutos']) == 45
+    if almacenamiento == 'diario':
+        with open(almacenes._ruta_diario('2026-09-15'), encoding='utf-8') as f:
+            eventos = [json.loads(linea)['evento'] for linea in f]
+        assert eventos == ['entrada', 'inicio_almuerzo', 'fin_almuerzo', 'salida']
+
+
+def test_jornada_no_numerica_va_a_rechazos(marcas):
+    resultado = rb.ingerir_marcas(marcas)
+    rechazos = pd.read_csv(resultado['rechazos'], dtype=str)
+    assert rechazos[['id empleado', 'evento', 'motivo']].values.tolist() == [
+        ['E002', 'entrada', 'jornada horas no válida'],
+        ['E002', 'salida', 'evento sin entrada previa ese día'],
+    ]
@@ -0,0 +1,52 @@
+import pytest
+
+import Registros_base as rb
+
+
+class _Widget:
+    def config(self, **opciones):
+        pass
+
+    def delete(self, *args):
+        pass
+
+
+class _Controlador:
+    def __init__(self):
+        self.pantallas = []
+
+    def show_frame(self, nombre, data=None):
+        self.pantallas.append((nombre, data))
+
+
+@pytest.fixture
+def login(monkeypatch):
+    """LoginPage sin ventana; falla si la pantalla vuelve a leer los archivos en el hilo de Tk."""
+    def sin_archivos(*args, **kwargs):
+        raise AssertionError("la pantalla de login no debe leer los archivos en el hilo de Tk")
+    for nombre in ('obtener_datos_empleado', 'verificar_registro_hoy', 'obtener_registro_actual'):
+        monkeypatch.setattr(rb, nombre, sin_archivos)
+    avisos = []
+    for funcion in ('showinfo', 'showerror', 'showwarning'):
+        monkeypatch.setattr(rb.messagebox, funcion, lambda titulo, mensaje, funcion=funcion: avisos.append(funcion))
+    pagina = rb.LoginPage.__new__(rb.LoginPage)
+    pagina.login_button = pagina.id_entry = _Widget()
+    pagina.controller = _Controlador()
+    pagina.avisos = avisos
+    return pagina
+
+
+def test_jornada_en_curso_usa_los_datos_de_la_consulta(login):
+    datos = {'id empleado': 'E001', 'nombre completo': 'Ana', 'edad': 30, 'cargo': 'Operario', 'jornada horas': 7}
+    registro = {'id empleado': 'E001', 'nombre completo': 'Ana', 'cargo': 'Operario', 'fecha': '2026-09-15',
+                'hora entrada': '08:00:00', 'jornada horas': 7}
+    login.continuar_login('E001', ('parcial', datos, registro))
+    [(pantalla, (empleado, registro_dia))] = login.controller.pantallas
+    assert pantalla == 'DashboardPage'
+    assert empleado.nombre_completo == 'Ana' and registro_dia.hora_entrada == rb.hora_dia(8, 0)
+    assert login.avisos == ['showinfo']
+
+
+def test_empleado_inexistente(login):
+    login.continuar_login('X999', (None, None, None))
+    assert login.controller.pantallas == [] and login.avisos == ['showerror']
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import Registros_base as rb
+import almacenes
+from benchmark_datos import generar_datos
+
+# Filas que el generador no produce: eventos sin marcar, almuerzo a medias, horas o jornada no válidas
+CASOS_BORDE = [
+    ('08:00:00', 7, None, None, None),
+    ('08:00:00', 7, '12:00:00', None, None),
+    ('08:00:00', 7, None, '13:00:00', '16:00:00'),
+    ('08:00:00', 7, None, None, '17:30:00'),
+    ('08:00:00', 7, '12:00:00', '12:59:31', '16:00:29'),
+    ('08:00:00', 'siete', '12:00:00', '13:00:00', '16:00:00'),
+    ('08:00:00', np.nan, '12:00:00', '13:00:00', '18:00:00'), # Jornada vacía, como se lee del registro
+    ('08:00:00', 7, '12:00:00', '25:00:00', '16:00:00'),
+    ('8:00', 7, None, None, '16:00:00'),
+]
+
+
+@pytest.fixture
+def registro_generado(carpeta):
+    generar_datos(str(carpeta), empleados=30, dias=15, asistencia=0.9, semilla=3)
+    df = almacenes._leer_registro_excel()
+    borde = pd.DataFrame([{'id empleado': 'E000000', 'nombre completo': 'Empleado 0', 'cargo': 'Operario',
+                           'fecha': f"2026-01-{i + 1:02d}", 'hora entrada': entrada, 'jornada horas': jornada,
+                           'hora inicio almuerzo': inicio, 'hora fin almuerzo': fin, 'hora salida': salida}
+                          for i, (entrada, jornada, inicio, fin, salida) in enumerate(CASOS_BORDE)],
+                         columns=rb.COLUMNAS_REGISTRO)
+    df = pd.concat([df.astype(object), borde.astype(object)], ignore_index=True)
+    # Las columnas calculadas se borran o se alteran para que el recálculo tenga que rehacerlas
+    df.loc[::3, rb.COLUMNAS_CALCULADAS] = None
+    df.loc[1::3, 'tiempo extra minutos'] = 999
+    return df
+
+
+def _numeros(serie):
+    """Valores de una columna calculada como float (NaN si faltan), esté en texto o ya tipada."""
+    return pd.to_numeric(serie.astype(object), errors='coerce').astype(float)
+
+
+def _por_evento(df):
+    """Columnas calculadas que deja registrar_evento al reproducir cada fila evento por evento."""
+    esperado = []
+    for registro in df.to_dict('records'):
+        for campo, calculo in (('hora fin almuerzo', rb._calcular_almuerzo), ('hora salida', rb._calcular_salida)):
+            if pd.notna(registro[campo]):
+                try:
+                    calculo(registro)
+                except (ValueError, TypeError):
+                    pass # El evento habría fallado y dejado los valores como estaban
+        esperado.append([registro[col] for col in rb.COLUMNAS_CALCULADAS])
+    return pd.DataFrame(esperado, columns=rb.COLUMNAS_CALCULADAS).apply(_numeros)
+
+
+def test_recalculo_por_lotes_coincide_con_el_calculo_por_evento(registro_generado):
+    vectorizado = rb.recalcular_tiempos(registro_generado)[rb.COLUMNAS_CALCULADAS].apply(_numeros)
+    esperado = _por_evento(registro_generado)
+    np.testing.assert_array_equal(vectorizado.to_numpy(dtype=float), esperado.to_numpy(dtype=float))
+    assert rb.verificar_recalculo(registro_generado) == []
+
+
+def test_recalcular_periodo_guarda_lo_mismo_que_el_calculo_por_evento(registro_generado):
+    rb._escribir_excel(registro_generado, rb.ARCHIVO_REGISTRO)
+    resultado = rb.recalcular_periodo()
+    assert resultado['filas'] == len(registro_generado) and resultado['cambiadas'] > 0
+    guardado = rb.obtener_almacen().leer()
+    guardado = pd.DataFrame({'id empleado': guardado['id empleado'].astype(str),
+                             'fecha': guardado['fecha'].astype(str).str[:10],
+                             **{col: _numeros(guardado[col]) for col in rb.COLUMNAS_CALCULADAS}})
+    clave = ['id empleado', 'fecha']
+    esperado = registro_generado[clave].join(_por_evento(registro_generado))
+    comparado = esperado.merge(guardado, on=clave, suffixes=('', ' guardado'))
+    assert len(comparado) == len(registro_generado)
+    for col in rb.COLUMNAS_CALCULADAS:
+        np.testing.assert_array_equal(comparado[col].to_numpy(dtype=float),
+                                      comparado[f"{col} guardado"].to_numpy(dtype=float), err_msg=col)
+    assert rb.recalcular_periodo(simular=True)['cambiadas'] == 0
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+import Registros_base as rb
+
+
+def _marcar_entrada(id_empleado, hora):
+    registro = rb._nuevo_registro(id_empleado, f"Empleado {id_empleado}", 'Operario', '2026-10-01', hora, 8.0)
+    rb.obtener_almacen().guardar(registro, 'entrada')
+    rb._anotar_replicacion([(registro, 'entrada')])
+
+
+def _iniciar(carpeta, nombre, id_empleado, hora):
+    os.chdir(carpeta)
+    rb._escribir_excel(rb.pd.DataFrame(columns=rb.COLUMNAS_REGISTRO), rb.ARCHIVO_REGISTRO)
+    rb.iniciar_nodo(nombre)
+    _marcar_entrada(id_empleado, hora)
+    rb.cerrar_almacen()
+
+
+@pytest.mark.parametrize('almacenamiento, diferida', [('excel', False), ('diario', False), ('sqlite', False),
+                                                      ('excel', True)])
+def test_sincronizar_sin_cambiar_la_carpeta_de_trabajo(carpeta, monkeypatch, almacenamiento, diferida):
+    monkeypatch.setattr(rb, 'ALMACENAMIENTO', almacenamiento)
+    monkeypatch.setattr(rb, 'ESCRITURA_DIFERIDA', diferida)
+    par = carpeta / 'kiosco'
+    par.mkdir()
+    _iniciar(par, 'kiosco', 'E001', '08:00:00')
+    _iniciar(carpeta, 'central', 'E002', '09:00:00')
+    almacen_local = rb.obtener_almacen()
+
+    def chdir_prohibido(ruta):
+        raise AssertionError(f"os.chdir({ruta!r}) cambia la carpeta de todos los hilos")
+
+    monkeypatch.setattr(os, 'chdir', chdir_prohibido)
+    assert rb.sincronizar(str(par)) == {'recibidos': 1, 'enviados': 1}
+    assert rb.obtener_almacen() is almacen_local # El almacén de este nodo sigue abierto
+    assert sorted(rb.obtener_almacen().leer()['id empleado'].astype(str)) == ['E001', 'E002']
+    rb.cerrar_almacen()
+    almacen_par = rb._crear_almacen(str(par))
+    try:
+        assert sorted(almacen_par.leer()['id empleado'].astype(str)) == ['E001', 'E002']
+    finally:
+        almacen_par.cerrar()
+    assert rb.sincronizar(str(par)) == {'recibidos': 0, 'enviados': 0}
@@ -0,0 +1,23 @@
+import pytest
+
+import Registros_base as rb
+
+
+def test_construccion_interrumpida_se_rehace_al_abrir(registro, monkeypatch):
+    original = rb.ResumenPeriodos.reconstruir
+
+    def falla(self, df):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(rb.ResumenPeriodos, 'reconstruir', falla)
+    with pytest.raises(OSError):
+        rb.ResumenPeriodos()
+    # La base quedó creada pero sin la marca de construcción: la próxima apertura la construye
+    monkeypatch.setattr(rb.ResumenPeriodos, 'reconstruir', original)
+    resumen = rb.ResumenPeriodos()
+    try:
+        assert resumen.totales('dia', '2026-02-27') == {
+            'E000': {'dias': 1, 'horas_trabajadas': 7.25, 'tiempo_extra_minutos': 15, 'exceso_almuerzo_minutos': 0}}
+        assert resumen.verificar(rb.obtener_almacen().leer()) == []
+    finally:
+        resumen.cerrar()
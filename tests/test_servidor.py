@@ -0,0 +1,36 @@
+import threading
+
+import servidor_datos
+
+
+def test_reintento_tras_corte_no_repite_la_operacion(monkeypatch):
+    aplicadas = []
+
+    def registrar(id_empleado):
+        aplicadas.append(id_empleado)
+        return len(aplicadas)
+
+    responder = servidor_datos._ManejadorServidor._responder
+    cortes = []
+
+    def cortar_primera(self, estado, datos):
+        # El servidor ya aplicó la operación pero la conexión se cae antes de la respuesta
+        if not cortes:
+            cortes.append(datos)
+            self.close_connection = True
+            return
+        responder(self, estado, datos)
+
+    monkeypatch.setattr(servidor_datos._ManejadorServidor, '_responder', cortar_primera)
+    servidor = servidor_datos._crear_servidor('127.0.0.1', 0, {'registrar': registrar})
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    try:
+        cliente = servidor_datos.ClienteDatos(f"127.0.0.1:{servidor.server_address[1]}")
+        assert cliente.llamar('registrar', 'E001') == 1
+        assert cliente.llamar('registrar', 'E002') == 2
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+    assert len(cortes) == 1
+    assert aplicadas == ['E001', 'E002']
@@ -0,0 +1,33 @@
+import Registros_base as rb
+import registro_comun
+
+
+class _Ventana:
+    def after(self, ms, funcion):
+        return 1
+
+    def after_cancel(self, id_after):
+        pass
+
+
+class _Etiqueta:
+    def __init__(self):
+        self.cambios = 0
+
+    def config(self, **opciones):
+        self.cambios += 1
+
+
+def test_ticks_en_estadisticas_de_interfaz_y_no_en_metricas_de_datos():
+    rb.reiniciar_metricas()
+    etiqueta = _Etiqueta()
+    motor = rb.MotorTemporizadores(_Ventana())
+    motor.vincular(etiqueta, lambda ahora: {'text': 'fijo'})
+    motor.iniciar()
+    for _ in range(4):
+        motor._tick()
+    motor.detener()
+    assert motor.estadisticas['ticks'] == 5
+    assert sum(motor.estadisticas['cubetas_tick']) == 5
+    assert (etiqueta.cambios, motor.estadisticas['sin_cambios']) == (1, 4)
+    assert not any('MotorTemporizadores' in operacion for operacion, _ in registro_comun.metricas())